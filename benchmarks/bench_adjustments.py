@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from benchmarks.positions import SEED, generate_contracts
+from optionrra.adjustments import Adjustment, AdjustmentEvaluator, apply_adjustment
+from optionrra.model import Position
+from optionrra.pl.plcalendar import PositionPLCalendar
+
+
+@pytest.fixture(params=[10, 100], ids=lambda n: f"{n}_adjustments")
+def batch(request):
+    rng = np.random.default_rng(SEED)
+    position = Position.from_str_list(generate_contracts(rng, 10))
+    adjustments = [Adjustment.from_str_list(f"a{i}", generate_contracts(rng, 2)) for i in range(request.param)]
+    return position, adjustments
+
+
+def test_adjustment_evaluator(benchmark, batch):
+    position, adjustments = batch
+
+    def evaluate():
+        return AdjustmentEvaluator(position, adjustments).evaluate((80, 120), 0.4)
+
+    benchmark.pedantic(evaluate, rounds=3)
+
+
+def test_rebuilt_calendars(benchmark, batch):
+    # every variant rebuilt and simulated on its own, what `AdjustmentEvaluator` replaces
+    position, adjustments = batch
+
+    def evaluate():
+        return [PositionPLCalendar(apply_adjustment(position, a)[0]).expected_returns_simulation((80, 120), 0.4, 0.05)
+                for a in adjustments]
+
+    benchmark.pedantic(evaluate, rounds=3)
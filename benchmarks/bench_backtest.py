@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from benchmarks.positions import UNDERLYING_PRICE, generate_positions
+from optionrra.backtest import Backtest
+
+# five years of daily closes
+NUM_DATES = 5 * 252
+
+
+@pytest.fixture(params=[1, 100], ids=lambda n: f"{n}_positions")
+def book(request):
+    return generate_positions(10, request.param)
+
+
+def test_backtest_run(benchmark, book, rng):
+    dates = np.busday_offset(np.datetime64("today"), np.arange(NUM_DATES) - NUM_DATES // 2, roll="forward")
+    prices = UNDERLYING_PRICE * np.exp(np.cumsum(rng.normal(0, 0.015, NUM_DATES)))
+    backtest = Backtest(book)
+    benchmark(backtest.run, dates, prices)
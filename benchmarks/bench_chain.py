@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from benchmarks.positions import EXPIRATION_DAYS, UNDERLYING_PRICE
+from optionrra.chain import OptionChain
+from optionrra.model import OptionType
+
+
+@pytest.fixture
+def chain(rng):
+    # every expiration lists calls and puts on a 0.5 grid of strikes, 2800 rows in total
+    today = datetime.now()
+    strikes = np.arange(0.5, 1.5, 0.005) * UNDERLYING_PRICE
+    exp_dates = [np.datetime64(today + timedelta(days=d), "s") for d in EXPIRATION_DAYS]
+    grid_strikes, grid_is_call, grid_exp_dates = (a.ravel() for a in np.meshgrid(strikes, [True, False], exp_dates))
+    return OptionChain(grid_strikes, grid_is_call, grid_exp_dates, rng.uniform(0.1, 15.0, len(grid_strikes)))
+
+
+def test_option_chain_find(benchmark, chain):
+    exp_date = chain.expirations[3]
+    benchmark(chain.find, 100.0, OptionType.CALL, exp_date)
+
+
+def test_option_chain_nearest_strikes_10k(benchmark, chain, rng):
+    prices = rng.uniform(60, 140, 10_000)
+    benchmark(chain.nearest_strikes, prices, OptionType.PUT, chain.expirations[3])
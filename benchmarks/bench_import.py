@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_model(benchmark):
+    benchmark.pedantic(subprocess.run, args=([sys.executable, "-c", "import optionrra.model"],),
+                       kwargs={"check": True, "cwd": ROOT_DIR}, rounds=10)
+
+
+def test_python_startup(benchmark):
+    benchmark.pedantic(subprocess.run, args=([sys.executable, "-c", "pass"],), kwargs={"check": True, "cwd": ROOT_DIR}, rounds=10)
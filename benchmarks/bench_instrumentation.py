@@ -0,0 +1,21 @@
+from optionrra.misc.instrumentation import instrumented, profile
+
+
+def _noop():
+    return None
+
+
+_instrumented_noop = instrumented("bench.noop")(_noop)
+
+
+def test_noop(benchmark):
+    benchmark(_noop)
+
+
+def test_disabled_instrumented_noop(benchmark):
+    benchmark(_instrumented_noop)
+
+
+def test_enabled_instrumented_noop(benchmark):
+    with profile():
+        benchmark(_instrumented_noop)
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import pytest
+
+from benchmarks.positions import UNDERLYING_PRICE, generate_positions
+from optionrra.live import LiveValuation
+
+
+@pytest.fixture(params=[100, 2000], ids=lambda n: f"{n}_positions")
+def book(request):
+    return generate_positions(10, request.param)
+
+
+def test_live_full_revaluation(benchmark, book):
+    live = LiveValuation(book, 0.4)
+    now = datetime.now()
+    live.update(now, UNDERLYING_PRICE)
+    benchmark(live.update, now, UNDERLYING_PRICE * 1.001)
+
+
+def test_live_taylor_update(benchmark, book):
+    live = LiveValuation(book, 0.4, taylor_tolerance=0.01)
+    now = datetime.now()
+    live.update(now, UNDERLYING_PRICE)
+    benchmark(live.update, now, UNDERLYING_PRICE * 1.001)
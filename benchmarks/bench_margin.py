@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from benchmarks.positions import UNDERLYING_PRICE, generate_positions
+from optionrra.margin import MarginCalculator
+
+
+@pytest.fixture(params=[100, 1000], ids=lambda n: f"{n}_positions")
+def book(request):
+    return generate_positions(10, request.param)
+
+
+def test_margin_calculator_init(benchmark, book):
+    benchmark(MarginCalculator, book)
+
+
+def test_margin_requirements(benchmark, book):
+    calculator = MarginCalculator(book)
+    prices = UNDERLYING_PRICE * np.linspace(0.7, 1.3, 200)
+    benchmark(calculator.requirements, prices, 0.4)
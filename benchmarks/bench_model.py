@@ -0,0 +1,15 @@
+from optionrra.model import Position
+
+
+def test_parse_position(benchmark, contracts):
+    benchmark(Position.from_str_list, contracts)
+
+
+def test_position_init(benchmark, contracts):
+    legs = Position.from_str_list(contracts).contracts
+    benchmark(Position, legs)
+
+
+def test_position_theoretical_value(benchmark, contracts):
+    position = Position.from_str_list(contracts)
+    benchmark(position.theoretical_value, 100.0, 0.4, 0.05, 5)
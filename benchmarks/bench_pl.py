@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from benchmarks.positions import generate_positions
+from optionrra.model import Position
+from optionrra.pl.platexp import PositionPLAtExpiration
+from optionrra.pl.plcalendar import PositionPLCalendar
+from optionrra.portfolio import Portfolio
+
+
+def test_pl_at_expiration(benchmark, contracts):
+    position = Position.from_str_list(contracts)
+    benchmark(PositionPLAtExpiration, position)
+
+
+def test_expected_returns_simulation(benchmark, contracts):
+    calendar = PositionPLCalendar(Position.from_str_list(contracts))
+    benchmark.pedantic(calendar.expected_returns_simulation, args=((80, 120), 0.4, 0.05), rounds=3)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32], ids=["float64", "float32"])
+def test_portfolio_expected_returns_surface(benchmark, dtype):
+    portfolio = Portfolio(generate_positions(10, 100))
+    prices = np.linspace(70, 130, 500)
+    benchmark.pedantic(portfolio.expected_returns_surface, args=(prices, list(range(0, 60, 5)), 0.4),
+                       kwargs={"dtype": dtype}, rounds=3)
+
+
+@pytest.mark.parametrize("adaptive", [False, True], ids=["uniform", "adaptive"])
+def test_expected_returns_simulation_price_axis(benchmark, contracts, adaptive):
+    # the adaptive axis against pricing a dense uniform one
+    calendar = PositionPLCalendar(Position.from_str_list(contracts))
+    if adaptive:
+        benchmark.pedantic(calendar.adaptive_expected_returns_simulation, args=((80, 120), 0.4, 0.05), rounds=3)
+    else:
+        prices = np.linspace(80, 120, 400)
+        benchmark.pedantic(calendar.position.theoretical_values,
+                           args=(prices, 0.4, 0.05, calendar.days_until_expiration_interval), rounds=3)
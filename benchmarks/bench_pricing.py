@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from optionrra.pricing.black_scholes_model import option_value, option_values
+from optionrra.pricing.price_table import default_price_table
+
+
+def test_option_value(benchmark):
+    benchmark(option_value, 100.0, 95.0, 0.05, 0.4, 30, "c")
+
+
+def test_option_values_10k(benchmark, rng):
+    s = rng.uniform(70, 130, 10_000)
+    k = rng.uniform(70, 130, 10_000)
+    t_days = rng.integers(0, 180, 10_000)
+    is_call = rng.random(10_000) < 0.5
+    benchmark(option_values, s, k, 0.05, 0.4, t_days, is_call)
+
+
+@pytest.mark.parametrize("approximate", [False, True], ids=["exact", "approximate"])
+def test_option_values_1m(benchmark, rng, approximate):
+    s = rng.uniform(70, 130, 1_000_000)
+    k = rng.uniform(70, 130, 1_000_000)
+    t_days = rng.integers(1, 180, 1_000_000)
+    is_call = rng.random(1_000_000) < 0.5
+    option_values(s, k, 0.05, 0.4, t_days, is_call, approximate=approximate)
+    benchmark(option_values, s, k, 0.05, 0.4, t_days, is_call, approximate=approximate)
+
+
+@pytest.mark.parametrize("approximate", [False, True], ids=["exact", "approximate"])
+def test_option_values_calendar_grid(benchmark, approximate):
+    # strikes × prices × days, the shape of a strategy's P/L calendar
+    s = np.linspace(70, 130, 100)[np.newaxis, :, np.newaxis]
+    k = np.linspace(80, 120, 50)[:, np.newaxis, np.newaxis]
+    t_days = np.arange(1, 201)[np.newaxis, np.newaxis, :]
+    option_values(s, k, 0.05, 0.4, t_days, True, approximate=approximate)
+    benchmark(option_values, s, k, 0.05, 0.4, t_days, True, approximate=approximate)
+
+
+def test_price_table_accuracy_report(benchmark):
+    report = benchmark(default_price_table().accuracy_report)
+    assert report["max_relative_error"] <= report["max_error"]
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32], ids=["float64", "float32"])
+def test_option_values_calendar_grid_dtype(benchmark, dtype):
+    s = np.linspace(70, 130, 100)[np.newaxis, :, np.newaxis]
+    k = np.linspace(80, 120, 50)[:, np.newaxis, np.newaxis]
+    t_days = np.arange(1, 201)[np.newaxis, np.newaxis, :]
+    benchmark(option_values, s, k, 0.05, 0.4, t_days, True, dtype=dtype)
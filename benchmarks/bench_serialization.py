@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.positions import generate_contract_lists, generate_positions
+from optionrra.model import Position
+from optionrra.serialization import from_bytes, records_from_bytes, to_bytes
+
+
+@pytest.fixture(params=[1, 100], ids=lambda n: f"{n}_positions")
+def book(request):
+    return generate_positions(20, request.param)
+
+
+def test_from_str_list(benchmark, book):
+    # to_str_list omits expiration dates, so the generated contract strings are parsed instead
+    str_lists = generate_contract_lists(20, len(book))
+    benchmark(lambda: [Position.from_str_list(s) for s in str_lists])
+
+
+def test_from_bytes(benchmark, book):
+    benchmark(from_bytes, to_bytes(book))
+
+
+def test_records_from_bytes(benchmark, book):
+    benchmark(records_from_bytes, to_bytes(book))
+
+
+def test_to_bytes(benchmark, book):
+    benchmark(to_bytes, book)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from benchmarks.positions import UNDERLYING_PRICE
+from optionrra.chain import OptionChain
+from optionrra.pricing.black_scholes_model import option_values
+from optionrra.strategy import StrategySearch
+
+EXP_DATE = np.datetime64("2030-01-18", "s")
+
+
+@pytest.fixture(params=[200, 2000], ids=lambda n: f"{n}_strikes")
+def chain(request):
+    strikes = np.linspace(0.5, 1.5, request.param) * UNDERLYING_PRICE
+    strikes = np.concatenate([strikes, strikes])
+    is_call = np.arange(len(strikes)) < len(strikes) // 2
+    sigma = 0.3 + 0.002 * (UNDERLYING_PRICE - strikes)
+    return OptionChain(strikes, is_call, EXP_DATE, option_values(UNDERLYING_PRICE, strikes, 0.05, sigma, 30, is_call))
+
+
+@pytest.mark.parametrize("structures", [["bull_call_spread", "bull_put_spread"], ["long_call_butterfly"],
+                                        ["iron_condor"]], ids=lambda s: "+".join(s))
+@pytest.mark.parametrize("objective", ["expected_pl", "reward_risk"])
+def test_strategy_search(benchmark, chain, structures, objective):
+    # reward_risk is pruned by dominance, expected_pl evaluates every candidate
+    search = StrategySearch(chain, EXP_DATE, UNDERLYING_PRICE, 0.3, days=30)
+    benchmark.pedantic(search.search, args=(structures, objective, 10, 5.0), rounds=3)
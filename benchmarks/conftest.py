@@ -0,0 +1,14 @@
+import numpy as np
+import pytest
+
+from benchmarks.positions import LEG_COUNTS, SEED, generate_contracts
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(SEED)
+
+
+@pytest.fixture(params=LEG_COUNTS, ids=lambda n: f"{n}_legs")
+def contracts(request, rng):
+    return generate_contracts(rng, request.param)
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from typing import List
+
+import numpy as np
+
+from optionrra.model import Position
+
+SEED = 20230215
+LEG_COUNTS = [1, 10, 50, 200]
+UNDERLYING_PRICE = 100.0
+STOCK_LEG_PROBABILITY = 0.1
+EXPIRATION_DAYS = [7, 14, 30, 45, 60, 90, 180]
+
+
+def generate_contracts(rng: np.random.Generator, num_legs: int) -> List[str]:
+    """
+    Generates contract strings of a realistic position in `Position.from_str_list` grammar.
+
+    Strikes are spread around `UNDERLYING_PRICE` on a 2.5 grid, expirations are picked out of `EXPIRATION_DAYS`
+    and about `STOCK_LEG_PROBABILITY` of the legs are stock.
+
+    :param rng: Seeded random generator
+    :param num_legs: Number of legs
+    :return: list of contract strings
+    """
+    contracts = []
+    today = datetime.now()
+    for _ in range(num_legs):
+        count = int(rng.integers(1, 5)) * (1 if rng.random() < 0.5 else -1)
+        if rng.random() < STOCK_LEG_PROBABILITY:
+            price = round(UNDERLYING_PRICE * rng.uniform(0.9, 1.1), 2)
+            contracts.append(f"{count:+d} stock {price}")
+            continue
+
+        strike = float(np.round(UNDERLYING_PRICE * rng.uniform(0.7, 1.3) / 2.5) * 2.5)
+        option_type = "call" if rng.random() < 0.5 else "put"
+        premium = round(float(rng.uniform(0.1, 15.0)), 2)
+        exp_date = (today + timedelta(days=int(rng.choice(EXPIRATION_DAYS)))).strftime("%Y-%m-%d")
+        contracts.append(f"{count:+d} {strike} {option_type} {premium} {exp_date}")
+    return contracts
+
+
+def generate_contract_lists(num_legs: int, num_positions: int = 1, seed: int = SEED) -> List[List[str]]:
+    rng = np.random.default_rng(seed + num_legs)
+    return [generate_contracts(rng, num_legs) for _ in range(num_positions)]
+
+
+def generate_positions(num_legs: int, num_positions: int = 1, seed: int = SEED) -> List[Position]:
+    return [Position.from_str_list(c) for c in generate_contract_lists(num_legs, num_positions, seed)]
@@ -0,0 +1,238 @@
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from optionrra.model import (Contract, ContractType, DividendSchedule, OptionContract, Position, Settlement,
+                             StockContract)
+from optionrra.pl.platexp import positions_expiration_bounds
+from optionrra.pl.plcalendar import PositionPLCalendar
+from optionrra.portfolio import Portfolio
+
+Metrics = Dict[str, np.ndarray]
+BASE = "base"
+
+
+def _key(c: Contract):
+    if c.subtype() is None:
+        return None, None, None, None
+    return c.get_price(), c.subtype(), c.expiration_date(), c.exercise
+
+
+def _contract(template: Contract, count: int, premium: float) -> Contract:
+    contract_type = ContractType.LONG if count > 0 else ContractType.SHORT
+    if isinstance(template, StockContract):
+        return replace(template, count=abs(count), type=contract_type, price=premium)
+    return replace(template, count=abs(count), type=contract_type, premium=premium)
+
+
+@dataclass(frozen=True)
+class Adjustment:
+    """
+    Named set of legs traded against a position, a leg opposite to a leg of the position closes it
+    """
+    name: str
+    legs: Tuple[Contract, ...]
+
+    @staticmethod
+    def from_str_list(name: str, str_contracts: List[str]) -> "Adjustment":
+        return Adjustment(name, tuple(Position.contracts_from_str_list(str_contracts)))
+
+    @property
+    def cost(self) -> float:
+        """
+        Net premium of the legs, in the sign convention of `Position.entry_cost`
+        """
+        return sum(c.price_sign() * c.count * c.get_value() for c in self.legs)
+
+    @staticmethod
+    def roll(name: str, leg: OptionContract, close_premium: float, strike: float, open_premium: float,
+             exp_date=None) -> "Adjustment":
+        """
+        Closes an option leg and opens the same number of contracts at another strike and/or expiration date
+
+        :param name: Name of the adjustment
+        :param leg: Leg of the position rolled
+        :param close_premium: Premium the leg is closed at
+        :param strike: Strike of the new leg
+        :param open_premium: Premium of the new leg
+        :param exp_date: Expiration date of the new leg, the one of `leg` by default
+        :return: Adjustment
+        """
+        closing_type = ContractType.SHORT if leg.type == ContractType.LONG else ContractType.LONG
+        exp_date = leg.exp_date if exp_date is None else exp_date
+        return Adjustment(name, (replace(leg, type=closing_type, premium=close_premium),
+                                 replace(leg, premium=open_premium, strike_price=float(strike), exp_date=exp_date)))
+
+    @staticmethod
+    def resize(name: str, leg: Contract, count: int, premium: float) -> "Adjustment":
+        """
+        Changes the number of contracts of a leg, keeping its direction
+
+        :param name: Name of the adjustment
+        :param leg: Leg of the position resized
+        :param count: New number of contracts
+        :param premium: Premium contracts are traded at, the stock price for stock legs
+        :return: Adjustment
+        """
+        if count < 0:
+            raise ValueError("Not a valid count")
+        delta = count - leg.count
+        if delta == 0:
+            return Adjustment(name, ())
+        same_direction = 1 if leg.type == ContractType.LONG else -1
+        return Adjustment(name, (_contract(leg, same_direction * delta, premium),))
+
+
+@dataclass
+class AdjustmentResult:
+    """
+    Variant of a position after an adjustment, `pl` is of shape (stock prices, days)
+    """
+    name: str
+    position: Position
+    metrics: Dict[str, float] = field(default_factory=dict)
+    pl: np.ndarray = None
+
+
+def apply_adjustment(position: Position, adjustment: Adjustment) -> Tuple[Position, float]:
+    """
+    Position resulting from trading the legs of an adjustment against a position.
+
+    Legs of the same strike, option type, expiration date and exercise style are netted:
+    legs of the same direction merge at the count weighted premium, so the entry cost is kept,
+    and legs of opposite directions close each other at their own premiums, the difference is realized.
+    Legs the adjustment does not touch are kept as they are.
+
+    :param position: Base position
+    :param adjustment: Adjustment
+    :return: tuple of the resulting position and PL realized by closing legs
+    """
+    touched = {_key(c) for c in adjustment.legs}
+    contracts = [c for c in position.contracts if _key(c) not in touched]
+    netted: Dict[tuple, Tuple[Contract, int, float]] = {}
+    realized = 0.0
+    for c in [c for c in position.contracts if _key(c) in touched] + list(adjustment.legs):
+        key = _key(c)
+        count, premium = c.signed_count(), c.get_value()
+        if key not in netted:
+            netted[key] = (c, count, premium)
+            continue
+
+        template, held, held_premium = netted[key]
+        if held * count > 0:
+            premium = (abs(held) * held_premium + abs(count) * premium) / (abs(held) + abs(count))
+        else:
+            closed = min(abs(held), abs(count))
+            # a long leg is sold at the closing premium, a short one bought back
+            realized += closed * (premium - held_premium) * (1 if held > 0 else -1)
+            if abs(held) > abs(count):
+                premium = held_premium
+        netted[key] = (template, held + count, premium)
+
+    contracts.extend(_contract(template, count, premium) for template, count, premium in netted.values() if count != 0)
+    if len(contracts) == 0:
+        raise ValueError(f"Not a valid adjustment {adjustment.name}, it closes every leg of the position")
+    return Position(contracts), float(realized)
+
+
+class AdjustmentEvaluator:
+    """
+    Evaluates a batch of what-if adjustments of a position side by side.
+
+    Every adjustment is applied to the base position once, see `apply_adjustment`, and all variants,
+    the base position first, are valued as a single `Portfolio`: legs shared by the variants, i.e. the legs
+    of the base position an adjustment does not touch, are netted into the same instruments and priced once,
+    so a batch of adjustments only adds the pricing of the legs they open.
+
+    PL of a variant is the PL `PositionPLCalendar.expected_returns_simulation` of the resulting position gives
+    plus the PL realized by closing legs, so variants compare with the base position and with each other.
+    """
+    METRICS = ["cost", "adjustment_cost", "realized_pl", "max_gain", "max_loss", "reward_risk"]
+
+    def __init__(self, position: Position, adjustments: List[Adjustment]):
+        names = [BASE] + [a.name for a in adjustments]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Not a valid adjustments batch, names have to be unique and other than {BASE}")
+
+        self.names = names
+        variants = [apply_adjustment(position, a) for a in adjustments]
+        self.positions = [position] + [p for p, _ in variants]
+        self.realized_pl = np.array([0.0] + [realized for _, realized in variants])
+        self.adjustment_costs = np.array([0.0] + [a.cost for a in adjustments])
+        self.portfolio = Portfolio(self.positions)
+
+    def bounds(self) -> Metrics:
+        """
+        Cost and max gain and max loss at expiration of every variant, losses are positive numbers
+
+        `cost` is the entry cost of the resulting position and `adjustment_cost` the net premium of the adjustment,
+        both in the sign convention of `Position.entry_cost`. Max gain and max loss are NaN for variants whose
+        options expire at several dates, see `positions_expiration_bounds`.
+
+        :return: dict of np.ndarray metrics of shape (variants,)
+        """
+        max_gain, max_loss = positions_expiration_bounds(self.positions, self.realized_pl)
+
+        cost = self.portfolio.entry_costs
+        with np.errstate(divide="ignore", invalid="ignore"):
+            reward_risk = np.where(max_loss > 0, max_gain / max_loss, np.inf)
+        return {
+            "cost": cost,
+            "adjustment_cost": self.adjustment_costs,
+            "realized_pl": self.realized_pl,
+            "max_gain": max_gain,
+            "max_loss": max_loss,
+            "reward_risk": np.where(np.isnan(max_loss), np.nan, reward_risk),
+        }
+
+    def days_interval(self) -> List[int]:
+        """
+        Days every variant is simulated over, those of the variant expiring last, see `PositionPLCalendar`
+
+        :return: list of days passed from today
+        """
+        latest = max(range(len(self.positions)), key=lambda i: self.positions[i].max_expiration_date)
+        return PositionPLCalendar(self.positions[latest]).days_until_expiration_interval
+
+    def expected_returns(self, stock_prices, sigma: float, r: float = 0.05, days: List[int] = None,
+                         settlement: Settlement = Settlement.CASH, dividends: DividendSchedule = None,
+                         dtype=np.float64) -> np.ndarray:
+        """
+        Simulates "expected returns" of every variant over a price × days grid out of a single `Portfolio`
+
+        :param stock_prices: Underlying stock price scenarios
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param days: Days passed from today, `days_interval` by default
+        :param settlement: How expired legs are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param dtype: Compute dtype, see `compute_dtype`
+        :return: np.ndarray of shape (variants, stock prices, days)
+        """
+        days = self.days_interval() if days is None else days
+        surface = self.portfolio.expected_returns_surface(stock_prices, days, sigma, r, settlement=settlement,
+                                                          dividends=dividends, dtype=dtype)
+        surface += self.realized_pl[:, np.newaxis, np.newaxis].astype(surface.dtype)
+        return surface
+
+    def evaluate(self, price_range: Tuple[float, float], sigma: float, r: float = 0.05, days: List[int] = None,
+                 settlement: Settlement = Settlement.CASH, dividends: DividendSchedule = None,
+                 dtype=np.float64) -> List[AdjustmentResult]:
+        """
+        Risk/reward metrics and "expected returns" of every variant, the base position first
+
+        :param price_range: A tuple of underlying stock expected low and high price range
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param days: Days passed from today, `days_interval` by default
+        :param settlement: How expired legs are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param dtype: Compute dtype, see `compute_dtype`
+        :return: list of AdjustmentResult of `pl` of shape (stock prices, days)
+        """
+        prices = PositionPLCalendar(self.positions[0]).generate_stock_price_interval(price_range)
+        surface = self.expected_returns(prices, sigma, r, days, settlement, dividends, dtype)
+        metrics = self.bounds()
+        return [AdjustmentResult(name, position, {m: float(v[i]) for m, v in metrics.items()}, surface[i])
+                for i, (name, position) in enumerate(zip(self.names, self.positions))]
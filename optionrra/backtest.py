@@ -0,0 +1,211 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from optionrra.model import Position, Settlement
+from optionrra.portfolio import Portfolio
+from optionrra.pricing.binomial_model import american_option_values
+from optionrra.pricing.black_scholes_model import option_values
+
+TRADING_DAYS: int = 252
+REALIZED_VOL_WINDOW: int = 21
+
+
+def realized_volatility(prices, window: int = REALIZED_VOL_WINDOW) -> np.ndarray:
+    """
+    Annualized volatility of log returns over a trailing window, so no date sees prices after it.
+    The first dates use all returns available so far, the very first ones the first two returns.
+
+    :param prices: Closing prices
+    :param window: Number of returns in the window
+    :return: np.ndarray of the shape of `prices`
+    """
+    prices = np.asarray(prices, dtype=float)
+    if prices.ndim != 1 or len(prices) < 3:
+        raise ValueError("Realized volatility requires at least three prices")
+    if window < 2:
+        raise ValueError("Not a valid realized volatility window")
+
+    returns = np.diff(np.log(prices))
+    sums = np.concatenate([[0.0], np.cumsum(returns)])
+    squares = np.concatenate([[0.0], np.cumsum(returns ** 2)])
+    # returns known on the i-th date are returns[:i]
+    ends = np.arange(len(prices))
+    counts = np.clip(ends, 2, window)
+    ends = np.maximum(ends, 2)
+    s = sums[ends] - sums[ends - counts]
+    variance = (squares[ends] - squares[ends - counts] - s ** 2 / counts) / (counts - 1)
+    return np.sqrt(np.maximum(variance, 0) * TRADING_DAYS)
+
+
+def max_drawdown(pl: np.ndarray) -> np.ndarray:
+    """
+    Largest drop of a PL path from its running maximum along the last axis
+
+    :param pl: PL paths
+    :return: np.ndarray of non-negative drawdowns
+    """
+    pl = np.asarray(pl, dtype=float)
+    return np.max(np.maximum.accumulate(pl, axis=-1) - pl, axis=-1)
+
+
+@dataclass
+class BacktestResult:
+    """
+    Mark-to-market PL paths of a book replayed over a price history, `pl` is of shape (positions, dates)
+    """
+    dates: np.ndarray
+    prices: np.ndarray
+    sigma: np.ndarray
+    values: np.ndarray
+    pl: np.ndarray
+    book_pl: np.ndarray
+    expiration_pl: np.ndarray
+
+    def summary(self) -> dict:
+        """
+        Summary statistics of every position and the whole book
+
+        :return: dict of arrays of every position and book level floats
+        """
+        return {
+            "final_pl": self.pl[:, -1],
+            "max_pl": self.pl.max(axis=1),
+            "min_pl": self.pl.min(axis=1),
+            "max_drawdown": max_drawdown(self.pl),
+            "expiration_pl": self.expiration_pl,
+            "book_final_pl": float(self.book_pl[-1]),
+            "book_max_drawdown": float(max_drawdown(self.book_pl)),
+        }
+
+
+class Backtest:
+    """
+    Replays a book of positions entered at the first date over a history of closing prices.
+
+    Legs of all positions are netted into unique instruments once, see `Portfolio`, and every instrument
+    is priced over all dates in a single vectorized pass: times to expiration of the instruments × dates grid
+    are business day counts, the same `num_workdays_until(exp_date) + 1` the rest of the library uses, as of each date.
+    An instrument is settled at its intrinsic value at the settlement price, the close of its expiration date
+    or the last one before it, from its expiration date on and carried according to `settlement`.
+    Once all legs of a position expired it is settled: its PL is frozen at the value of its legs settled
+    the same way at the close of its last expiration date, or the last one before it.
+
+    Instrument values are scattered back to positions with signed counts, so `values` is the market value
+    of the legs, short legs negative, and PL is that value plus `Position.entry_cost`, the premium received
+    less the premium paid. At expiration it is `Position.pl_at_expiration` of an option position.
+    """
+
+    def __init__(self, positions: List[Position], r: float = 0.05, settlement: Settlement = Settlement.CASH):
+        self.portfolio = Portfolio(positions)
+        self.r = r
+        self.settlement = settlement
+        self.__exp_dates = np.array([exp_date for _, _, exp_date, _ in self.portfolio.instruments],
+                                    dtype="datetime64[D]")
+        exp_dates = [p.max_expiration_date if any(c.expiration_date() is not None for c in p.contracts) else None
+                     for p in positions]
+        self.__positions_exp_dates = np.array(["NaT" if d is None else d for d in exp_dates], dtype="datetime64[D]")
+        self.__membership, self.__stock_counts = self.__signed_membership(positions)
+
+    def run(self, dates, prices, sigma=None) -> BacktestResult:
+        """
+        Computes the mark-to-market PL path of every position
+
+        :param dates: Increasing dates of the price history
+        :param prices: Closing prices of the underlying
+        :param sigma: Implied volatility, either a single one or one per date;
+            trailing realized volatility of `prices` by default, see `realized_volatility`
+        :return: BacktestResult
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        prices = np.asarray(prices, dtype=float)
+        if dates.ndim != 1 or len(dates) == 0 or dates.shape != prices.shape:
+            raise ValueError("Not a valid price history")
+        if (np.diff(dates) <= np.timedelta64(0, "D")).any():
+            raise ValueError("Not a valid price history, dates have to be increasing")
+        if (prices <= 0).any():
+            raise ValueError("Not a valid price history, prices have to be positive")
+        sigma = realized_volatility(prices) if sigma is None else np.broadcast_to(np.asarray(sigma, dtype=float),
+                                                                                  prices.shape)
+        if (sigma <= 0).any():
+            raise ValueError("Not a valid sigma")
+
+        entry_costs = self.portfolio.entry_costs
+        values = self.__membership @ self.__instrument_values(dates, prices, sigma)
+        values += np.outer(self.__stock_counts, prices)
+        pl = values + entry_costs[:, np.newaxis]
+
+        # positions whose last leg expired are settled, valued the same way as the rest of the path
+        exp_dates = self.__positions_exp_dates
+        expiration_pl = np.full(len(exp_dates), np.nan)
+        settled = np.flatnonzero(~np.isnat(exp_dates) & (exp_dates <= dates[-1]))
+        if len(settled) > 0:
+            settlement_prices = prices[self.__settlement_index(dates, exp_dates[settled])]
+            instrument_values = self.__settled_values(dates, prices, exp_dates[settled], settlement_prices)
+            values_at_expiration = np.asarray(
+                self.__membership[settled].multiply(instrument_values.T).sum(axis=1)).ravel()
+            values_at_expiration += self.__stock_counts[settled] * settlement_prices
+            expiration_pl[settled] = values_at_expiration + entry_costs[settled]
+            for i in settled:
+                pl[i, dates >= exp_dates[i]] = expiration_pl[i]
+        return BacktestResult(dates, prices, sigma, values, pl, pl.sum(axis=0), expiration_pl)
+
+    def __signed_membership(self, positions: List[Position]) -> Tuple[csr_matrix, np.ndarray]:
+        # `Portfolio.membership` holds unsigned counts, long and short legs are told apart here
+        index = {key: i for i, key in enumerate(self.portfolio.instruments)}
+        rows, cols, counts = [], [], []
+        stock_counts = np.zeros(len(positions))
+        for i, position in enumerate(positions):
+            for c in position.contracts:
+                if c.subtype() is None:
+                    stock_counts[i] += c.signed_count()
+                elif c.expiration_date() is not None:
+                    rows.append(i)
+                    cols.append(index[(c.get_price(), c.subtype(), c.expiration_date(), c.exercise)])
+                    counts.append(c.signed_count())
+        membership = csr_matrix((np.array(counts, dtype=float), (rows, cols)),
+                                shape=(len(positions), len(self.portfolio.instruments)))
+        return membership, stock_counts
+
+    @staticmethod
+    def __settlement_index(dates: np.ndarray, exp_date) -> np.ndarray:
+        return np.maximum(np.searchsorted(dates, exp_date, side="right") - 1, 0)
+
+    def __settled_values(self, dates: np.ndarray, prices: np.ndarray, valuation_dates: np.ndarray,
+                         valuation_prices: np.ndarray) -> np.ndarray:
+        # instruments expired by the valuation dates are worth their intrinsic value at the settlement price,
+        # stock settled ones are carried as the exercised stock at the valuation price
+        if self.settlement == Settlement.CASH:
+            settlement_prices = prices[self.__settlement_index(dates, self.__exp_dates)][:, np.newaxis]
+        else:
+            settlement_prices = valuation_prices
+        strikes = self.portfolio.strikes[:, np.newaxis]
+        intrinsic = np.maximum(np.where(self.portfolio.is_call[:, np.newaxis], settlement_prices - strikes,
+                                        strikes - settlement_prices), 0)
+        t_days = -np.busday_count(self.__exp_dates[:, np.newaxis], valuation_dates)
+        return intrinsic * self.settlement.carry(self.r, t_days)
+
+    def __instrument_values(self, dates: np.ndarray, prices: np.ndarray, sigma: np.ndarray) -> np.ndarray:
+        portfolio = self.portfolio
+        exp_dates = self.__exp_dates[:, np.newaxis]
+        expired = dates >= exp_dates
+        # workdays in [date, exp_date) plus one, and minus the workdays since expiration once expired
+        t_days = np.where(expired, -np.busday_count(exp_dates, dates), np.busday_count(dates, exp_dates) + 1)
+        t_days = t_days.astype(float)
+        strikes = portfolio.strikes[:, np.newaxis]
+        is_call = portfolio.is_call[:, np.newaxis]
+        values = option_values(prices, strikes, self.r, sigma, t_days, is_call)
+        am = portfolio.is_american & ~expired.all(axis=1)
+        if am.any():
+            live = ~expired[am]
+            s = np.broadcast_to(prices, live.shape)
+            am_values = values[am]
+            am_values[live] = american_option_values(
+                s[live], np.broadcast_to(strikes[am], live.shape)[live], self.r,
+                np.broadcast_to(sigma, live.shape)[live], t_days[am][live],
+                np.broadcast_to(is_call[am], live.shape)[live], Position.LATTICE_STEPS)
+            values[am] = am_values
+
+        return np.where(expired, self.__settled_values(dates, prices, dates, prices), values)
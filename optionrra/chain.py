@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from optionrra.model import ContractType, ExerciseStyle, OptionContract, OptionType, Position
+
+
+def _to_datetime64(exp_date) -> np.datetime64:
+    return np.datetime64(exp_date, "s")
+
+
+class OptionChain:
+    """
+    Quotes of all listed options of an underlying, kept as sorted columnar arrays.
+
+    Rows are sorted by expiration date, option type (puts first) and strike,
+    so the options of one expiration and type form a contiguous block of increasing strikes.
+    Lookups by expiration, strike or moneyness are binary searches over these blocks.
+    Contracts and positions are minted straight from rows, see `contract` and `position`.
+    """
+
+    def __init__(self, strikes, is_call, exp_dates, premiums, is_american=False):
+        strikes = np.asarray(strikes, dtype=float)
+        is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), strikes.shape)
+        exp_dates = np.broadcast_to(np.asarray(exp_dates, dtype="<M8[s]"), strikes.shape)
+        premiums = np.broadcast_to(np.asarray(premiums, dtype=float), strikes.shape)
+        is_american = np.broadcast_to(np.asarray(is_american, dtype=bool), strikes.shape)
+        if strikes.ndim != 1:
+            raise ValueError(f"Not a valid option chain shape {strikes.shape}")
+        if np.isnat(exp_dates).any():
+            raise ValueError("Option chain quotes require an expiration date")
+
+        order = np.lexsort((strikes, is_call, exp_dates))
+        self.strikes = strikes[order]
+        self.is_call = is_call[order]
+        self.exp_dates = exp_dates[order]
+        self.premiums = premiums[order]
+        self.is_american = is_american[order]
+        self.expirations, exp_starts = np.unique(self.exp_dates, return_index=True)
+        # rows of the i-th expiration: puts in [bounds[i, 0], bounds[i, 1]), calls in [bounds[i, 1], bounds[i, 2])
+        exp_ends = np.append(exp_starts[1:], len(self.strikes))
+        puts_counts = np.add.reduceat((~self.is_call).astype(int), exp_starts) if len(exp_starts) > 0 else 0
+        calls_starts = exp_starts + puts_counts
+        self.__bounds = np.stack([exp_starts, calls_starts, exp_ends], axis=1)
+
+    @staticmethod
+    def from_contracts(contracts: List[OptionContract]) -> OptionChain:
+        return OptionChain(
+            [c.get_price() for c in contracts],
+            [c.subtype() == OptionType.CALL for c in contracts],
+            [_to_datetime64(c.expiration_date()) if c.expiration_date() is not None else "NaT" for c in contracts],
+            [c.get_value() for c in contracts],
+            [c.exercise == ExerciseStyle.AMERICAN for c in contracts],
+        )
+
+    @staticmethod
+    def from_str_list(str_contracts: List[str]) -> OptionChain:
+        """
+        Builds a chain out of option contract strings, counts are ignored,
+        e.g. ["+1 95 call 6.25 2023-03-15", "+1 95 put 4.5 2023-03-15"]
+
+        :param str_contracts: Option contract strings, see `OptionContract.from_str`
+        :return: OptionChain
+        """
+        return OptionChain.from_contracts([OptionContract.from_str(s) for s in str_contracts])
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def expiration_index(self, exp_date) -> int:
+        """
+        Index of an expiration date in `expirations`
+
+        :param exp_date: Expiration date
+        :return: int
+        """
+        exp_date = _to_datetime64(exp_date)
+        i = int(np.searchsorted(self.expirations, exp_date))
+        if i == len(self.expirations) or self.expirations[i] != exp_date:
+            raise KeyError(f"No options expire at {exp_date}")
+        return i
+
+    def nearest_expiration(self, exp_date) -> datetime:
+        """
+        Listed expiration date closest to `exp_date`, the earlier one wins a tie
+
+        :param exp_date: Any date
+        :return: datetime
+        """
+        if len(self.expirations) == 0:
+            raise KeyError("Option chain is empty")
+        exp_date = _to_datetime64(exp_date)
+        i = int(np.searchsorted(self.expirations, exp_date))
+        if i == len(self.expirations):
+            i -= 1
+        elif i > 0 and exp_date - self.expirations[i - 1] <= self.expirations[i] - exp_date:
+            i -= 1
+        return self.expirations[i].astype(datetime)
+
+    def rows(self, exp_date, option_type: OptionType = None) -> slice:
+        """
+        Rows of options of an expiration date, optionally of a single option type
+
+        :param exp_date: Expiration date
+        :param option_type: Option type, both calls and puts by default
+        :return: slice of rows sorted by strike within every option type
+        """
+        lo, mid, hi = self.__bounds[self.expiration_index(exp_date)]
+        if option_type is None:
+            return slice(int(lo), int(hi))
+        if option_type == OptionType.PUT:
+            return slice(int(lo), int(mid))
+        return slice(int(mid), int(hi))
+
+    def find(self, strike: float, option_type: OptionType, exp_date) -> Optional[int]:
+        """
+        Row of an option or `None` if it is not listed
+
+        :param strike: Strike price
+        :param option_type: Option type
+        :param exp_date: Expiration date
+        :return: int or None
+        """
+        rows = self.rows(exp_date, option_type)
+        i = rows.start + int(np.searchsorted(self.strikes[rows], strike))
+        if i < rows.stop and self.strikes[i] == strike:
+            return i
+        return None
+
+    def nearest_strikes(self, prices, option_type: OptionType, exp_date) -> np.ndarray:
+        """
+        Rows of options with strikes closest to every price, the lower strike wins a tie
+
+        :param prices: Prices, e.g. the current underlying price
+        :param option_type: Option type
+        :param exp_date: Expiration date
+        :return: np.ndarray of rows of the shape of `prices`
+        """
+        rows = self.rows(exp_date, option_type)
+        strikes = self.strikes[rows]
+        if len(strikes) == 0:
+            raise KeyError(f"No {option_type.value} options expire at {exp_date}")
+
+        prices = np.asarray(prices, dtype=float)
+        i = np.searchsorted(strikes, prices)
+        lower = np.clip(i - 1, 0, len(strikes) - 1)
+        upper = np.clip(i, 0, len(strikes) - 1)
+        nearest = np.where(np.abs(prices - strikes[lower]) <= np.abs(strikes[upper] - prices), lower, upper)
+        return rows.start + nearest
+
+    def nearest_strike(self, price: float, option_type: OptionType, exp_date) -> int:
+        return int(self.nearest_strikes(price, option_type, exp_date))
+
+    def strikes_between(self, lo: float, hi: float, option_type: OptionType, exp_date) -> slice:
+        """
+        Rows of options with strikes in [`lo`, `hi`]
+
+        :param lo: Lowest strike
+        :param hi: Highest strike
+        :param option_type: Option type
+        :param exp_date: Expiration date
+        :return: slice of rows sorted by strike
+        """
+        rows = self.rows(exp_date, option_type)
+        strikes = self.strikes[rows]
+        return slice(rows.start + int(np.searchsorted(strikes, lo, side="left")),
+                     rows.start + int(np.searchsorted(strikes, hi, side="right")))
+
+    def moneyness_between(self, spot: float, lo: float, hi: float, option_type: OptionType, exp_date) -> slice:
+        """
+        Rows of options with moneyness, strike / spot, in [`lo`, `hi`]
+
+        :param spot: Current underlying price
+        :param lo: Lowest moneyness, e.g. 0.9
+        :param hi: Highest moneyness, e.g. 1.1
+        :param option_type: Option type
+        :param exp_date: Expiration date
+        :return: slice of rows sorted by strike
+        """
+        if spot <= 0:
+            raise ValueError("Not a valid spot price")
+        return self.strikes_between(lo * spot, hi * spot, option_type, exp_date)
+
+    def contract(self, row: int, count: int = 1) -> OptionContract:
+        """
+        Mints an option contract out of a chain row
+
+        :param row: Chain row
+        :param count: Signed number of contracts, positive for long and negative for short contracts
+        :return: OptionContract
+        """
+        if count == 0:
+            raise ValueError("Not a valid contracts count")
+        return OptionContract(
+            abs(count),
+            ContractType.LONG if count > 0 else ContractType.SHORT,
+            float(self.premiums[row]),
+            OptionType.CALL if self.is_call[row] else OptionType.PUT,
+            float(self.strikes[row]),
+            self.exp_dates[row].astype(datetime),
+            ExerciseStyle.AMERICAN if self.is_american[row] else ExerciseStyle.EUROPEAN,
+        )
+
+    def position(self, legs: List[Tuple[int, int]]) -> Position:
+        """
+        Mints a position out of (row, signed count) pairs, see `contract`
+
+        :param legs: Position legs
+        :return: Position
+        """
+        return Position([self.contract(row, count) for row, count in legs])
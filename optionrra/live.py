@@ -0,0 +1,208 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import AsyncIterator, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from optionrra.misc.dateutils import num_workdays_between
+from optionrra.model import Position, Settlement
+from optionrra.portfolio import Portfolio
+from optionrra.pricing.binomial_model import american_option_values
+
+Timestamp = Union[datetime, float]
+
+
+@dataclass
+class LiveUpdate:
+    """
+    Valuation of every position at a tick, `taylor` tells whether it is a Greek based approximation
+    """
+    timestamp: Timestamp
+    spot: float
+    sigma: float
+    values: np.ndarray
+    pl: np.ndarray
+    book_pl: float
+    taylor: bool
+
+
+class LiveStats:
+    """
+    Tick counts of a `LiveValuation`
+    """
+
+    def __init__(self):
+        self.ticks = 0
+        self.full_revaluations = 0
+        self.taylor_updates = 0
+        self.day_rolls = 0
+
+    def report(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "full_revaluations": self.full_revaluations,
+            "taylor_updates": self.taylor_updates,
+            "day_rolls": self.day_rolls,
+        }
+
+
+class LiveValuation:
+    """
+    Reprices a book of positions on every tick of the underlying.
+
+    Legs of all positions are netted into unique instruments once, see `Portfolio`.
+    Everything that depends on the valuation day only, i.e. times to expiration, discount and carry factors
+    and log strikes, is computed on the first tick of a day. A tick then recomputes only what depends on spot
+    and volatility: one vectorized Black-Scholes pass with delta, gamma and vega of every instrument.
+
+    With a positive `taylor_tolerance` ticks moving the spot by at most that relative amount since the last full
+    revaluation, and the volatility by at most `vol_tolerance`, are valued with a second order Taylor expansion
+    of every position in spot and first order in volatility, which costs a few operations per position.
+    American instruments are priced with the lattice and their Greeks are bumped on full revaluations only.
+    """
+    AMERICAN_BUMP: float = 0.01
+
+    def __init__(self, positions: List[Position], sigma: float, r: float = 0.05, taylor_tolerance: float = 0.0,
+                 vol_tolerance: float = 0.0, settlement: Settlement = Settlement.CASH):
+        if sigma <= 0:
+            raise ValueError("Not a valid sigma")
+        if taylor_tolerance < 0 or vol_tolerance < 0:
+            raise ValueError("Not a valid Taylor tolerance")
+
+        self.portfolio = Portfolio(positions)
+        self.sigma = sigma
+        self.r = r
+        self.taylor_tolerance = taylor_tolerance
+        self.vol_tolerance = vol_tolerance
+        self.settlement = settlement
+        self.stats = LiveStats()
+        self.__abs_entry_costs = np.abs(self.portfolio.entry_costs)
+        self.__log_strikes = np.log(self.portfolio.strikes)
+        self.__exp_dates = [exp_date for _, _, exp_date, _ in self.portfolio.instruments]
+        self.__sign = np.where(self.portfolio.is_call, 1.0, -1.0)
+        self.__day: date = None
+        # spot, sigma and position values and Greeks of the last full revaluation
+        self.__anchor: Tuple[float, float, np.ndarray, np.ndarray, np.ndarray, np.ndarray] = None
+
+    def __roll(self, moment: datetime):
+        # per-instrument state of a valuation day
+        t_days = np.array([num_workdays_between(moment, exp_date) + 1 for exp_date in self.__exp_dates], dtype=float)
+        self.__t_days = t_days
+        self.__expired = t_days <= 0
+        self.__t = np.where(self.__expired, 1.0, t_days) / 365
+        self.__sqrt_t = np.sqrt(self.__t)
+        self.__rate_term = self.r * self.__t
+        self.__discounted_strikes = self.portfolio.strikes * np.exp(-self.__rate_term)
+        self.__carry = self.settlement.carry(self.r, t_days)
+        self.__day = moment.date()
+        self.__anchor = None
+        self.stats.day_rolls += 1
+
+    def __instruments(self, spot: float, sigma: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # scipy is imported on first use, the same way `optionrra.pricing.black_scholes_model` does
+        from scipy.special import ndtr
+
+        sigma_sqrt_t = sigma * self.__sqrt_t
+        d1 = (np.log(spot) - self.__log_strikes + self.__rate_term + 0.5 * sigma_sqrt_t ** 2) / sigma_sqrt_t
+        n_d1, n_d2 = ndtr(d1), ndtr(d1 - sigma_sqrt_t)
+        pdf_d1 = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+
+        is_call = self.portfolio.is_call
+        values = np.where(is_call, spot * n_d1 - self.__discounted_strikes * n_d2,
+                          self.__discounted_strikes * (1 - n_d2) - spot * (1 - n_d1))
+        delta = np.where(is_call, n_d1, n_d1 - 1)
+        gamma = pdf_d1 / (spot * sigma_sqrt_t)
+        vega = spot * pdf_d1 * self.__sqrt_t
+
+        # expired instruments are worth their intrinsic value
+        in_money = self.__sign * (spot - self.portfolio.strikes) > 0
+        values = np.where(self.__expired, np.maximum(self.__sign * (spot - self.portfolio.strikes), 0), values)
+        delta = np.where(self.__expired, np.where(in_money, self.__sign, 0.0), delta)
+        gamma = np.where(self.__expired, 0.0, gamma)
+        vega = np.where(self.__expired, 0.0, vega)
+
+        am = self.portfolio.is_american
+        if am.any():
+            h = self.AMERICAN_BUMP * spot
+            bumped = american_option_values(np.array([spot - h, spot, spot + h])[:, np.newaxis],
+                                            self.portfolio.strikes[am], self.r, sigma, self.__t_days[am],
+                                            is_call[am], Position.LATTICE_STEPS)
+            values[am] = bumped[1]
+            delta[am] = (bumped[2] - bumped[0]) / (2 * h)
+            gamma[am] = (bumped[2] - 2 * bumped[1] + bumped[0]) / h ** 2
+            vega[am] = (american_option_values(spot, self.portfolio.strikes[am], self.r, sigma + 0.01,
+                                               self.__t_days[am], is_call[am], Position.LATTICE_STEPS)
+                        - bumped[1]) / 0.01
+        return values * self.__carry, delta * self.__carry, gamma * self.__carry, vega * self.__carry
+
+    def __revalue(self, spot: float, sigma: float) -> np.ndarray:
+        values, delta, gamma, vega = self.__instruments(spot, sigma)
+        membership = self.portfolio.membership
+        position_values = membership @ values + self.portfolio.stock_counts * spot - self.portfolio.stock_costs
+        position_delta = membership @ delta + self.portfolio.stock_counts
+        self.__anchor = (spot, sigma, position_values, position_delta, membership @ gamma, membership @ vega)
+        return position_values
+
+    def __within_tolerance(self, spot: float, sigma: float) -> bool:
+        if self.__anchor is None or self.taylor_tolerance == 0:
+            return False
+        anchor_spot, anchor_sigma = self.__anchor[0], self.__anchor[1]
+        return abs(spot / anchor_spot - 1) <= self.taylor_tolerance and abs(sigma - anchor_sigma) <= self.vol_tolerance
+
+    def update(self, timestamp: Timestamp, spot: float, sigma: float = None) -> LiveUpdate:
+        """
+        Values every position at a tick
+
+        :param timestamp: Tick time, a datetime or POSIX timestamp
+        :param spot: Underlying price
+        :param sigma: Optional new volatility, the last one is kept by default
+        :return: LiveUpdate
+        """
+        if spot <= 0:
+            raise ValueError("Not a valid spot price")
+        if sigma is not None:
+            if sigma <= 0:
+                raise ValueError("Not a valid sigma")
+            self.sigma = sigma
+
+        moment = timestamp if isinstance(timestamp, datetime) else datetime.fromtimestamp(timestamp)
+        if moment.date() != self.__day:
+            self.__roll(moment)
+
+        self.stats.ticks += 1
+        taylor = self.__within_tolerance(spot, self.sigma)
+        if taylor:
+            anchor_spot, anchor_sigma, values, delta, gamma, vega = self.__anchor
+            ds, dv = spot - anchor_spot, self.sigma - anchor_sigma
+            values = values + delta * ds + 0.5 * gamma * ds ** 2 + vega * dv
+            self.stats.taylor_updates += 1
+        else:
+            values = self.__revalue(spot, self.sigma)
+            self.stats.full_revaluations += 1
+
+        pl = values - self.__abs_entry_costs
+        return LiveUpdate(timestamp, spot, self.sigma, values, pl, float(pl.sum()), taylor)
+
+    def stream(self, ticks: Iterable[tuple]) -> Iterator[LiveUpdate]:
+        """
+        Values every position at every tick of (timestamp, spot) or (timestamp, spot, sigma) tuples
+
+        :param ticks: Iterable of ticks
+        :return: iterator of LiveUpdate
+        """
+        for tick in ticks:
+            yield self.update(*tick)
+
+    async def astream(self, ticks: asyncio.Queue) -> AsyncIterator[LiveUpdate]:
+        """
+        Asynchronous `stream` consuming ticks from a queue until a `None` tick
+
+        :param ticks: Queue of ticks
+        :return: async iterator of LiveUpdate
+        """
+        while True:
+            tick = await ticks.get()
+            if tick is None:
+                break
+            yield self.update(*tick)
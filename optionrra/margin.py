@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from optionrra.model import ContractType, OptionContract, OptionType, Position
+from optionrra.pl.platexp import positions_expiration_bounds
+from optionrra.portfolio import Portfolio
+
+NAKED_CALL = "naked_call"
+NAKED_PUT = "naked_put"
+COVERED_CALL = "covered_call"
+COVERED_PUT = "covered_put"
+CALL_SPREAD = "call_spread"
+PUT_SPREAD = "put_spread"
+LONG_OPTION = "long_option"
+
+
+@dataclass(frozen=True)
+class MarginStructure:
+    """
+    Offsetting structure a number of short option legs are margined as, `legs` are (short, long) for spreads
+    """
+    kind: str
+    count: int
+    legs: Tuple[OptionContract, ...]
+
+
+class MarginCalculator:
+    """
+    Reg-T style capital requirement of every position of a book over stock price scenarios.
+
+    Legs of every position are classified once into offsetting structures, see `structures`:
+    short calls are covered by long stock and short puts by short stock first, the rest are paired into
+    vertical spreads with long options of the same type expiring no earlier, the narrowest spread first,
+    and what is left is naked. A requirement is then the sum of
+
+    - `STOCK_RATE` of the value of stock legs
+    - the max loss at expiration of every spread and the premium of every unpaired long option
+    - the value plus `NAKED_RATE` of the stock price less the out of the money amount, but at least `NAKED_MIN_RATE`
+      of the stock price for calls and of the strike for puts, of every naked short option
+
+    capped by the max loss at expiration of positions whose options all expire together, see `expiration_bounds`.
+    Structures are computed once, so a new set of scenarios costs a single `Portfolio` pricing pass of the book
+    and a few array operations.
+    """
+    STOCK_RATE: float = 0.5
+    NAKED_RATE: float = 0.2
+    NAKED_MIN_RATE: float = 0.1
+
+    def __init__(self, positions: List[Position]):
+        self.portfolio = Portfolio(positions)
+        index = {key: i for i, key in enumerate(self.portfolio.instruments)}
+        self.structures = [self.__classify(p) for p in positions]
+
+        naked = [(i, s) for i, structures in enumerate(self.structures) for s in structures
+                 if s.kind in (NAKED_CALL, NAKED_PUT)]
+        self.__naked_instruments = np.array([index[self.__key(s.legs[0])] for _, s in naked], dtype=int)
+        self.__naked_counts = np.array([s.count for _, s in naked], dtype=float)
+        self.__naked_strikes = np.array([s.legs[0].get_price() for _, s in naked], dtype=float)
+        self.__naked_calls = np.array([s.kind == NAKED_CALL for _, s in naked], dtype=bool)
+        self.__naked_membership = csr_matrix(
+            (np.ones(len(naked)), ([i for i, _ in naked], np.arange(len(naked)))), shape=(len(positions), len(naked)))
+        self.__fixed = np.array([sum(self.__fixed_requirement(s) for s in structures)
+                                 for structures in self.structures], dtype=float)
+        self.__abs_stock_counts = np.array([abs(sum(c.signed_count() for c in p.contracts if c.subtype() is None))
+                                            for p in positions], dtype=float)
+        # the payoff at a single expiration bounds the loss of positions whose options all expire together
+        _, max_loss = positions_expiration_bounds(positions)
+        self.max_loss = np.where(np.isnan(max_loss), np.inf, max_loss)
+
+    @staticmethod
+    def __key(c: OptionContract):
+        return c.get_price(), c.subtype(), c.expiration_date(), c.exercise
+
+    def __classify(self, position: Position) -> List[MarginStructure]:
+        stock = sum(c.signed_count() for c in position.contracts if c.subtype() is None)
+        options = [c for c in position.contracts if c.subtype() is not None and c.expiration_date() is not None]
+        structures = []
+        for option_type, cover, covered_kind, spread_kind, naked_kind in [
+            (OptionType.CALL, max(stock, 0), COVERED_CALL, CALL_SPREAD, NAKED_CALL),
+            (OptionType.PUT, max(-stock, 0), COVERED_PUT, PUT_SPREAD, NAKED_PUT),
+        ]:
+            legs = [c for c in options if c.subtype() == option_type]
+            # the narrowest spread has the lowest long call strike and the highest long put strike
+            longs = [[c, c.count] for c in sorted((c for c in legs if c.type == ContractType.LONG),
+                                                  key=lambda c: c.get_price(),
+                                                  reverse=option_type == OptionType.PUT)]
+            # the deepest in the money shorts are covered first, since they require the most when naked
+            shorts = sorted((c for c in legs if c.type == ContractType.SHORT), key=lambda c: c.get_price(),
+                            reverse=option_type == OptionType.PUT)
+            for short in shorts:
+                left = short.count
+                covered = min(left, cover)
+                if covered > 0:
+                    structures.append(MarginStructure(covered_kind, covered, (short,)))
+                    cover -= covered
+                    left -= covered
+                for long in longs:
+                    if left == 0:
+                        break
+                    if long[1] == 0 or long[0].expiration_date() < short.expiration_date():
+                        continue
+                    paired = min(left, long[1])
+                    structures.append(MarginStructure(spread_kind, paired, (short, long[0])))
+                    long[1] -= paired
+                    left -= paired
+                if left > 0:
+                    structures.append(MarginStructure(naked_kind, left, (short,)))
+            structures.extend(MarginStructure(LONG_OPTION, left, (c,)) for c, left in longs if left > 0)
+        return structures
+
+    @staticmethod
+    def __fixed_requirement(s: MarginStructure) -> float:
+        if s.kind == LONG_OPTION:
+            return s.count * s.legs[0].get_value()
+        if s.kind in (CALL_SPREAD, PUT_SPREAD):
+            short, long = s.legs
+            sign = 1 if s.kind == CALL_SPREAD else -1
+            width = max(sign * (long.get_price() - short.get_price()), 0)
+            # max loss at expiration of the spread, the credit received is counted against the width
+            return s.count * max(width - short.get_value() + long.get_value(), 0)
+        return 0.0
+
+    def requirements(self, stock_prices, sigma: float, r: float = 0.05, t: int = 0) -> np.ndarray:
+        """
+        Capital requirement of every position at every stock price
+
+        :param stock_prices: Underlying stock price scenarios
+        :param sigma: Standard deviation of stock or underlying contract, naked options are valued with it
+        :param r: risk-free rate
+        :param t: Days passed from today
+        :return: np.ndarray of shape (positions, stock prices)
+        """
+        prices = np.atleast_1d(np.asarray(stock_prices, dtype=float))
+        requirements = np.outer(self.STOCK_RATE * self.__abs_stock_counts, prices)
+        requirements += self.__fixed[:, np.newaxis]
+        if len(self.__naked_counts) > 0:
+            values = self.portfolio.instrument_values(prices, sigma, r, t)[self.__naked_instruments]
+            strikes = self.__naked_strikes[:, np.newaxis]
+            is_call = self.__naked_calls[:, np.newaxis]
+            out_of_money = np.maximum(np.where(is_call, strikes - prices, prices - strikes), 0)
+            minimum = self.NAKED_MIN_RATE * np.where(is_call, prices, strikes)
+            naked = values + np.maximum(self.NAKED_RATE * prices - out_of_money, minimum)
+            requirements += self.__naked_membership @ (self.__naked_counts[:, np.newaxis] * naked)
+        return np.maximum(np.minimum(requirements, self.max_loss[:, np.newaxis]), 0)
+
+    def book_requirements(self, stock_prices, sigma: float, r: float = 0.05, t: int = 0) -> np.ndarray:
+        """
+        Capital requirement of the whole book at every stock price, see `requirements`
+
+        :param stock_prices: Underlying stock price scenarios
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param t: Days passed from today
+        :return: np.ndarray of shape (stock prices,)
+        """
+        return self.requirements(stock_prices, sigma, r, t).sum(axis=0)
@@ -1,6 +1,8 @@
 from datetime import datetime, date, timedelta
 from functools import partial
 
+from optionrra.misc.instrumentation import instrumented
+
 
 def daterange(d_from: date, d_to: date):
     days_delta = d_to - d_from
@@ -8,6 +10,7 @@ def daterange(d_from: date, d_to: date):
         yield d_from + timedelta(n)
 
 
+@instrumented("misc.num_workdays_between")
 def num_workdays_between(d_from: date, d_to: date) -> int:
     work_days = 0
     for d in daterange(d_from, d_to):
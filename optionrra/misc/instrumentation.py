@@ -0,0 +1,125 @@
+import json
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Dict, IO
+
+
+class StageStats:
+    __slots__ = ("calls", "total_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+
+
+class StageRegistry:
+    """
+    Call counts and accumulated wall time per instrumented stage.
+
+    Time of nested stages is inclusive, e.g. `model.theoretical_value` includes `pricing.norm_cdf`.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+        self.__lock = threading.Lock()
+
+    def record(self, stage: str, elapsed: float):
+        with self.__lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats()
+            stats.calls += 1
+            stats.total_time += elapsed
+
+    def reset(self):
+        with self.__lock:
+            self.stages = {}
+
+    def report(self) -> dict:
+        """
+        Structured report of all stages sorted by accumulated wall time
+
+        :return: dict
+        """
+        stages = sorted(self.stages.items(), key=lambda item: item[1].total_time, reverse=True)
+        return {
+            "stages": [
+                {
+                    "stage": stage,
+                    "calls": stats.calls,
+                    "total_s": stats.total_time,
+                    "mean_us": stats.total_time / stats.calls * 1e6,
+                }
+                for stage, stats in stages
+            ]
+        }
+
+    def dump(self, f: IO[str]):
+        json.dump(self.report(), f, indent=2)
+
+
+class _State:
+    enabled = False
+    registry = StageRegistry()
+
+
+def instrumented(stage: str):
+    """
+    Decorator counting calls and accumulating wall time of a function under the `stage` name.
+
+    Nothing is measured unless instrumentation is enabled, see `enable` and `profile`,
+    a disabled stage costs a single attribute lookup on top of the function call.
+
+    :param stage: Stage name, prefixed with the package it belongs to, e.g. `pricing.norm_cdf`
+    :return: decorator
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _State.enabled:
+                return fn(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _State.registry.record(stage, perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def enable():
+    _State.enabled = True
+
+
+def disable():
+    _State.enabled = False
+
+
+def is_enabled() -> bool:
+    return _State.enabled
+
+
+def registry() -> StageRegistry:
+    return _State.registry
+
+
+@contextmanager
+def profile():
+    """
+    Enables instrumentation within the block and yields a fresh registry of the stages measured in it
+
+    Usage:
+
+        with profile() as stages:
+            PositionPLCalendar(position).expected_returns_simulation((90, 110), 0.4, 0.05)
+        stages.dump(sys.stdout)
+    """
+    prev_enabled, prev_registry = _State.enabled, _State.registry
+    _State.registry = StageRegistry()
+    _State.enabled = True
+    try:
+        yield _State.registry
+    finally:
+        _State.enabled, _State.registry = prev_enabled, prev_registry
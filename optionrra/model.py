@@ -2,13 +2,18 @@ from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
 from enum import Enum
-from dataclasses import dataclass
-from dateutil.parser import parse
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Tuple
 
+import numpy as np
+
 from optionrra.misc.dateutils import num_workdays_until
-from optionrra.pricing.black_scholes_model import option_value
+from optionrra.misc.instrumentation import instrumented
+from optionrra.pricing.binomial_model import DEFAULT_STEPS, american_option_values
+from optionrra.pricing.black_scholes_model import option_value, option_values
+from optionrra.pricing.dividends import dividends_pv, dividends_received, escrowed_prices
+from optionrra.pricing.dtypes import compute_dtype
 
 
 class ContractType(Enum):
@@ -20,6 +25,83 @@ class ContractSubtype(Enum):
     pass
 
 
+class Settlement(Enum):
+    """
+    How an option leg is carried once it expired before the valuation day.
+
+    Either way the leg is settled at its intrinsic value. `CASH` settled legs accrue interest at the risk-free rate
+    from the expiration day on, `STOCK` settled legs are carried as the exercised stock at the valuation price.
+    """
+    CASH = 'cash'
+    STOCK = 'stock'
+
+    def carry(self, r: float, t_days):
+        """
+        Growth factor of a leg value, `t_days` is the time to expiration so expired legs have non-positive `t_days`
+
+        :param r: risk-free rate
+        :param t_days: time to expiration in days
+        :return: float or np.ndarray
+        """
+        if self == Settlement.CASH:
+            return np.exp(r * np.maximum(-np.asarray(t_days, dtype=float), 0) / 365)
+        return np.ones_like(t_days, dtype=float)
+
+
+@dataclass
+class DividendSchedule:
+    """
+    Dividends of the underlying stock: a continuous yield `q` and discrete cash dividends
+    as (ex-dividend date, amount) pairs.
+
+    Options are valued on the stock price less the present value of dividends going ex before they expire,
+    stock legs are valued with the dividends received up to the valuation day.
+    """
+    q: float = 0.0
+    payments: List[Tuple[datetime, float]] = field(default_factory=list)
+
+    def ex_days(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Days until every ex-dividend date, counted the same way as days until expiration of option legs
+
+        :return: tuple of ex days and amounts
+        """
+        return np.array([num_workdays_until(d) + 1 for d, _ in self.payments], dtype=float), \
+            np.array([amount for _, amount in self.payments], dtype=float)
+
+    def pv(self, r: float, days, t_days) -> np.ndarray:
+        """
+        Present value of dividends going ex during the remaining life of option legs, see `dividends_pv`
+
+        :param r: risk-free rate
+        :param days: Days passed from today
+        :param t_days: Time to expiration in days, broadcast against `days`
+        :return: np.ndarray of the broadcast shape of `days` and `t_days`
+        """
+        if len(self.payments) == 0:
+            return np.zeros(np.broadcast(np.asarray(days), np.asarray(t_days)).shape)
+        ex_days, amounts = self.ex_days()
+        return dividends_pv(ex_days, amounts, r, days, t_days)
+
+    def stock_values(self, stock_prices, r: float, days) -> np.ndarray:
+        """
+        Value of a share held since today, the continuous yield is reinvested into the stock
+        and discrete dividends accrue interest from their ex-dividend date on
+
+        :param stock_prices: Underlying stock prices
+        :param r: risk-free rate
+        :param days: Days passed from today
+        :return: np.ndarray of shape (stock prices, days)
+        """
+        prices = np.atleast_1d(np.asarray(stock_prices, dtype=float))
+        days = np.atleast_1d(np.asarray(days, dtype=float))
+        values = prices[:, np.newaxis] * np.exp(self.q * days / 365)[np.newaxis, :]
+        if len(self.payments) > 0:
+            ex_days, amounts = self.ex_days()
+            values += dividends_received(ex_days, amounts, r, days)[np.newaxis, :]
+        return values
+
+
 @dataclass
 class Contract(metaclass=ABCMeta):
     PRICE_SIGN_MAP = {
@@ -71,9 +153,18 @@ class Contract(metaclass=ABCMeta):
     def price_sign(self):
         return self.PRICE_SIGN_MAP[self.get_type_value()]
 
+    def signed_count(self) -> int:
+        return self.count if self.type == ContractType.LONG else -self.count
+
     def __str__(self):
         return f"+{self.count}" if self.type == ContractType.LONG else f"-{self.count}"
 
+    def to_full_str(self) -> str:
+        """
+        Contract string `from_str` parses back into the same contract, unlike `__str__` it keeps all attributes
+        """
+        return str(self)
+
     def __hash__(self):
         return hash(self.__str__())
 
@@ -129,6 +220,11 @@ class OptionType(ContractSubtype):
     PUT = 'put'
 
 
+class ExerciseStyle(Enum):
+    EUROPEAN = 'european'
+    AMERICAN = 'american'
+
+
 @dataclass
 class OptionContract(Contract):
     IN_MONEY_SLOPE_MAP = {
@@ -141,6 +237,7 @@ class OptionContract(Contract):
     option_type: OptionType
     strike_price: float
     exp_date: datetime = None
+    exercise: ExerciseStyle = ExerciseStyle.EUROPEAN
 
     def get_price(self) -> float:
         return self.strike_price
@@ -191,8 +288,17 @@ class OptionContract(Contract):
             option_type = OptionType[params[2].upper()]
             premium = float(params[3])
             contract_type = ContractType.LONG if int(count) > 0 else ContractType.SHORT
-            exp_date = parse(params[4]) if len(params) > 4 else None
-            return OptionContract(abs(count), contract_type, premium, option_type, strike, exp_date)
+            exp_date = None
+            exercise = ExerciseStyle.EUROPEAN
+            # optional expiration date and exercise style, e.g. "+1 95 put 6.25 2023-03-15 american"
+            for param in params[4:]:
+                if param.upper() in ExerciseStyle.__members__:
+                    exercise = ExerciseStyle[param.upper()]
+                else:
+                    # dateutil is imported on first use to keep `import optionrra.model` fast
+                    from dateutil.parser import parse
+                    exp_date = parse(param)
+            return OptionContract(abs(count), contract_type, premium, option_type, strike, exp_date, exercise)
         except Exception as e:
             raise ValueError(f"Cant build an OptionContract object from input {s}. Error {e}")
 
@@ -200,12 +306,18 @@ class OptionContract(Contract):
         s = super().__str__()
         return f"{s} {self.strike_price} {self.get_option_type_value()} {self.premium}"
 
+    def to_full_str(self) -> str:
+        exp_date = f" {self.exp_date.isoformat()}" if self.exp_date is not None else ""
+        return f"{self}{exp_date} {self.exercise.value}"
+
     def __hash__(self):
         return hash(self.__str__())
 
 
 class Position:
+    LATTICE_STEPS: int = DEFAULT_STEPS
 
+    @instrumented("model.position_init")
     def __init__(self, contracts: List[Contract]):
         self.contracts = sorted(set(contracts), key=lambda c: c.get_price())
         self.all_strikes = self.__get_all_strikes()
@@ -214,20 +326,32 @@ class Position:
         self.pl_at_strike = self.__pl_at_strike()
         self.min_expiration_date, self.max_expiration_date = self.__min_max_exp_date()
         self.entry_cost = self.__entry_cost()
+        self.__option_legs = None
 
     @staticmethod
+    @instrumented("model.from_str_list")
     def from_str_list(str_contracts: List[str]) -> Position:
+        return Position(Position.contracts_from_str_list(str_contracts))
+
+    @staticmethod
+    def contracts_from_str_list(str_contracts: List[str]) -> List[Contract]:
         contracts = []
         for s in str_contracts:
             if s.find("stock") >= 0:
                 contracts.append(StockContract.from_str(s))
             else:
                 contracts.append(OptionContract.from_str(s))
-        return Position(contracts)
+        return contracts
 
     def to_str_list(self):
         return [str(c) for c in self.contracts]
 
+    def to_full_str_list(self) -> List[str]:
+        """
+        Contract strings `from_str_list` parses back into the same position, see `Contract.to_full_str`
+        """
+        return [c.to_full_str() for c in self.contracts]
+
     def __get_all_strikes(self):
         prices = []
         prev_price = -1
@@ -242,8 +366,8 @@ class Position:
         return prices
 
     def __min_max_exp_date(self) -> Tuple[datetime, datetime]:
-        min_exp_date = parse("2199-01-01")
-        max_exp_date = parse("1970-01-01")
+        min_exp_date = datetime(2199, 1, 1)
+        max_exp_date = datetime(1970, 1, 1)
         for c in self.contracts:
             exp_date = c.expiration_date()
             if exp_date is None:
@@ -263,6 +387,7 @@ class Position:
             res[price] = self.pl_at_expiration(price)
         return res
 
+    @instrumented("model.pl_at_expiration")
     def pl_at_expiration(self, exp_price: float):
         total_pl = 0
         for c in self.contracts:
@@ -275,24 +400,120 @@ class Position:
             total_cost += c.price_sign() * c.count * c.get_value()
         return total_cost
 
-    def theoretical_value(self, stock_price: float, sigma: float, r: float = 0.05, t: int = 0):
+    @instrumented("model.theoretical_value")
+    def theoretical_value(self, stock_price: float, sigma: float, r: float = 0.05, t: int = 0,
+                          settlement: Settlement = Settlement.CASH, dividends: DividendSchedule = None):
         """
         Calculates option position theoretical value
 
+        American legs are priced with a binomial lattice of `LATTICE_STEPS` steps.
+        Legs which expired before `t` are settled at intrinsic value and carried according to `settlement`.
+        With `dividends` options are priced on the escrowed stock price and stock legs collect dividends.
+
         :param stock_price: Current underlying stock price
         :param sigma: Standard deviation of stock or underlying contract
         :param r: risk-free rate
         :param t: Time to expiration in days
+        :param settlement: How expired legs are carried
+        :param dividends: Optional dividends of the underlying stock
         :return:
         """
         position_value = 0
         for c in self.contracts:
             if c.subtype() is None:
-                position_value += c.count * (stock_price - c.get_price())
+                stock_value = stock_price if dividends is None else float(dividends.stock_values(stock_price, r, t))
+                position_value += c.count * (stock_value - c.get_price())
             elif c.subtype() == OptionType.CALL or c.subtype() == OptionType.PUT:
                 value = 0
                 if c.expiration_date() is not None:
                     days = num_workdays_until(c.expiration_date()) + 1 - t
-                    value = option_value(stock_price, c.get_price(), r, sigma, days, c.subtype().value[0])
+                    if dividends is None:
+                        s, q = stock_price, 0.0
+                    else:
+                        s, q = float(escrowed_prices(stock_price, dividends.pv(r, t, days))), dividends.q
+                    if c.exercise == ExerciseStyle.AMERICAN:
+                        value = float(american_option_values(s, c.get_price(), r, sigma, days,
+                                                             c.subtype() == OptionType.CALL, self.LATTICE_STEPS, q))
+                    elif dividends is None:
+                        value = option_value(s, c.get_price(), r, sigma, days, c.subtype().value[0])
+                    else:
+                        value = option_value(s, c.get_price(), r, sigma, days, c.subtype().value[0], q)
+                    if days < 0:
+                        value *= settlement.carry(r, days)
                 position_value += c.count * value
         return position_value
+
+    def __get_option_legs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # computed on first use, since counting workdays is not free and most positions are never valued on a grid
+        if self.__option_legs is None:
+            legs = [c for c in self.contracts if c.subtype() is not None and c.expiration_date() is not None]
+            self.__option_legs = (
+                np.array([c.get_price() for c in legs], dtype=float),
+                np.array([c.subtype() == OptionType.CALL for c in legs], dtype=bool),
+                np.array([c.count for c in legs], dtype=float),
+                np.array([num_workdays_until(c.expiration_date()) + 1 for c in legs], dtype=float),
+                np.array([c.exercise == ExerciseStyle.AMERICAN for c in legs], dtype=bool),
+            )
+        return self.__option_legs
+
+    def legs_time_to_expiration(self, days) -> np.ndarray:
+        """
+        Time to expiration of every option leg with expiration date over the whole days axis
+
+        :param days: Days passed from today
+        :return: np.ndarray of shape (option legs, days)
+        """
+        _, _, _, days_until_expiration, _ = self.__get_option_legs()
+        return days_until_expiration[:, np.newaxis] - np.atleast_1d(np.asarray(days, dtype=float))[np.newaxis, :]
+
+    @instrumented("model.theoretical_values")
+    def theoretical_values(self, stock_prices, sigma: float, r: float = 0.05, days=0,
+                           settlement: Settlement = Settlement.CASH, dividends: DividendSchedule = None,
+                           approximate: bool = False, dtype=np.float64) -> np.ndarray:
+        """
+        Vectorized `theoretical_value` over a stock prices × days grid
+
+        The time to expiration of every leg is computed once for the whole days axis,
+        so legs of different expirations are each priced or settled on their own schedule.
+        Present values of dividends are computed per leg and day the same way,
+        so the whole grid is still priced in a single broadcast.
+        Legs are priced and values are returned in `dtype`, see `compute_dtype`.
+
+        :param stock_prices: Underlying stock prices
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param days: Days passed from today
+        :param settlement: How expired legs are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param approximate: Prices european legs from the lookup table, see `PriceTable`
+        :param dtype: Compute dtype, np.float64 or np.float32
+        :return: np.ndarray of shape (stock prices, days)
+        """
+        prices = np.atleast_1d(np.asarray(stock_prices, dtype=float))
+        days = np.atleast_1d(np.asarray(days, dtype=float))
+        values = np.zeros((len(prices), len(days)), dtype=compute_dtype(dtype))
+        stock_values = prices[:, np.newaxis] if dividends is None else dividends.stock_values(prices, r, days)
+        for c in self.contracts:
+            if c.subtype() is None:
+                values += c.count * (stock_values - c.get_price())
+
+        strikes, is_call, counts, _, is_american = self.__get_option_legs()
+        if len(strikes) > 0:
+            t_days = self.legs_time_to_expiration(days)
+            s, q = prices[np.newaxis, :, np.newaxis], 0.0
+            if dividends is not None:
+                # present values of dividends of every leg and day, shared by all stock prices
+                s = escrowed_prices(s, dividends.pv(r, days, t_days)[:, np.newaxis, :])
+                q = dividends.q
+            t_days = t_days[:, np.newaxis, :]
+            legs_values = option_values(s, strikes[:, np.newaxis, np.newaxis], r, sigma,
+                                        t_days, is_call[:, np.newaxis, np.newaxis], q, approximate, dtype)
+            if is_american.any():
+                # lattices of all american legs, prices and days are stacked and priced together
+                s = np.broadcast_to(s, legs_values.shape)
+                legs_values[is_american] = american_option_values(
+                    s[is_american], strikes[is_american, np.newaxis, np.newaxis], r, sigma,
+                    t_days[is_american], is_call[is_american, np.newaxis, np.newaxis], self.LATTICE_STEPS, q, dtype)
+            legs_values *= settlement.carry(r, t_days)
+            values += np.tensordot(counts.astype(values.dtype), legs_values, axes=1)
+        return values
@@ -1,11 +1,77 @@
 from sys import maxsize
+from typing import List, Tuple
 
+import numpy as np
+
+from optionrra.misc.instrumentation import instrumented
 from optionrra.model import OptionType, Position
 
 
+def expiration_bounds(strikes: np.ndarray, is_call: np.ndarray, counts, costs) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized max gain and max loss at expiration of many positions, losses are positive numbers
+
+    The payoff at expiration is linear between strikes, so its extremes are at zero, at a strike or at infinity,
+    where it grows with the net number of calls. A stock leg is a call of zero strike.
+    Positions of fewer legs are padded with legs of zero count.
+
+    :param strikes: Strikes of shape (positions, legs)
+    :param is_call: Boolean mask of shape (positions, legs), `True` for call and `False` for put options
+    :param counts: Signed number of contracts of shape (positions, legs) or (legs,) shared by all positions
+    :param costs: Net entry cost, positive for debit, of shape (positions,)
+    :return: tuple of max gain and max loss of shape (positions,), infinite when unbounded
+    """
+    strikes = np.asarray(strikes, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+    counts = np.asarray(counts, dtype=float)
+    kinks = np.concatenate([np.zeros((len(strikes), 1)), strikes], axis=1)
+    # max(sign * (price - strike), 0) is the intrinsic value of both calls and puts
+    sign = np.where(is_call, 1.0, -1.0)[:, np.newaxis, :]
+    intrinsic = np.maximum(sign * (kinks[:, :, np.newaxis] - strikes[:, np.newaxis, :]), 0)
+    if counts.ndim == 1:
+        payoffs = intrinsic @ counts
+        slope = is_call @ counts
+    else:
+        payoffs = np.einsum("nkl,nl->nk", intrinsic, counts)
+        slope = np.sum(is_call * counts, axis=1)
+    payoffs -= np.asarray(costs, dtype=float)[:, np.newaxis]
+    return np.where(slope > 0, np.inf, payoffs.max(axis=1)), np.where(slope < 0, np.inf, -payoffs.min(axis=1))
+
+
+def positions_expiration_bounds(positions: List[Position], credits=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Max gain and max loss at expiration of positions, see `expiration_bounds`
+
+    The payoff at a single expiration bounds positions whose options all expire together only,
+    both bounds are NaN for the others. Options without expiration date are left out.
+
+    :param positions: Positions
+    :param credits: Optional amounts already received by every position, e.g. realized PL, of shape (positions,)
+    :return: tuple of max gain and max loss of shape (positions,)
+    """
+    legs = [[c for c in p.contracts if c.subtype() is None or c.expiration_date() is not None] for p in positions]
+    width = max(max(len(contracts) for contracts in legs), 1)
+    strikes, is_call, counts = np.zeros((3, len(positions), width))
+    costs = np.zeros(len(positions))
+    for i, contracts in enumerate(legs):
+        for j, c in enumerate(contracts):
+            # a stock leg is a call of zero strike
+            strikes[i, j] = 0.0 if c.subtype() is None else c.get_price()
+            is_call[i, j] = c.subtype() != OptionType.PUT
+            counts[i, j] = c.signed_count()
+            costs[i] += c.signed_count() * c.get_value()
+    if credits is not None:
+        costs -= np.asarray(credits, dtype=float)
+    max_gain, max_loss = expiration_bounds(strikes, is_call.astype(bool), counts, costs)
+    single_expiration = np.array([len({c.expiration_date() for c in contracts if c.subtype() is not None}) <= 1
+                                  for contracts in legs], dtype=bool)
+    return np.where(single_expiration, max_gain, np.nan), np.where(single_expiration, max_loss, np.nan)
+
+
 class PositionPLAtExpiration:
     LAST_PRICE_INTERVAL_MULTIPLIER = 1.1
 
+    @instrumented("pl.platexp")
     def __init__(self, position: Position):
         # we assume contracts in a position are sorted
         self.position = position
@@ -39,18 +105,21 @@ class PositionPLAtExpiration:
                 total_slope += slope * c.count
         return total_slope
 
+    @instrumented("pl.platexp.slopes")
     def __slopes(self):
         d = {}
         for lo, hi in self.price_intervals:
             d[f"{lo}-{hi}"] = self.__slope_between_interval(lo, hi)
         return d
 
+    @instrumented("pl.platexp.adjusted_slopes")
     def __adjusted_slopes(self):
         d = {}
         for lo, hi in self.adj_price_intervals:
             d[f"{lo}-{hi}"] = self.__slope_between_interval(lo, hi)
         return d
 
+    @instrumented("pl.platexp.adjusted_price_intervals")
     def __adjusted_price_intervals(self):
         slope_direction_count = 0
         prev_slope = maxsize
@@ -79,7 +148,7 @@ class PositionPLAtExpiration:
 
                 elif slope_direction_count >= 1 and slope == prev_slope:
                     lo_prev, hi_prev = intervals[-1]
-                    intervals[i - slope_direction_count] = (lo_prev, hi)
+                    intervals[-1] = (lo_prev, hi)
                     slope_direction_count += 1
 
                 if slope != prev_slope:
@@ -96,6 +165,7 @@ class PositionPLAtExpiration:
             return s1 != s2
         return (s1 ^ s2) < 0
 
+    @instrumented("pl.platexp.pl_points")
     def __pl_points(self):
         points = []
         position_num = len(self.position.contracts)
@@ -1,7 +1,9 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
 from sys import maxsize
+from typing import List, Tuple
 
-import matplotlib.pyplot as plt
-from matplotlib.ticker import FormatStrFormatter
 import numpy as np
 
 
@@ -9,6 +11,34 @@ def line_slope(y2, y1, x2, x1):
     return (y2 - y1) / (x2 - x1)
 
 
+def _style_axes(ax):
+    # matplotlib is imported on first use, so graphing never slows down the compute path
+    from matplotlib.ticker import FormatStrFormatter
+
+    ax.set_ylabel('P&L at expiration')
+
+    # Draw a hline at y=0 that spans the xrange
+    ax.axhline(color='#000000', linestyle="dotted")
+
+    ax.xaxis.set_major_formatter(FormatStrFormatter('%.2f'))
+    ax.yaxis.set_major_formatter(FormatStrFormatter('%.2f'))
+
+    # tick params
+    ax.tick_params(labeltop=True, labelbottom=False, bottom=False, labelright=True)
+
+
+def new_figure(figsize: Tuple[float, float], dpi: int):
+    """
+    Creates a figure bound to the non-interactive Agg canvas, pyplot global state is never touched
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(figure)
+    return figure
+
+
 class PLAtExpirationGraph:
     HEAD_TAIL_MULT = 0.15
 
@@ -44,17 +74,12 @@ class PLAtExpirationGraph:
 
         return tail_points, head_points
 
-    def draw(self):
-        plt.ylabel('P&L at expiration')
-
-        plt.title(self.title)
+    def plot_points(self) -> List[Tuple[float, float]]:
+        """
+        PL points sorted by price and extended with tail and head points
 
-        # Draw a hline at y=0 that spans the xrange
-        plt.axhline(color='#000000', linestyle="dotted")
-
-        all_prices = []
-        all_x = []
-        all_y = []
+        :return: list of points
+        """
         sorted_points = sorted(self.pl_points, key=lambda point: point[0])
 
         tail, head = self.__calc_tail_and_head_points(sorted_points)
@@ -64,7 +89,22 @@ class PLAtExpirationGraph:
         if len(head) == 2:
             sorted_points = sorted_points + [head]
 
-        print(sorted_points)
+        return sorted_points
+
+    def draw_artists(self, ax) -> list:
+        """
+        Draws the data artists of the graph, title, ticks and axis limits onto an axes styled with `_style_axes`
+
+        :param ax: matplotlib axes
+        :return: list of created artists
+        """
+        ax.set_title(self.title)
+        artists = []
+
+        all_prices = []
+        all_x = []
+        all_y = []
+        sorted_points = self.plot_points()
 
         points_len = len(sorted_points)
         lowest_y = maxsize
@@ -72,7 +112,7 @@ class PLAtExpirationGraph:
         for i, p in enumerate(sorted_points):
             x, y = p
             if 0 < i < points_len - 1:
-                plt.axvline(x=x, color='#000000', linestyle="dotted")
+                artists.append(ax.axvline(x=x, color='#000000', linestyle="dotted"))
             all_x.append(x)
             all_y.append(y)
             if y < lowest_y:
@@ -81,31 +121,28 @@ class PLAtExpirationGraph:
             if y > highest_y:
                 highest_y = y
             all_prices.append(x)
-        plt.plot(all_x, all_y, label='Position PL')
+        artists.extend(ax.plot(all_x, all_y, label='Position PL'))
 
         # fill losses
         x_losses = np.array([p[0] for p in sorted_points if p[1] <= 0])
         y1_losses = np.array([p[1] for p in sorted_points if p[1] <= 0])
         y2_losses = np.zeros(len(y1_losses))
-        plt.fill_between(x_losses, y1_losses, y2_losses,
-                         where=(y2_losses > y1_losses), color='r', alpha=0.3,
-                         interpolate=True)
+        artists.append(ax.fill_between(x_losses, y1_losses, y2_losses,
+                                       where=(y2_losses > y1_losses), color='r', alpha=0.3,
+                                       interpolate=True))
 
         # fill profits
         x_profits = np.array([p[0] for p in sorted_points if p[1] >= 0])
         y1_profits = np.array([p[1] for p in sorted_points if p[1] >= 0])
         y2_profits = np.zeros(len(y1_profits))
-        plt.fill_between(x_profits, y1_profits, y2_profits,
-                         where=(y2_profits <= y1_profits), color='g', alpha=0.3,
-                         interpolate=True)
+        artists.append(ax.fill_between(x_profits, y1_profits, y2_profits,
+                                       where=(y2_profits <= y1_profits), color='g', alpha=0.3,
+                                       interpolate=True))
 
         yticks = all_y[1:-1]
-        plt.yticks(yticks)
+        ax.set_yticks(yticks)
         xticks = all_prices[1:]
-        plt.xticks(xticks)
-
-        plt.gca().xaxis.set_major_formatter(FormatStrFormatter('%.2f'))
-        plt.gca().yaxis.set_major_formatter(FormatStrFormatter('%.2f'))
+        ax.set_xticks(xticks)
 
         min_price = all_prices[1] if all_prices[0] == 0 else all_prices[0]
         max_price = all_prices[-1]
@@ -113,9 +150,100 @@ class PLAtExpirationGraph:
         max_y = max(abs(lowest_y), abs(highest_y)) + 2
 
         # axis
-        plt.axis([min_price, max_price, -max_y, max_y])
+        ax.axis([min_price, max_price, -max_y, max_y])
+        return artists
 
-        # tick params
-        plt.tick_params(labeltop=True, labelbottom=False, bottom=False, labelright=True)
+    def render(self, ax):
+        _style_axes(ax)
+        self.draw_artists(ax)
 
+    def draw(self):
+        """
+        Shows the graph in an interactive pyplot window
+        """
+        import matplotlib.pyplot as plt
+
+        self.render(plt.gca())
         plt.show()
+
+    def save(self, fname, fmt: str = None, figsize: Tuple[float, float] = (8, 6), dpi: int = 100):
+        """
+        Renders the graph into a file without any interactive backend
+
+        :param fname: Path or a binary file object
+        :param fmt: Image format, e.g. "png" or "svg", inferred from `fname` by default
+        :param figsize: Figure size in inches
+        :param dpi: Figure resolution
+        """
+        figure = new_figure(figsize, dpi)
+        self.render(figure.add_subplot())
+        figure.savefig(fname, format=fmt)
+
+    def to_bytes(self, fmt: str = "png", figsize: Tuple[float, float] = (8, 6), dpi: int = 100) -> bytes:
+        buffer = io.BytesIO()
+        self.save(buffer, fmt, figsize, dpi)
+        return buffer.getvalue()
+
+
+class PLGraphTemplate:
+    """
+    Reusable figure for rendering many PL graphs.
+
+    The figure, axes and their static styling are created once, only the data artists are swapped between graphs.
+    """
+
+    def __init__(self, figsize: Tuple[float, float] = (8, 6), dpi: int = 100):
+        self.figure = new_figure(figsize, dpi)
+        self.ax = self.figure.add_subplot()
+        _style_axes(self.ax)
+        self.__artists = []
+
+    def render(self, graph: PLAtExpirationGraph):
+        for artist in self.__artists:
+            artist.remove()
+        self.__artists = graph.draw_artists(self.ax)
+        return self.figure
+
+    def save(self, graph: PLAtExpirationGraph, fname, fmt: str = None):
+        self.render(graph).savefig(fname, format=fmt)
+
+    def to_bytes(self, graph: PLAtExpirationGraph, fmt: str = "png") -> bytes:
+        buffer = io.BytesIO()
+        self.save(graph, buffer, fmt)
+        return buffer.getvalue()
+
+
+_worker_template: PLGraphTemplate = None
+
+
+def _init_worker(figsize: Tuple[float, float], dpi: int):
+    global _worker_template
+    _worker_template = PLGraphTemplate(figsize, dpi)
+
+
+def _save_chunk(chunk: List[Tuple[str, PLAtExpirationGraph]]) -> List[str]:
+    for fname, graph in chunk:
+        _worker_template.save(graph, fname)
+    return [fname for fname, _ in chunk]
+
+
+def render_batch(graphs: List[Tuple[str, PLAtExpirationGraph]], processes: int = None,
+                 figsize: Tuple[float, float] = (8, 6), dpi: int = 100) -> List[str]:
+    """
+    Renders many graphs into files across a process pool, every worker reuses a single `PLGraphTemplate`
+
+    :param graphs: A list of (file name, graph) pairs, image format is inferred from the file name
+    :param processes: Number of worker processes, `os.cpu_count()` by default. `1` renders in the calling process
+    :param figsize: Figure size in inches
+    :param dpi: Figure resolution
+    :return: list of rendered file names
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        _init_worker(figsize, dpi)
+        return _save_chunk(graphs)
+
+    chunk_size = max(1, len(graphs) // (processes * 4))
+    chunks = [graphs[i:i + chunk_size] for i in range(0, len(graphs), chunk_size)]
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(figsize, dpi)) as executor:
+        return [fname for rendered in executor.map(_save_chunk, chunks) for fname in rendered]
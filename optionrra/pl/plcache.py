@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from optionrra.model import DividendSchedule, Position
+from optionrra.pl.plcalendar import PositionPLCalendar, open_memmap
+
+
+class PLGridCache:
+    """
+    Content-addressed on-disk cache of `PositionPLCalendar.expected_returns_simulation` grids.
+
+    Grids are stored as `.npy` files named after a hash of the position contents, price range, sigma, r,
+    lattice steps and valuation date, so a warm run memory-maps the stored grid instead of recomputing it.
+    A small json index keeps sizes and access times used for least recently used eviction
+    once the cache grows over `max_bytes`.
+    """
+    INDEX_FILE_NAME = "index.json"
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_bytes <= 0:
+            raise ValueError("Not a valid max_bytes")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self.index = self.__load_index()
+
+    @staticmethod
+    def key(position: Position, price_range: Tuple[float, float], sigma: float, r: float,
+            valuation_date: date = None, dividends: DividendSchedule = None) -> str:
+        """
+        Builds a cache key out of everything a PL grid depends on
+
+        :param position: Option position
+        :param price_range: A tuple of underlying stock expected low and high price range
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param valuation_date: Date the grid was computed at, today by default
+        :param dividends: Optional dividends of the underlying stock
+        :return: str
+        """
+        valuation_date = valuation_date or date.today()
+        content = {
+            "contracts": sorted(position.to_full_str_list()),
+            "price_range": [float(p) for p in price_range],
+            "sigma": float(sigma),
+            "r": float(r),
+            "valuation_date": valuation_date.isoformat(),
+            "samples": [PositionPLCalendar.MAX_PRICE_SAMPLE_NUMBER, PositionPLCalendar.MAX_DATE_SAMPLE_NUMBER],
+            # american legs are priced with a lattice of this many steps
+            "lattice_steps": Position.LATTICE_STEPS,
+        }
+        if dividends is not None:
+            content["dividends"] = {
+                "q": float(dividends.q),
+                "payments": [[d.isoformat(), float(amount)] for d, amount in dividends.payments],
+            }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Returns a read-only memory-mapped grid or `None` in case of a cache miss
+
+        :param key: Cache key, see `PLGridCache.key`
+        :return: np.ndarray or None
+        """
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+
+        path = self.__path(key)
+        if not os.path.exists(path):
+            del self.index[key]
+            self.__save_index()
+            return None
+
+        entry["last_access"] = time.time()
+        self.__save_index()
+        return np.load(path, mmap_mode="r")
+
+    def put(self, key: str, grid: np.ndarray) -> np.ndarray:
+        """
+        Stores a grid and evicts least recently used grids if the cache is over its size limit
+
+        :param key: Cache key, see `PLGridCache.key`
+        :param grid: PL grid
+        :return: read-only memory-mapped stored grid
+        """
+        path = self.__path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, grid)
+        return self.__register(key, tmp_path)
+
+    def expected_returns_simulation(self, calendar: PositionPLCalendar, price_range: Tuple[float, float],
+                                    sigma: float, r: float, valuation_date: date = None,
+                                    dividends: DividendSchedule = None) -> np.ndarray:
+        """
+        Cached version of `PositionPLCalendar.expected_returns_simulation`
+
+        Grids are computed relative to today, so other valuation dates are rejected.
+
+        :param calendar: Position PL calendar
+        :param price_range: A tuple of underlying stock expected low and high price range
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param valuation_date: Date the grid is computed at, only today is valid
+        :param dividends: Optional dividends of the underlying stock
+        :return: np.ndarray
+        """
+        if valuation_date is not None and valuation_date != date.today():
+            raise ValueError(f"Not a valid valuation_date {valuation_date}, grids are computed as of today")
+
+        key = self.key(calendar.position, price_range, sigma, r, valuation_date, dividends)
+        grid = self.get(key)
+        if grid is None:
+            # the grid is written straight into the cache file, no in-memory copy is kept
+            tmp_path = f"{self.__path(key)}.tmp"
+            out = open_memmap(tmp_path, calendar.expected_returns_shape(price_range))
+            calendar.expected_returns_simulation(price_range, sigma, r, out=out, dividends=dividends)
+            out.flush()
+            del out
+            grid = self.__register(key, tmp_path)
+        return grid
+
+    def __register(self, key: str, tmp_path: str) -> np.ndarray:
+        path = self.__path(key)
+        os.replace(tmp_path, path)
+        now = time.time()
+        self.index[key] = {"size": os.path.getsize(path), "created": now, "last_access": now}
+        self.__evict(keep=key)
+        self.__save_index()
+        return np.load(path, mmap_mode="r")
+
+    def size(self) -> int:
+        return sum(entry["size"] for entry in self.index.values())
+
+    def __evict(self, keep: str):
+        total_size = self.size()
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_access"]):
+            if total_size <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total_size -= self.index.pop(key)["size"]
+            try:
+                os.remove(self.__path(key))
+            except FileNotFoundError:
+                pass
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def __load_index(self) -> Dict[str, dict]:
+        path = os.path.join(self.directory, self.INDEX_FILE_NAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def __save_index(self):
+        path = os.path.join(self.directory, self.INDEX_FILE_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, path)
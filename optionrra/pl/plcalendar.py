@@ -1,13 +1,17 @@
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 import numpy as np
 
 from optionrra.misc.dateutils import num_workdays_until
-from optionrra.model import Position
+from optionrra.misc.instrumentation import instrumented
+from optionrra.model import DividendSchedule, Position, Settlement
+from optionrra.pricing.dtypes import compute_dtype
 
 
 class PositionPLCalendar:
     MAX_DATE_SAMPLE_NUMBER: int = 15
     MAX_PRICE_SAMPLE_NUMBER: int = 10
+    ADAPTIVE_TOLERANCE: float = 0.01
+    MAX_ADAPTIVE_PRICE_SAMPLE_NUMBER: int = 512
 
     def __init__(self, position: Position):
         self.position = position
@@ -17,15 +21,21 @@ class PositionPLCalendar:
         """
         Return evenly spaced days range over the [`0`, `max_expiration_date + 1`] interval.
 
+        Expiration days of legs expiring before `max_expiration_date` are added to the range,
+        so the days their settlement starts are always sampled.
+
         :return:
         """
         num_days_until_exp = num_workdays_until(self.position.max_expiration_date) + 1
         samples_num = min(num_days_until_exp, self.MAX_DATE_SAMPLE_NUMBER)
         if samples_num < 10:
-            return list(np.arange(0, samples_num))
+            days_interval = [int(d) for d in np.arange(0, samples_num)]
+        else:
+            days_interval = [int(d) for d in np.linspace(0, num_days_until_exp, samples_num)]
 
-        days_interval = np.linspace(0, num_days_until_exp, samples_num)
-        return [int(d) for d in days_interval]
+        exp_dates = {c.expiration_date() for c in self.position.contracts if c.expiration_date() is not None}
+        settlement_days = {num_workdays_until(d) + 1 for d in exp_dates if d != self.position.max_expiration_date}
+        return sorted(set(days_interval) | {d for d in settlement_days if 0 <= d <= days_interval[-1]})
 
     def generate_stock_price_interval(self, price_range: Tuple[float, float]) -> List[float]:
         lo, hi = price_range
@@ -34,7 +44,99 @@ class PositionPLCalendar:
 
         return list(np.linspace(lo, hi, self.MAX_PRICE_SAMPLE_NUMBER))
 
-    def expected_returns_simulation(self, price_range: Tuple[float, float], sigma: float, r: float) -> np.array:
+    def price_axis_seeds(self, price_range: Tuple[float, float], sigma: float, r: float,
+                         settlement: Settlement = Settlement.CASH, dividends: DividendSchedule = None) -> np.ndarray:
+        """
+        Prices every adaptive price axis starts with: the uniform `generate_stock_price_interval`,
+        strikes of the position and breakevens of its expiration curve within the price range
+
+        The curve at the end of the days range is linear between strikes, so its breakevens are found exactly
+        by linear interpolation of the curve at the strikes.
+
+        :param price_range: A tuple of underlying stock expected low and high price range
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param settlement: How legs expiring before the end of the days range are carried
+        :param dividends: Optional dividends of the underlying stock
+        :return: np.ndarray of sorted unique prices
+        """
+        lo, hi = price_range
+        uniform = np.asarray(self.generate_stock_price_interval(price_range), dtype=float)
+        strikes = np.asarray(self.position.all_strikes, dtype=float)
+        kinks = np.unique(np.concatenate([[lo, hi], strikes[(strikes > lo) & (strikes < hi)]]))
+        pl = self.position.theoretical_values(kinks, sigma, r, self.days_until_expiration_interval[-1],
+                                              settlement, dividends)[:, 0] - abs(self.position.entry_cost)
+        crossing = np.flatnonzero(np.sign(pl[:-1]) * np.sign(pl[1:]) < 0)
+        breakevens = kinks[crossing] - pl[crossing] * (kinks[crossing + 1] - kinks[crossing]) \
+            / (pl[crossing + 1] - pl[crossing])
+        return np.unique(np.concatenate([uniform, kinks, breakevens]))
+
+    @instrumented("pl.plcalendar.adaptive_expected_returns_simulation")
+    def adaptive_expected_returns_simulation(self, price_range: Tuple[float, float], sigma: float, r: float,
+                                             tolerance: float = None, settlement: Settlement = Settlement.CASH,
+                                             dividends: DividendSchedule = None,
+                                             dtype=np.float64) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Simulates position "expected returns" over an adaptive price axis, see `refine_price_axis`
+
+        The axis starts with `price_axis_seeds` and is refined wherever linear interpolation between
+        neighbouring prices is off by more than `tolerance` on any day, so prices cluster around strikes
+        close to expiration and stay sparse where the surface is nearly linear.
+
+        :param price_range: A tuple of underlying stock expected low and high price range
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param tolerance: Max interpolation error of expected returns, `ADAPTIVE_TOLERANCE` by default
+        :param settlement: How legs expiring before the end of the days range are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param dtype: Compute dtype, see `compute_dtype`
+        :return: tuple of price interval and expected returns of shape (prices, days)
+        """
+        entry_cost = abs(self.position.entry_cost)
+
+        def expected_returns(prices: np.ndarray) -> np.ndarray:
+            return self.position.theoretical_values(prices, sigma, r, self.days_until_expiration_interval,
+                                                    settlement, dividends, dtype=dtype) - entry_cost
+
+        seeds = self.price_axis_seeds(price_range, sigma, r, settlement, dividends)
+        return refine_price_axis(expected_returns, seeds, self.ADAPTIVE_TOLERANCE if tolerance is None else tolerance,
+                                 self.MAX_ADAPTIVE_PRICE_SAMPLE_NUMBER)
+
+    def expiration_curve(self, price_range: Tuple[float, float], sigma: float, r: float,
+                         settlement: Settlement = Settlement.CASH,
+                         dividends: DividendSchedule = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Expected returns at the end of the days range over an adaptive price axis.
+
+        The curve is linear between strikes, so the seeds of the axis already represent it exactly
+        and refinement stops after checking every interval once.
+
+        :param price_range: A tuple of underlying stock expected low and high price range
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param settlement: How legs expiring before the end of the days range are carried
+        :param dividends: Optional dividends of the underlying stock
+        :return: tuple of price interval and expected returns of shape (prices,)
+        """
+        entry_cost = abs(self.position.entry_cost)
+        last_day = self.days_until_expiration_interval[-1]
+
+        def expected_returns(prices: np.ndarray) -> np.ndarray:
+            return self.position.theoretical_values(prices, sigma, r, last_day, settlement, dividends) - entry_cost
+
+        seeds = self.price_axis_seeds(price_range, sigma, r, settlement, dividends)
+        prices, pl = refine_price_axis(expected_returns, seeds, self.ADAPTIVE_TOLERANCE,
+                                       self.MAX_ADAPTIVE_PRICE_SAMPLE_NUMBER)
+        return prices, pl[:, 0]
+
+    def expected_returns_shape(self, price_range: Tuple[float, float]) -> Tuple[int, int]:
+        return len(self.generate_stock_price_interval(price_range)), len(self.days_until_expiration_interval)
+
+    @instrumented("pl.plcalendar.expected_returns_simulation")
+    def expected_returns_simulation(self, price_range: Tuple[float, float], sigma: float, r: float,
+                                    out: np.ndarray = None, settlement: Settlement = Settlement.CASH,
+                                    dividends: DividendSchedule = None, approximate: bool = False,
+                                    dtype=np.float64) -> np.array:
         """
         Simulates position "expected returns"
 
@@ -44,15 +146,84 @@ class PositionPLCalendar:
         :param price_range: A tuple of underlying stock expected low and high price range
         :param sigma: Standard deviation of stock or underlying contract
         :param r: risk-free rate
+        :param out: Optional caller-supplied or memory-mapped array the results are written into row by row,
+            see `open_memmap`
+        :param settlement: How legs expiring before the end of the days range are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param approximate: Prices european legs from the lookup table, see `PriceTable`
+        :param dtype: Compute dtype and dtype of the default `out` array, float32 halves memory of large grids
         :return:
         """
         position_entry_cost = self.position.entry_cost
         price_interval = self.generate_stock_price_interval(price_range)
-        expected_returns = np.zeros((len(price_interval), len(self.days_until_expiration_interval)))
+        shape = (len(price_interval), len(self.days_until_expiration_interval))
+        if out is None:
+            out = np.zeros(shape, dtype=compute_dtype(dtype))
+        elif out.shape != shape:
+            raise ValueError(f"Not a valid output array shape {out.shape}, expected {shape}")
+
+        # every row is valued over the whole days range at once, legs are priced on their own expiration schedule
         for i, price in enumerate(price_interval):
-            for j, t in enumerate(self.days_until_expiration_interval):
-                theoretical_value_t = self.position.theoretical_value(price, sigma, r, t)
-                value_at_t = theoretical_value_t - abs(position_entry_cost)
-                expected_returns[i, j] = value_at_t
+            theoretical_values = self.position.theoretical_values(price, sigma, r, self.days_until_expiration_interval,
+                                                                  settlement, dividends, approximate, dtype)
+            out[i, :] = theoretical_values[0] - abs(position_entry_cost)
+
+        return out
+
+
+def refine_price_axis(evaluate: Callable[[np.ndarray], np.ndarray], seeds, tolerance: float,
+                      max_samples: int = PositionPLCalendar.MAX_ADAPTIVE_PRICE_SAMPLE_NUMBER,
+                      min_step: float = 1e-6) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Adaptive price axis of a function of price, refined by interval bisection.
+
+    Every round evaluates midpoints of all intervals still being refined in a single `evaluate` call.
+    An interval whose midpoint differs from the linear interpolation of its ends by more than `tolerance`
+    in any column is split in two and both halves are refined further, otherwise it is done.
+    Refinement stops once no interval is left, the axis holds `max_samples` prices
+    or intervals get narrower than `min_step` of the price range.
+
+    :param evaluate: Function of an array of prices returning an array of shape (prices, columns)
+    :param seeds: Prices the axis starts with, the first and the last one are the price range
+    :param tolerance: Max interpolation error
+    :param max_samples: Max number of prices
+    :param min_step: Min interval width relative to the price range
+    :return: tuple of sorted prices and values of shape (prices, columns)
+    """
+    if tolerance <= 0:
+        raise ValueError("Not a valid tolerance")
+
+    prices = np.unique(np.asarray(seeds, dtype=float))
+    if len(prices) < 2:
+        raise ValueError("Not a valid price range")
+    values = np.asarray(evaluate(prices)).reshape(len(prices), -1)
+    min_width = min_step * (prices[-1] - prices[0])
+    # intervals [prices[i], prices[i + 1]] still being refined
+    refined = np.flatnonzero(np.diff(prices) > min_width)
+    while len(refined) > 0 and len(prices) < max_samples:
+        refined = refined[:max_samples - len(prices)]
+        mids = (prices[refined] + prices[refined + 1]) / 2
+        mid_values = np.asarray(evaluate(mids)).reshape(len(mids), -1)
+        errors = np.max(np.abs(mid_values - (values[refined] + values[refined + 1]) / 2), axis=1)
+
+        prices = np.insert(prices, refined + 1, mids)
+        values = np.insert(values, refined + 1, mid_values, axis=0)
+        # every insertion shifts later intervals by one, so the i-th midpoint lands at refined[i] + 1 + i
+        mids_at = refined + 1 + np.arange(len(refined))
+        split = mids_at[(errors > tolerance) & (mids - prices[mids_at - 1] > min_width)]
+        refined = np.sort(np.concatenate([split - 1, split]))
+    return prices, values
+
+
+def open_memmap(path: str, shape: Tuple[int, ...], dtype=np.float64) -> np.memmap:
+    """
+    Creates a `.npy` file backed memory-mapped array to be used as an `out` array of large simulations
+
+    The file can be loaded later with `np.load(path, mmap_mode="r")`.
 
-        return expected_returns
+    :param path: Path to `.npy` file
+    :param shape: Array shape
+    :param dtype: Array data type
+    :return: np.memmap
+    """
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
@@ -0,0 +1,99 @@
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+import numpy as np
+
+from optionrra.pl.platexpgraph import new_figure
+
+
+class PLCalendarGraph:
+    """
+    Heatmap of a `PositionPLCalendar.expected_returns_simulation` surface over price × days
+    with a breakeven contour.
+
+    The surface is used as is, e.g. a memory-mapped grid is never loaded as a whole.
+    Grids larger than `MAX_DISPLAY_PRICES` × `MAX_DISPLAY_DAYS` are downsampled for display with strided views.
+    """
+    MAX_DISPLAY_PRICES: int = 400
+    MAX_DISPLAY_DAYS: int = 400
+
+    def __init__(self, title: str, expected_returns: np.ndarray, price_interval, days_interval):
+        self.title = title
+        self.expected_returns = np.asarray(expected_returns)
+        self.price_interval = np.asarray(price_interval)
+        self.days_interval = np.asarray(days_interval)
+        if self.expected_returns.shape != (len(self.price_interval), len(self.days_interval)):
+            raise ValueError(f"Not a valid expected returns shape {self.expected_returns.shape}")
+
+    def display_grid(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Strided views of the surface and its axes, at most `MAX_DISPLAY_PRICES` × `MAX_DISPLAY_DAYS` large
+
+        :return: tuple of expected returns, price interval and days interval
+        """
+        price_step = math.ceil(len(self.price_interval) / self.MAX_DISPLAY_PRICES)
+        days_step = math.ceil(len(self.days_interval) / self.MAX_DISPLAY_DAYS)
+        return self.expected_returns[::price_step, ::days_step], \
+            self.price_interval[::price_step], self.days_interval[::days_step]
+
+    def render(self, figure, ax):
+        from matplotlib.colors import TwoSlopeNorm
+
+        grid, prices, days = self.display_grid()
+        lo, hi = float(np.min(grid)), float(np.max(grid))
+        # losses and profits are split by a white zero level whenever the surface crosses it
+        norm = TwoSlopeNorm(vmin=lo, vcenter=0, vmax=hi) if lo < 0 < hi else None
+        mesh = ax.pcolormesh(days, prices, grid, shading="nearest", cmap="RdYlGn", norm=norm)
+        figure.colorbar(mesh, ax=ax, label="Expected returns")
+
+        if lo < 0 < hi and grid.shape[0] > 1 and grid.shape[1] > 1:
+            ax.contour(days, prices, grid, levels=[0], colors="#000000", linestyles="dotted")
+
+        ax.set_title(self.title)
+        ax.set_xlabel("Days from today")
+        ax.set_ylabel("Underlying price")
+
+    def save(self, fname, fmt: str = None, figsize: Tuple[float, float] = (8, 6), dpi: int = 100):
+        """
+        Renders the heatmap into a file without any interactive backend
+
+        :param fname: Path or a binary file object
+        :param fmt: Image format, e.g. "png" or "svg", inferred from `fname` by default
+        :param figsize: Figure size in inches
+        :param dpi: Figure resolution
+        """
+        figure = new_figure(figsize, dpi)
+        self.render(figure, figure.add_subplot())
+        figure.savefig(fname, format=fmt)
+
+    def to_bytes(self, fmt: str = "png", figsize: Tuple[float, float] = (8, 6), dpi: int = 100) -> bytes:
+        buffer = io.BytesIO()
+        self.save(buffer, fmt, figsize, dpi)
+        return buffer.getvalue()
+
+
+def _save(item: Tuple[str, PLCalendarGraph]) -> str:
+    fname, graph = item
+    graph.save(fname)
+    return fname
+
+
+def render_batch(graphs: List[Tuple[str, PLCalendarGraph]], processes: int = None) -> List[str]:
+    """
+    Renders many heatmaps into files across a process pool
+
+    :param graphs: A list of (file name, graph) pairs, image format is inferred from the file name
+    :param processes: Number of worker processes, `os.cpu_count()` by default. `1` renders in the calling process
+    :return: list of rendered file names
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        return [_save(item) for item in graphs]
+
+    # only the displayed part of every surface is sent to the workers
+    graphs = [(fname, PLCalendarGraph(graph.title, *graph.display_grid())) for fname, graph in graphs]
+    with ProcessPoolExecutor(processes) as executor:
+        return list(executor.map(_save, graphs, chunksize=max(1, len(graphs) // (processes * 4))))
@@ -0,0 +1,159 @@
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from optionrra.model import Position
+from optionrra.pl.platexp import PositionPLAtExpiration
+
+Table = Dict[str, np.ndarray]
+
+
+class PLResultsBatch:
+    """
+    Columnar batch of analytics results of many positions.
+
+    Results are kept as tidy tables with labelled columns, every row refers to its position
+    through the `position` column holding an index into the `positions` table:
+
+    - `positions`: position, id, contracts, entry_cost, min_strike, max_strike
+    - `pl_points`: position, price, pl
+    - `slopes`: position, lo, hi, slope of adjusted price intervals
+    - `pl_at_strike`: position, strike, pl
+    - `expected_returns`: position, price, day, value of `PositionPLCalendar.expected_returns_simulation` grids
+
+    Tables are written to npz with `to_npz` or to parquet with `to_parquet` if pyarrow is installed.
+    """
+    TABLES = {
+        "positions": ["position", "id", "contracts", "entry_cost", "min_strike", "max_strike"],
+        "pl_points": ["position", "price", "pl"],
+        "slopes": ["position", "lo", "hi", "slope"],
+        "pl_at_strike": ["position", "strike", "pl"],
+        "expected_returns": ["position", "price", "day", "value"],
+    }
+
+    def __init__(self):
+        self.__columns: Dict[str, Dict[str, List[np.ndarray]]] = {
+            table: {column: [] for column in columns} for table, columns in self.TABLES.items()
+        }
+        self.__size = 0
+
+    def __len__(self):
+        return self.__size
+
+    def add(self, position_id: str, position: Position, pl_at_exp: PositionPLAtExpiration = None,
+            expected_returns: np.ndarray = None, price_interval=None, days_interval=None) -> int:
+        """
+        Adds results of a position
+
+        :param position_id: Position identifier
+        :param position: Option position
+        :param pl_at_exp: Optional PL at expiration of the position
+        :param expected_returns: Optional expected returns grid of the position
+        :param price_interval: Price axis of the expected returns grid
+        :param days_interval: Days axis of the expected returns grid
+        :return: index of the position in the batch
+        """
+        index = self.__size
+        self.__append("positions", index, {
+            "id": np.array([position_id]),
+            "contracts": np.array([";".join(position.to_full_str_list())]),
+            "entry_cost": np.array([position.entry_cost], dtype=float),
+            "min_strike": np.array([position.min_strike], dtype=float),
+            "max_strike": np.array([position.max_strike], dtype=float),
+        })
+        self.__append("pl_at_strike", index, {
+            "strike": np.fromiter(position.pl_at_strike.keys(), dtype=float, count=len(position.pl_at_strike)),
+            "pl": np.fromiter(position.pl_at_strike.values(), dtype=float, count=len(position.pl_at_strike)),
+        })
+
+        if pl_at_exp is not None:
+            points = np.asarray(pl_at_exp.pl_points, dtype=float).reshape(-1, 2)
+            self.__append("pl_points", index, {"price": points[:, 0], "pl": points[:, 1]})
+            intervals = np.asarray(pl_at_exp.adj_price_intervals, dtype=float).reshape(-1, 2)
+            self.__append("slopes", index, {
+                "lo": intervals[:, 0],
+                "hi": intervals[:, 1],
+                "slope": np.fromiter(pl_at_exp.adj_slopes.values(), dtype=float, count=len(pl_at_exp.adj_slopes)),
+            })
+
+        if expected_returns is not None:
+            grid = np.asarray(expected_returns)
+            prices = np.asarray(price_interval, dtype=float)
+            days = np.asarray(days_interval, dtype=int)
+            if grid.shape != (len(prices), len(days)):
+                raise ValueError(f"Not a valid expected returns shape {grid.shape}")
+            self.__append("expected_returns", index, {
+                "price": np.repeat(prices, len(days)),
+                "day": np.tile(days, len(prices)),
+                "value": grid.ravel(),
+            })
+
+        self.__size += 1
+        return index
+
+    def __append(self, table: str, index: int, columns: Table):
+        columns = {"position": np.full(len(next(iter(columns.values()))), index, dtype=np.int32), **columns}
+        for column, values in columns.items():
+            self.__columns[table][column].append(values)
+
+    def tables(self) -> Dict[str, Table]:
+        """
+        Concatenated columns of every table
+
+        :return: dict of tables, every table is a dict of equally long column arrays
+        """
+        tables = {}
+        for table, columns in self.__columns.items():
+            tables[table] = {
+                column: np.concatenate(chunks) if len(chunks) > 0 else np.array([])
+                for column, chunks in columns.items()
+            }
+        return tables
+
+    def to_npz(self, file, compressed: bool = True):
+        """
+        Writes all tables into a single npz file, arrays are named `<table>/<column>`, see `load_npz`
+
+        :param file: Path or a binary file object
+        :param compressed: Whether the npz file is compressed
+        """
+        arrays = {f"{table}/{column}": values for table, columns in self.tables().items()
+                  for column, values in columns.items()}
+        (np.savez_compressed if compressed else np.savez)(file, **arrays)
+
+    def to_parquet(self, directory: str) -> List[str]:
+        """
+        Writes every table into its own `<table>.parquet` file, requires pyarrow
+
+        :param directory: Output directory
+        :return: list of written files
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(f"pyarrow is required to export parquet files. Error {e}")
+
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for table, columns in self.tables().items():
+            path = os.path.join(directory, f"{table}.parquet")
+            pq.write_table(pa.table(columns), path)
+            paths.append(path)
+        return paths
+
+
+def load_npz(file) -> Dict[str, Table]:
+    """
+    Loads tables written by `PLResultsBatch.to_npz`
+
+    :param file: Path or a binary file object
+    :return: dict of tables
+    """
+    tables = {}
+    with np.load(file) as data:
+        for name in data.files:
+            table, column = name.split("/")
+            tables.setdefault(table, {})[column] = data[name]
+    return tables
@@ -0,0 +1,183 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from optionrra.misc.dateutils import num_workdays_until
+from optionrra.model import DividendSchedule, ExerciseStyle, OptionType, Position, Settlement
+from optionrra.pricing.binomial_model import american_option_values
+from optionrra.pricing.black_scholes_model import option_values
+from optionrra.pricing.dividends import escrowed_prices
+from optionrra.pricing.dtypes import compute_dtype
+
+
+class Portfolio:
+    """
+    A book of positions on the same underlying.
+
+    Option legs of all positions are netted into unique instruments by strike, option type, expiration date
+    and exercise style,
+    so every instrument is priced once per scenario no matter how many positions hold it.
+    Instrument values are scattered back to positions through a sparse membership matrix.
+    """
+
+    def __init__(self, positions: List[Position]):
+        if len(positions) == 0:
+            raise ValueError("Portfolio requires at least one position")
+
+        self.positions = positions
+        self.instruments: List[Tuple[float, OptionType, datetime, ExerciseStyle]] = []
+        self.membership = self.__membership()
+        self.stock_counts, self.stock_costs = self.__stock_legs()
+        self.entry_costs = np.array([p.entry_cost for p in self.positions], dtype=float)
+        self.strikes = np.array([strike for strike, _, _, _ in self.instruments], dtype=float)
+        self.is_call = np.array([option_type == OptionType.CALL for _, option_type, _, _ in self.instruments],
+                                dtype=bool)
+        self.days_until_expiration = np.array(
+            [num_workdays_until(exp_date) + 1 for _, _, exp_date, _ in self.instruments], dtype=float)
+        self.is_american = np.array([exercise == ExerciseStyle.AMERICAN for _, _, _, exercise in self.instruments],
+                                    dtype=bool)
+
+    def __membership(self) -> csr_matrix:
+        index: Dict[Tuple[float, OptionType, datetime, ExerciseStyle], int] = {}
+        rows, cols, counts = [], [], []
+        for i, position in enumerate(self.positions):
+            for c in position.contracts:
+                # stock legs are valued linearly and options without expiration date have no value
+                if c.subtype() is None or c.expiration_date() is None:
+                    continue
+                key = (c.get_price(), c.subtype(), c.expiration_date(), c.exercise)
+                if key not in index:
+                    index[key] = len(self.instruments)
+                    self.instruments.append(key)
+                rows.append(i)
+                cols.append(index[key])
+                counts.append(c.count)
+
+        shape = (len(self.positions), len(self.instruments))
+        # duplicate (row, col) entries are summed, which nets legs of the same instrument within a position
+        return csr_matrix((np.array(counts, dtype=float), (rows, cols)), shape=shape)
+
+    def __stock_legs(self) -> Tuple[np.ndarray, np.ndarray]:
+        counts = np.zeros(len(self.positions))
+        costs = np.zeros(len(self.positions))
+        for i, position in enumerate(self.positions):
+            for c in position.contracts:
+                if c.subtype() is None:
+                    counts[i] += c.count
+                    costs[i] += c.count * c.get_price()
+        return counts, costs
+
+    def instrument_values(self, stock_prices, sigma: float, r: float = 0.05, t: int = 0,
+                          settlement: Settlement = Settlement.CASH, dividends: DividendSchedule = None,
+                          dtype=np.float64) -> np.ndarray:
+        """
+        Prices every unique instrument of the book once per stock price
+
+        :param stock_prices: Underlying stock price scenarios
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param t: Days passed from today
+        :param settlement: How expired instruments are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param dtype: Compute dtype, np.float64 or np.float32
+        :return: np.ndarray of shape (instruments, stock prices)
+        """
+        prices = np.atleast_1d(np.asarray(stock_prices, dtype=float))
+        t_days = self.days_until_expiration[:, np.newaxis] - t
+        s, q = prices[np.newaxis, :], 0.0
+        if dividends is not None:
+            s, q = escrowed_prices(s, dividends.pv(r, t, t_days)), dividends.q
+        values = option_values(s, self.strikes[:, np.newaxis], r, sigma, t_days, self.is_call[:, np.newaxis], q,
+                               dtype=dtype)
+        if self.is_american.any():
+            am = self.is_american
+            s = np.broadcast_to(s, values.shape)
+            values[am] = american_option_values(s[am], self.strikes[am, np.newaxis], r, sigma,
+                                                t_days[am], self.is_call[am, np.newaxis], Position.LATTICE_STEPS, q,
+                                                dtype)
+        values *= settlement.carry(r, t_days)
+        return values
+
+    def theoretical_values(self, stock_prices, sigma: float, r: float = 0.05, t: int = 0,
+                           settlement: Settlement = Settlement.CASH, dividends: DividendSchedule = None,
+                           dtype=np.float64) -> np.ndarray:
+        """
+        Calculates theoretical value of every position, see `Position.theoretical_value`
+
+        :param stock_prices: Underlying stock price scenarios
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param t: Days passed from today
+        :param settlement: How expired legs are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param dtype: Compute dtype, np.float64 or np.float32
+        :return: np.ndarray of shape (positions, stock prices)
+        """
+        prices = np.atleast_1d(np.asarray(stock_prices, dtype=float))
+        instrument_values = self.instrument_values(prices, sigma, r, t, settlement, dividends, dtype)
+        values = self.membership.astype(instrument_values.dtype, copy=False) @ instrument_values
+        stock_values = prices if dividends is None else dividends.stock_values(prices, r, t)[:, 0]
+        values += np.outer(self.stock_counts, stock_values)
+        values -= self.stock_costs[:, np.newaxis]
+        return values
+
+    def pl(self, stock_prices, sigma: float, r: float = 0.05, t: int = 0,
+           settlement: Settlement = Settlement.CASH, dividends: DividendSchedule = None,
+           dtype=np.float64) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculates position and book level PL out of a single pricing pass
+
+        PL is the difference between theoretical value and absolute entry cost,
+        the same way `PositionPLCalendar.expected_returns_simulation` defines it.
+
+        :param stock_prices: Underlying stock price scenarios
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param t: Days passed from today
+        :param settlement: How expired legs are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param dtype: Compute dtype, np.float64 or np.float32
+        :return: tuple of positions PL of shape (positions, stock prices) and book PL of shape (stock prices,)
+        """
+        positions_pl = self.theoretical_values(stock_prices, sigma, r, t, settlement, dividends, dtype)
+        positions_pl -= np.abs(self.entry_costs)[:, np.newaxis]
+        return positions_pl, positions_pl.sum(axis=0)
+
+    def expected_returns_surface(self, stock_prices, days: List[int], sigma: float, r: float = 0.05,
+                                 out: np.ndarray = None, price_chunk_size: int = 1024,
+                                 settlement: Settlement = Settlement.CASH,
+                                 dividends: DividendSchedule = None, dtype=np.float64) -> np.ndarray:
+        """
+        Simulates "expected returns" of every position over a price × days grid
+
+        The surface is filled tile by tile, one day and at most `price_chunk_size` prices at a time,
+        so passing a memory-mapped `out` array keeps peak memory flat however large the book is.
+
+        :param stock_prices: Underlying stock price scenarios
+        :param days: Days passed from today, see `PositionPLCalendar.days_until_expiration_interval`
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param out: Optional caller-supplied or memory-mapped array of shape (positions, stock prices, days)
+        :param price_chunk_size: Max number of stock prices evaluated in one tile
+        :param settlement: How expired legs are carried
+        :param dividends: Optional dividends of the underlying stock
+        :param dtype: Compute dtype and dtype of the default `out` array, float32 halves memory of large books
+        :return: np.ndarray of shape (positions, stock prices, days)
+        """
+        prices = np.atleast_1d(np.asarray(stock_prices, dtype=float))
+        shape = (len(self.positions), len(prices), len(days))
+        if out is None:
+            out = np.zeros(shape, dtype=compute_dtype(dtype))
+        elif out.shape != shape:
+            raise ValueError(f"Not a valid output array shape {out.shape}, expected {shape}")
+
+        if price_chunk_size < 1:
+            raise ValueError("Not a valid price_chunk_size")
+
+        for lo in range(0, len(prices), price_chunk_size):
+            hi = lo + price_chunk_size
+            for j, t in enumerate(days):
+                out[:, lo:hi, j], _ = self.pl(prices[lo:hi], sigma, r, t, settlement, dividends, dtype)
+        return out
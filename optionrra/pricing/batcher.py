@@ -0,0 +1,170 @@
+import asyncio
+from typing import List, Tuple
+
+import numpy as np
+
+from optionrra.misc.dateutils import num_workdays_until
+from optionrra.model import DividendSchedule, ExerciseStyle, OptionType, Position, Settlement
+from optionrra.pricing.binomial_model import american_option_values
+from optionrra.pricing.black_scholes_model import option_values
+from optionrra.pricing.dividends import escrowed_prices
+from optionrra.pricing.dtypes import compute_dtype
+
+
+class BatchStats:
+    """
+    Batch size statistics of a `PricingBatcher`
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.requests = 0
+        self.values = 0
+        self.max_batch_values = 0
+
+    def record(self, requests: int, values: int):
+        self.batches += 1
+        self.requests += requests
+        self.values += values
+        self.max_batch_values = max(self.max_batch_values, values)
+
+    def report(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "values": self.values,
+            "mean_batch_requests": self.requests / self.batches if self.batches > 0 else 0.0,
+            "mean_batch_values": self.values / self.batches if self.batches > 0 else 0.0,
+            "max_batch_values": self.max_batch_values,
+        }
+
+
+class PricingBatcher:
+    """
+    Collects pricing requests of many concurrent callers and evaluates them together
+    in one vectorized Black-Scholes call.
+
+    A batch is evaluated once `max_delay` seconds passed since its first request or once it holds
+    `max_batch_size` values, whichever comes first. A larger delay gives bigger batches and better throughput
+    at the cost of latency of every request.
+    Batches are computed in the `dtype` of the batcher, see `compute_dtype`.
+    """
+
+    def __init__(self, max_batch_size: int = 65536, max_delay: float = 0.001, dtype=np.float64):
+        if max_batch_size < 1:
+            raise ValueError("Not a valid max_batch_size")
+        if max_delay < 0:
+            raise ValueError("Not a valid max_delay")
+
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.dtype = compute_dtype(dtype)
+        self.stats = BatchStats()
+        self.__pending: List[Tuple[Tuple[np.ndarray, ...], Tuple[int, ...], asyncio.Future]] = []
+        self.__pending_values = 0
+        self.__flush_handle: asyncio.TimerHandle = None
+
+    async def option_values(self, s, k, r, sigma, t_days, is_call, q=0.0) -> np.ndarray:
+        """
+        Estimates theoretical values of european options as a part of a batch, see `option_values`
+
+        :param s: stock prices or underlying contract prices
+        :param k: strike prices
+        :param r: risk-free rate
+        :param sigma: standard deviation of stock or underlying contract
+        :param t_days: times to maturity in days
+        :param is_call: boolean mask, `True` for call and `False` for put options
+        :param q: continuous dividend yields
+        :return: np.ndarray of the broadcast shape of the arguments
+        """
+        dtype = self.dtype
+        args = np.broadcast_arrays(np.asarray(s, dtype=dtype), np.asarray(k, dtype=dtype), np.asarray(r, dtype=dtype),
+                                   np.asarray(sigma, dtype=dtype), np.asarray(t_days, dtype=dtype),
+                                   np.asarray(is_call, dtype=bool), np.asarray(q, dtype=dtype))
+        shape = args[0].shape
+        future = asyncio.get_running_loop().create_future()
+        self.__pending.append((tuple(a.ravel() for a in args), shape, future))
+        self.__pending_values += args[0].size
+
+        if self.__pending_values >= self.max_batch_size:
+            self.flush()
+        elif self.__flush_handle is None:
+            self.__flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+        return await future
+
+    async def theoretical_value(self, position: Position, stock_prices, sigma: float, r: float = 0.05,
+                                t: int = 0, settlement: Settlement = Settlement.CASH,
+                                dividends: DividendSchedule = None) -> np.ndarray:
+        """
+        Calculates position theoretical value at every stock price as a part of a batch,
+        see `Position.theoretical_value`. American legs are priced with a lattice right away, outside of the batch
+
+        :param position: Option position
+        :param stock_prices: Underlying stock prices
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :param t: Days passed from today
+        :param settlement: How expired legs are carried
+        :param dividends: Optional dividends of the underlying stock
+        :return: np.ndarray of shape (stock prices,)
+        """
+        prices = np.atleast_1d(np.asarray(stock_prices, dtype=float))
+        stock_values = prices if dividends is None else dividends.stock_values(prices, r, t)[:, 0]
+        q = 0.0 if dividends is None else dividends.q
+        position_value = np.zeros(len(prices), dtype=self.dtype)
+        options = []
+        for c in position.contracts:
+            if c.subtype() is None:
+                position_value += c.count * (stock_values - c.get_price())
+            elif c.expiration_date() is not None and c.exercise == ExerciseStyle.AMERICAN:
+                days = num_workdays_until(c.expiration_date()) + 1 - t
+                s = prices if dividends is None else escrowed_prices(prices, dividends.pv(r, t, days))
+                value = american_option_values(s, c.get_price(), r, sigma, days, c.subtype() == OptionType.CALL,
+                                               position.LATTICE_STEPS, q, self.dtype)
+                position_value += c.count * value * settlement.carry(r, days)
+            elif c.expiration_date() is not None:
+                options.append(c)
+
+        if len(options) > 0:
+            strikes = np.array([c.get_price() for c in options])
+            days = np.array([num_workdays_until(c.expiration_date()) + 1 - t for c in options])
+            is_call = np.array([c.subtype() == OptionType.CALL for c in options])
+            counts = np.array([c.count for c in options], dtype=self.dtype)
+            s = prices[np.newaxis, :]
+            if dividends is not None:
+                s = escrowed_prices(s, dividends.pv(r, t, days)[:, np.newaxis])
+            values = await self.option_values(s, strikes[:, np.newaxis], r, sigma, days[:, np.newaxis],
+                                              is_call[:, np.newaxis], q)
+            values *= settlement.carry(r, days[:, np.newaxis])
+            position_value += counts @ values
+        return position_value
+
+    def flush(self):
+        """
+        Evaluates all pending requests in one vectorized call and resolves their futures
+        """
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+
+        pending, self.__pending, self.__pending_values = self.__pending, [], 0
+        if len(pending) == 0:
+            return
+
+        s, k, r, sigma, t_days, is_call, q = (np.concatenate(arrays)
+                                              for arrays in zip(*(args for args, _, _ in pending)))
+        try:
+            values = option_values(s, k, r, sigma, t_days, is_call, q, dtype=self.dtype)
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats.record(len(pending), len(values))
+        offset = 0
+        for _, shape, future in pending:
+            size = int(np.prod(shape))
+            if not future.done():
+                future.set_result(values[offset:offset + size].reshape(shape))
+            offset += size
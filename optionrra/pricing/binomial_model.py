@@ -0,0 +1,72 @@
+import numpy as np
+
+from optionrra.misc.instrumentation import instrumented
+from optionrra.pricing.dtypes import compute_dtype
+
+DEFAULT_STEPS = 200
+
+
+@instrumented("pricing.american_option_values")
+def american_option_values(s, k, r, sigma, t_days, is_call, steps: int = DEFAULT_STEPS, q=0.0,
+                           dtype=np.float64) -> np.ndarray:
+    """
+    Estimates theoretical values of american options with a Cox-Ross-Rubinstein binomial lattice
+
+    All array arguments are broadcast against each other and every contract gets its own lattice.
+    Lattices of all contracts are stacked into a single (contracts, steps + 1) array,
+    so backward induction takes one array operation per time step regardless of the number of contracts.
+    Contracts with non-positive time to maturity are valued at their intrinsic value.
+    Discrete dividends are accounted for the same way as in `option_values`, by passing escrowed stock prices.
+
+    :param s: stock prices or underlying contract prices
+    :param k: strike prices
+    :param r: risk-free rates
+    :param sigma: standard deviations of stock or underlying contract
+    :param t_days: times to maturity in days
+    :param is_call: boolean mask, `True` for call and `False` for put options
+    :param steps: number of time steps of every lattice, the error decreases roughly as 1 / steps
+    :param q: continuous dividend yields
+    :param dtype: Compute dtype of the lattices, see `compute_dtype`
+    :return: np.ndarray
+    """
+    if steps < 1:
+        raise ValueError("Not a valid number of lattice steps")
+
+    dtype = compute_dtype(dtype)
+    s, k, r, sigma, t_days, is_call, q = np.broadcast_arrays(
+        np.asarray(s, dtype=float), np.asarray(k, dtype=float), np.asarray(r, dtype=float),
+        np.asarray(sigma, dtype=float), np.asarray(t_days, dtype=float), np.asarray(is_call, dtype=bool),
+        np.asarray(q, dtype=float))
+    shape = s.shape
+    s, k, r, sigma, t_days, is_call, q = (a.reshape(-1, 1) for a in (s, k, r, sigma, t_days, is_call, q))
+
+    # payoff sign, max(sign * (price - k), 0) is the intrinsic value of both calls and puts
+    sign = np.where(is_call, 1.0, -1.0)
+    intrinsic = np.maximum(sign * (s - k), 0)
+
+    # parameters of every lattice are computed in float64 whatever the dtype,
+    # since `p_up` cancels catastrophically in float32 for short time steps
+    expired = t_days <= 0
+    dt = np.where(expired, 1.0, t_days) / 365 / steps
+    u = np.exp(sigma * np.sqrt(dt))
+    d = 1 / u
+    discount = np.exp(-r * dt).astype(dtype)
+    p_up = (np.exp((r - q) * dt) - d) / (u - d)
+    p_down = (1 - p_up).astype(dtype)
+    p_up = p_up.astype(dtype)
+    sign, k = sign.astype(dtype), k.astype(dtype)
+
+    # node j of step i has price s * u ** (i - 2 * j), so j = 0 is the highest price.
+    # Prices of every step are slices of s * u ** m rather than repeatedly multiplied by `d`,
+    # so rounding errors do not accumulate over the steps; exponents m of a step share its parity
+    # and are kept in two contiguous arrays of decreasing even and odd m
+    powers = (s * u ** np.arange(steps, -steps - 1, -1)).astype(dtype)
+    by_parity = (np.ascontiguousarray(powers[:, ::2]), np.ascontiguousarray(powers[:, 1::2]))
+    values = np.maximum(sign * (by_parity[0] - k), 0)
+    for i in range(steps - 1, -1, -1):
+        lo = (steps - i) // 2
+        prices = by_parity[(steps - i) % 2][:, lo:lo + i + 1]
+        continuation = discount * (p_up * values[:, :i + 1] + p_down * values[:, 1:i + 2])
+        values = np.maximum(continuation, sign * (prices - k))
+
+    return np.where(expired, intrinsic.astype(dtype), values).reshape(shape)
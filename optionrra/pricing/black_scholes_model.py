@@ -1,8 +1,18 @@
 import numpy as np
-from scipy.stats import norm
 
+from optionrra.misc.instrumentation import instrumented
+from optionrra.pricing.dtypes import compute_dtype
 
-def __d1(s: float, k: float, r: float, sigma: float, t_days: int) -> float:
+
+@instrumented("pricing.norm_cdf")
+def __norm_cdf(x):
+    # scipy is imported on first use to keep `import optionrra.model` fast,
+    # `ndtr` is what `scipy.stats.norm.cdf` evaluates without the argument checking overhead
+    from scipy.special import ndtr
+    return ndtr(x)
+
+
+def __d1(s: float, k: float, r: float, sigma: float, t_days: int, q: float = 0.0) -> float:
     """
     Standardized distance between the current stock price and the option's strike price,
     adjusted for the risk-free interest rate and the stock's volatility.
@@ -16,10 +26,11 @@ def __d1(s: float, k: float, r: float, sigma: float, t_days: int) -> float:
     :param r: risk-free rate
     :param sigma: standard deviation of stock or underlying contract
     :param t_days: time to maturity in days
+    :param q: continuous dividend yield
     :return: float
     """
     t = t_days / 365
-    return (np.log(s / k) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+    return (np.log(s / k) + (r - q + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
 
 
 def __d2(d1: float, sigma: float, t_days: int) -> float:
@@ -39,53 +50,57 @@ def __d2(d1: float, sigma: float, t_days: int) -> float:
     return d1 - sigma * np.sqrt(t)
 
 
-def call_option_value(s: float, k: float, r: float, sigma: float, t_days: int) -> float:
+def call_option_value(s: float, k: float, r: float, sigma: float, t_days: int, q: float = 0.0) -> float:
     """
     Estimates theoretical value of european call option
 
-    P = S * N(-d1) - K * exp(-rT) * N(-d2)
+    C = S * exp(-qT) * N(d1) - K * exp(-rT) * N(d2)
 
     :param s: stock price or underlying contract price
     :param k: strike price
     :param r: risk-free rate
     :param sigma: standard deviation of stock or underlying contract
     :param t_days: time to maturity in days
+    :param q: continuous dividend yield
     :return: float
     """
     if t_days <= 0:
         return max(s - k, 0)
 
-    d1 = __d1(s, k, r, sigma, t_days)
+    d1 = __d1(s, k, r, sigma, t_days, q)
     d2 = __d2(d1, sigma, t_days)
 
     t = t_days / 365
-    return s * norm.cdf(d1) - k * np.exp(-r * t) * norm.cdf(d2)
+    return s * np.exp(-q * t) * __norm_cdf(d1) - k * np.exp(-r * t) * __norm_cdf(d2)
 
 
-def put_option_value(s: float, k: float, r: float, sigma: float, t_days: int) -> float:
+def put_option_value(s: float, k: float, r: float, sigma: float, t_days: int, q: float = 0.0) -> float:
     """
     Estimates theoretical value of european put option
 
-    P = K * exp(-rT) * N(-d2) - S * N(-d1)
+    P = K * exp(-rT) * N(-d2) - S * exp(-qT) * N(-d1)
 
     :param s: stock price or underlying contract price
     :param k: strike price
     :param r: risk-free rate
     :param sigma: standard deviation of stock or underlying contract
     :param t_days: time to maturity in days
+    :param q: continuous dividend yield
     :return: float
     """
     if t_days <= 0:
         return abs(min(s - k, 0))
 
-    d1 = __d1(s, k, r, sigma, t_days)
+    d1 = __d1(s, k, r, sigma, t_days, q)
     d2 = __d2(d1, sigma, t_days)
 
     t = t_days / 365
-    return k * np.exp(-r * t) * norm.cdf(-d2) - s * norm.cdf(-d1)
+    return k * np.exp(-r * t) * __norm_cdf(-d2) - s * np.exp(-q * t) * __norm_cdf(-d1)
 
 
-def option_value(s: float, k: float, r: float, sigma: float, t_days: int, option_type: str = "c") -> float:
+@instrumented("pricing.option_value")
+def option_value(s: float, k: float, r: float, sigma: float, t_days: int, option_type: str = "c",
+                 q: float = 0.0) -> float:
     """
     Estimates theoretical value of european option
 
@@ -95,12 +110,61 @@ def option_value(s: float, k: float, r: float, sigma: float, t_days: int, option
     :param sigma: standard deviation of stock or underlying contract
     :param t_days: time to maturity in days
     :param option_type: "c" stands for call or "p" stands for put option respectively
+    :param q: continuous dividend yield
     :return: float
     """
     if option_type not in ["c", "p"]:
         raise ValueError("Not a valid option_type")
 
     if option_type == "c":
-        return call_option_value(s, k, r, sigma, t_days)
+        return call_option_value(s, k, r, sigma, t_days, q)
     elif option_type == "p":
-        return put_option_value(s, k, r, sigma, t_days)
+        return put_option_value(s, k, r, sigma, t_days, q)
+
+
+@instrumented("pricing.option_values")
+def option_values(s, k, r, sigma, t_days, is_call, q=0.0, approximate: bool = False,
+                  dtype=np.float64) -> np.ndarray:
+    """
+    Vectorized estimate of theoretical values of european options
+
+    All array arguments are broadcast against each other, so a column of contracts
+    (strikes, days, option types) can be priced against a row of stock prices in a single call.
+    Contracts with non-positive time to maturity are valued at their intrinsic value.
+    Discrete dividends are accounted for by passing stock prices less the present value of dividends
+    going ex before maturity, see `optionrra.pricing.dividends`.
+    With `approximate` values are interpolated out of a precomputed table, see `PriceTable` for its error bound.
+    Values are computed and returned in `dtype`, see `compute_dtype`.
+
+    :param s: stock prices or underlying contract prices
+    :param k: strike prices
+    :param r: risk-free rates
+    :param sigma: standard deviations of stock or underlying contract
+    :param t_days: times to maturity in days
+    :param is_call: boolean mask, `True` for call and `False` for put options
+    :param q: continuous dividend yields
+    :param approximate: Whether values are looked up in `default_price_table` instead of being computed exactly
+    :param dtype: Compute dtype, np.float64 or np.float32
+    :return: np.ndarray
+    """
+    dtype = compute_dtype(dtype)
+    if approximate:
+        from optionrra.pricing.price_table import default_price_table
+        return default_price_table().option_values(s, k, r, sigma, t_days, is_call, q, dtype)
+
+    s, k, t_days, is_call = np.broadcast_arrays(np.asarray(s, dtype=dtype), np.asarray(k, dtype=dtype),
+                                                np.asarray(t_days, dtype=dtype), np.asarray(is_call, dtype=bool))
+    r, sigma, q = (np.asarray(a, dtype=dtype) for a in (r, sigma, q))
+    expired = t_days <= 0
+    t = np.where(expired, 1.0, t_days) / 365
+    sigma_sqrt_t = sigma * np.sqrt(t)
+    d1 = (np.log(s / k) + (r - q + 0.5 * sigma ** 2) * t) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    discounted_k = k * np.exp(-r * t)
+    discounted_s = s * np.exp(-q * t)
+
+    call = discounted_s * __norm_cdf(d1) - discounted_k * __norm_cdf(d2)
+    put = discounted_k * __norm_cdf(-d2) - discounted_s * __norm_cdf(-d1)
+    values = np.where(is_call, call, put)
+    intrinsic = np.where(is_call, np.maximum(s - k, 0), np.maximum(k - s, 0))
+    return np.where(expired, intrinsic, values)
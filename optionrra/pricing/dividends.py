@@ -0,0 +1,64 @@
+import numpy as np
+
+
+def __paid_between(ex_days: np.ndarray, lo, hi) -> np.ndarray:
+    # mask of dividends going ex within (lo, hi], dividends are laid out along a new trailing axis
+    ex_days = np.asarray(ex_days, dtype=float)
+    lo = np.asarray(lo, dtype=float)[..., np.newaxis]
+    hi = np.asarray(hi, dtype=float)[..., np.newaxis]
+    return (ex_days > lo) & (ex_days <= hi)
+
+
+def dividends_pv(ex_days, amounts, r, days, t_days) -> np.ndarray:
+    """
+    Present value of discrete dividends going ex during the remaining life of a contract
+
+    A contract valued on day `days` with `t_days` to maturity is affected by dividends going ex
+    within (`days`, `days + t_days`]. Subtracting their present value from the stock price
+    (the escrowed dividend model) lets the regular pricing kernel value options on a dividend paying stock.
+    `days` and `t_days` are broadcast against each other, e.g. a (legs, 1) column of maturities
+    against a (days,) row gives a (legs, days) table computed once per expiry.
+
+    :param ex_days: days from today until every ex-dividend date
+    :param amounts: cash amount of every dividend
+    :param r: risk-free rate
+    :param days: valuation days, days passed from today
+    :param t_days: times to maturity in days from the valuation days
+    :return: np.ndarray of the broadcast shape of `days` and `t_days`
+    """
+    days, t_days = np.broadcast_arrays(np.asarray(days, dtype=float), np.asarray(t_days, dtype=float))
+    ex_days = np.asarray(ex_days, dtype=float)
+    paid = __paid_between(ex_days, days, days + t_days)
+    discount = np.exp(-r * (ex_days - days[..., np.newaxis]) / 365)
+    return np.sum(np.where(paid, np.asarray(amounts, dtype=float) * discount, 0), axis=-1)
+
+
+def dividends_received(ex_days, amounts, r, days) -> np.ndarray:
+    """
+    Value on every valuation day of discrete dividends received by a stock holder since today
+
+    Dividends going ex within (0, `days`] are received and accrue interest at the risk-free rate afterwards.
+
+    :param ex_days: days from today until every ex-dividend date
+    :param amounts: cash amount of every dividend
+    :param r: risk-free rate
+    :param days: valuation days, days passed from today
+    :return: np.ndarray of the shape of `days`
+    """
+    days = np.asarray(days, dtype=float)
+    ex_days = np.asarray(ex_days, dtype=float)
+    received = __paid_between(ex_days, np.zeros_like(days), days)
+    growth = np.exp(r * (days[..., np.newaxis] - ex_days) / 365)
+    return np.sum(np.where(received, np.asarray(amounts, dtype=float) * growth, 0), axis=-1)
+
+
+def escrowed_prices(s, pv) -> np.ndarray:
+    """
+    Stock prices less the present value of dividends, floored to a tiny positive price
+    so deep out of the money scenarios stay finite
+
+    :param s: stock prices
+    :param pv: present value of dividends, see `dividends_pv`
+    :return: np.ndarray
+    """
+    return np.maximum(np.asarray(s, dtype=float) - pv, np.finfo(float).tiny)
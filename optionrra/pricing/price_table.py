@@ -0,0 +1,165 @@
+from functools import lru_cache
+
+import numpy as np
+
+from optionrra.misc.instrumentation import instrumented
+from optionrra.pricing.dtypes import compute_dtype
+
+
+def _time_values(x, v):
+    # normalized Black-Scholes time value, the same for calls and puts:
+    # C / (K * exp(-rT)) = exp(x) * N(d1) - N(d2) with x = ln(F / K) and v = sigma * sqrt(T), less the intrinsic value
+    from scipy.special import ndtr
+    d1 = x / v + v / 2
+    return np.exp(x) * ndtr(d1) - ndtr(d1 - v) - np.maximum(np.exp(x) - 1, 0)
+
+
+class PriceTable:
+    """
+    Approximate european option pricer interpolating a precomputed Black-Scholes table.
+
+    Prices divided by the discounted strike depend on log-moneyness of the forward `x = ln(F / K)`
+    and total volatility `v = sigma * sqrt(T)` only. The normalized time value is tabulated once over
+    [-`max_log_moneyness`, `max_log_moneyness`] × [`min_total_vol`, `max_total_vol`], with total volatility
+    points evenly spaced in `sqrt(v)` since the time value is the least smooth at low volatility,
+    and served with bilinear interpolation.
+
+    `max_error` is the largest interpolation error at the centre of every cell, where the error
+    of bilinear interpolation of a smooth function peaks. Inside the table an approximate price differs
+    from the exact one by about `max_error * K * exp(-rT)` at most, ~4.5e-5 of the discounted strike
+    with the default grid. Contracts outside of the table are priced exactly.
+    """
+
+    def __init__(self, max_log_moneyness: float = 3.0, min_total_vol: float = 0.01, max_total_vol: float = 3.0,
+                 moneyness_points: int = 2049, vol_points: int = 257):
+        if max_log_moneyness <= 0:
+            raise ValueError("Not a valid max_log_moneyness")
+        if not 0 < min_total_vol < max_total_vol:
+            raise ValueError("Not a valid total volatility range")
+        if moneyness_points < 2 or vol_points < 2:
+            raise ValueError("Not a valid number of table points")
+
+        self.max_log_moneyness = max_log_moneyness
+        self.min_total_vol = min_total_vol
+        self.max_total_vol = max_total_vol
+        self.log_moneyness = np.linspace(-max_log_moneyness, max_log_moneyness, moneyness_points)
+        self.sqrt_total_vol = np.linspace(np.sqrt(min_total_vol), np.sqrt(max_total_vol), vol_points)
+        self.__x_step = self.log_moneyness[1] - self.log_moneyness[0]
+        self.__u_step = self.sqrt_total_vol[1] - self.sqrt_total_vol[0]
+        self.table = _time_values(self.log_moneyness[:, np.newaxis], self.sqrt_total_vol[np.newaxis, :] ** 2)
+        self.max_error = self.__max_error()
+        # bilinear coefficients of every cell next to each other, so a lookup gathers a single row;
+        # float32 adds a rounding error well below `max_error`
+        t = self.table
+        c0 = t[:-1, :-1]
+        self.__coefficients = np.stack([c0, t[1:, :-1] - c0, t[:-1, 1:] - c0, t[1:, 1:] - t[1:, :-1] - t[:-1, 1:] + c0],
+                                       axis=-1).reshape(-1, 4).astype(np.float32)
+
+    def __max_error(self) -> float:
+        x = (self.log_moneyness[:-1] + self.log_moneyness[1:]) / 2
+        u = (self.sqrt_total_vol[:-1] + self.sqrt_total_vol[1:]) / 2
+        exact = _time_values(x[:, np.newaxis], u[np.newaxis, :] ** 2)
+        t = self.table
+        return float(np.abs((t[:-1, :-1] + t[1:, :-1] + t[:-1, 1:] + t[1:, 1:]) / 4 - exact).max())
+
+    def time_values(self, x: np.ndarray, v: np.ndarray) -> np.ndarray:
+        """
+        Interpolated normalized time values, `x` and `v` are broadcast against each other and have to be inside the table
+
+        :param x: log-moneyness of the forward
+        :param v: total volatility
+        :return: np.ndarray
+        """
+        fx = (np.asarray(x) + self.max_log_moneyness) / self.__x_step
+        # total volatility usually varies along a short axis only, e.g. days, so its index is computed unbroadcast
+        fu = (np.sqrt(v) - self.sqrt_total_vol[0]) / self.__u_step
+        i = np.minimum(fx.astype(np.intp), len(self.log_moneyness) - 2)
+        j = np.minimum(fu.astype(np.intp), len(self.sqrt_total_vol) - 2)
+        fx -= i
+        fu -= j
+        c = self.__coefficients[i * (len(self.sqrt_total_vol) - 1) + j]
+        return c[..., 0] + c[..., 1] * fx + (c[..., 2] + c[..., 3] * fx) * fu
+
+    @instrumented("pricing.price_table_option_values")
+    def option_values(self, s, k, r, sigma, t_days, is_call, q=0.0, dtype=np.float64) -> np.ndarray:
+        """
+        Approximate `option_values`, contracts outside of the table are priced exactly
+
+        :param s: stock prices or underlying contract prices
+        :param k: strike prices
+        :param r: risk-free rates
+        :param sigma: standard deviations of stock or underlying contract
+        :param t_days: times to maturity in days
+        :param is_call: boolean mask, `True` for call and `False` for put options
+        :param q: continuous dividend yields
+        :param dtype: Compute dtype, see `compute_dtype`
+        :return: np.ndarray
+        """
+        from optionrra.pricing.black_scholes_model import option_values
+
+        dtype = compute_dtype(dtype)
+        s, k, r, sigma, q, t_days = (np.asarray(a, dtype=dtype) for a in (s, k, r, sigma, q, t_days))
+        is_call = np.asarray(is_call, dtype=bool)
+        # terms depending on time only keep their own, usually much smaller, shapes
+        t = np.maximum(t_days, 0) / 365
+        v = sigma * np.sqrt(t)
+        discounted_k = k * np.exp(-r * t)
+        x = np.log(s / k) + (r - q) * t
+        inside = (np.abs(x) <= self.max_log_moneyness) & (v >= self.min_total_vol) & (v <= self.max_total_vol)
+        shape = np.broadcast_shapes(x.shape, inside.shape, discounted_k.shape, is_call.shape)
+        values = np.empty(shape, dtype=dtype)
+        if inside.all():
+            values[...] = self.__values(x, v, discounted_k, is_call)
+            return values
+
+        x, v, discounted_k, is_call, inside = (np.broadcast_to(a, shape) for a in (x, v, discounted_k, is_call, inside))
+        values[inside] = self.__values(x[inside], v[inside], discounted_k[inside], is_call[inside])
+        outside = ~inside
+        s, k, r, sigma, t_days, q = (np.broadcast_to(a, shape)[outside] for a in (s, k, r, sigma, t_days, q))
+        values[outside] = option_values(s, k, r, sigma, t_days, is_call[outside], q, dtype=dtype)
+        return values
+
+    def __values(self, x, v, discounted_k, is_call) -> np.ndarray:
+        # discounted strike × (intrinsic value of the forward, max(sign * (exp(x) - 1), 0), plus time value)
+        intrinsic = np.exp(x) - 1
+        values = np.maximum(np.where(is_call, intrinsic, -intrinsic), 0)
+        values += self.time_values(x, v)
+        values *= discounted_k
+        return values
+
+    def accuracy_report(self, samples: int = 100_000, seed: int = 0) -> dict:
+        """
+        Compares approximate and exact prices of random contracts: spot 50 to 150 around strike 100,
+        1 to 365 days to maturity, volatility 5% to 150%
+
+        :param samples: Number of random contracts
+        :param seed: Random seed
+        :return: dict of errors, errors relative to the discounted strike are bounded by `max_error`
+        """
+        from optionrra.pricing.black_scholes_model import option_values
+
+        rng = np.random.default_rng(seed)
+        s = rng.uniform(50, 150, samples)
+        sigma = rng.uniform(0.05, 1.5, samples)
+        t_days = rng.integers(1, 366, samples)
+        is_call = rng.random(samples) < 0.5
+        exact = option_values(s, 100.0, 0.05, sigma, t_days, is_call)
+        errors = np.abs(self.option_values(s, 100.0, 0.05, sigma, t_days, is_call) - exact)
+        relative = errors / (100.0 * np.exp(-0.05 * t_days / 365))
+        return {
+            "samples": samples,
+            "max_abs_error": float(errors.max()),
+            "mean_abs_error": float(errors.mean()),
+            "max_relative_error": float(relative.max()),
+            "max_error": self.max_error,
+        }
+
+
+@lru_cache(maxsize=1)
+def default_price_table() -> PriceTable:
+    """
+    Process-wide `PriceTable` of the default grid, built on first use in a few tens of milliseconds
+
+    :return: PriceTable
+    """
+    return PriceTable()
@@ -0,0 +1,132 @@
+import struct
+from typing import List
+
+import numpy as np
+
+from optionrra.model import Contract, ContractType, ExerciseStyle, OptionContract, OptionType, Position, \
+    StockContract
+
+MAGIC = b"ORRA"
+VERSION = 2
+HEADER = struct.Struct("<4sHI")
+
+STOCK = 0
+CALL = 1
+PUT = 2
+
+# one record per contract, records of a book are grouped by the `position` index
+CONTRACT_DTYPE = np.dtype([
+    ("position", "<u4"),
+    ("kind", "u1"),
+    ("side", "i1"),
+    ("count", "<u4"),
+    ("price", "<f8"),
+    ("premium", "<f8"),
+    ("exp_date", "<M8[s]"),
+    ("exercise", "u1"),
+])
+
+_KIND_MAP = {OptionType.CALL: CALL, OptionType.PUT: PUT}
+
+
+def to_records(positions: List[Position]) -> np.ndarray:
+    """
+    Encodes positions into a structured array of `CONTRACT_DTYPE` records
+
+    `price` holds the strike of option contracts and the price of stock contracts,
+    `exp_date` is NaT for contracts without expiration date, `exercise` is 1 for american options.
+
+    :param positions: Positions of a book
+    :return: np.ndarray
+    """
+    rows = []
+    for i, position in enumerate(positions):
+        for c in position.contracts:
+            kind = STOCK if c.subtype() is None else _KIND_MAP[c.subtype()]
+            side = 1 if c.type == ContractType.LONG else -1
+            premium = c.get_value() if kind != STOCK else 0.0
+            exp_date = c.expiration_date() if c.expiration_date() is not None else "NaT"
+            exercise = 1 if kind != STOCK and c.exercise == ExerciseStyle.AMERICAN else 0
+            rows.append((i, kind, side, c.count, c.get_price(), premium, exp_date, exercise))
+    return np.array(rows, dtype=CONTRACT_DTYPE)
+
+
+def from_records(records: np.ndarray) -> List[Position]:
+    """
+    Decodes positions out of `CONTRACT_DTYPE` records
+
+    :param records: Structured array, see `to_records`
+    :return: list of positions
+    """
+    position_ids = records["position"].tolist()
+    kinds = records["kind"].tolist()
+    sides = records["side"].tolist()
+    counts = records["count"].tolist()
+    prices = records["price"].tolist()
+    premiums = records["premium"].tolist()
+    # datetime64[us] converts to datetime objects, NaT to None
+    exp_dates = records["exp_date"].astype("M8[us]").tolist()
+    exercises = records["exercise"].tolist()
+
+    contracts: List[List[Contract]] = [[] for _ in range(max(position_ids, default=-1) + 1)]
+    for i, kind, side, count, price, premium, exp_date, exercise in zip(position_ids, kinds, sides, counts, prices,
+                                                                       premiums, exp_dates, exercises):
+        contract_type = ContractType.LONG if side > 0 else ContractType.SHORT
+        if kind == STOCK:
+            contracts[i].append(StockContract(count, contract_type, price))
+        else:
+            option_type = OptionType.CALL if kind == CALL else OptionType.PUT
+            exercise = ExerciseStyle.AMERICAN if exercise == 1 else ExerciseStyle.EUROPEAN
+            contracts[i].append(OptionContract(count, contract_type, premium, option_type, price, exp_date, exercise))
+    return [Position(c) for c in contracts]
+
+
+def to_bytes(positions: List[Position]) -> bytes:
+    """
+    Encodes a book of positions into a compact binary buffer: a small header followed by `CONTRACT_DTYPE` records
+
+    :param positions: Positions of a book
+    :return: bytes
+    """
+    records = to_records(positions)
+    return HEADER.pack(MAGIC, VERSION, len(records)) + records.tobytes()
+
+
+def records_from_bytes(buffer) -> np.ndarray:
+    """
+    Zero-copy view of the records of a buffer written by `to_bytes`
+
+    :param buffer: bytes, bytearray, memoryview or any other object supporting the buffer protocol
+    :return: read-only np.ndarray of `CONTRACT_DTYPE` records backed by the buffer
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError("Not a valid positions buffer")
+
+    magic, version, size = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a valid positions buffer, magic {magic} version {version}")
+    if len(buffer) != HEADER.size + size * CONTRACT_DTYPE.itemsize:
+        raise ValueError("Positions buffer is truncated")
+
+    return np.frombuffer(buffer, dtype=CONTRACT_DTYPE, count=size, offset=HEADER.size)
+
+
+def from_bytes(buffer) -> List[Position]:
+    """
+    Decodes a book of positions written by `to_bytes`
+
+    :param buffer: bytes, bytearray, memoryview or any other object supporting the buffer protocol
+    :return: list of positions
+    """
+    return from_records(records_from_bytes(buffer))
+
+
+def position_to_bytes(position: Position) -> bytes:
+    return to_bytes([position])
+
+
+def position_from_bytes(buffer) -> Position:
+    positions = from_bytes(buffer)
+    if len(positions) != 1:
+        raise ValueError(f"Expected a single position, found {len(positions)}")
+    return positions[0]
@@ -0,0 +1,214 @@
+import asyncio
+import io
+import json
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from optionrra.model import Position
+from optionrra.pl.plcache import PLGridCache
+from optionrra.pl.platexp import PositionPLAtExpiration
+from optionrra.pl.plcalendar import PositionPLCalendar
+
+
+def compute_position_analytics(contracts: List[str], price_range: Tuple[float, float],
+                               sigma: float, r: float) -> Dict[str, np.ndarray]:
+    """
+    Computes PL at expiration and PL calendar of a position given in `Position.from_str_list` grammar
+
+    Runs in an executor, so it is a module level function and returns plain arrays only.
+
+    :param contracts: Position contracts
+    :param price_range: A tuple of underlying stock expected low and high price range
+    :param sigma: Standard deviation of stock or underlying contract
+    :param r: risk-free rate
+    :return: dict of arrays
+    """
+    position = Position.from_str_list(contracts)
+    pl_at_exp = PositionPLAtExpiration(position)
+    calendar = PositionPLCalendar(position)
+    return {
+        "pl_points": np.array(sorted(pl_at_exp.pl_points), dtype=float),
+        "prices": np.array(calendar.generate_stock_price_interval(price_range), dtype=float),
+        "days": np.array(calendar.days_until_expiration_interval, dtype=int),
+        "expected_returns": calendar.expected_returns_simulation(price_range, sigma, r),
+    }
+
+
+class LatencyMetrics:
+    """
+    Request level latency metrics over a window of the most recent requests
+    """
+
+    def __init__(self, window: int = 1024):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def record(self, latency: float):
+        self.requests += 1
+        self.latencies.append(latency)
+
+    def report(self) -> dict:
+        report = {"requests": self.requests, "coalesced": self.coalesced, "errors": self.errors}
+        if len(self.latencies) > 0:
+            latencies = np.array(self.latencies) * 1000
+            report.update({
+                "latency_ms_mean": float(latencies.mean()),
+                "latency_ms_p50": float(np.percentile(latencies, 50)),
+                "latency_ms_p95": float(np.percentile(latencies, 95)),
+                "latency_ms_max": float(latencies.max()),
+            })
+        return report
+
+
+class PositionAnalyticsService:
+    """
+    Asyncio front-end serving PL at expiration and PL calendar grids.
+
+    CPU heavy computations are dispatched to an executor, a process pool by default,
+    and concurrent requests for identical positions are coalesced into a single computation.
+    `start` serves the analytics over a minimal HTTP/1.1 API on localhost:
+
+    - `POST /analytics` with json body `{"contracts": [...], "price_range": [lo, hi], "sigma": 0.4, "r": 0.05}`,
+      answered with json or with npz arrays if the request has `Accept: application/octet-stream`
+    - `GET /metrics` answered with json latency metrics
+    """
+    JSON_CONTENT_TYPE = "application/json"
+    BINARY_CONTENT_TYPE = "application/octet-stream"
+    MAX_BODY_SIZE = 1024 * 1024
+
+    def __init__(self, executor: Executor = None):
+        self.executor = executor if executor is not None else ProcessPoolExecutor()
+        self.metrics = LatencyMetrics()
+        self.__in_flight: Dict[str, asyncio.Future] = {}
+
+    async def analyze(self, contracts: List[str], price_range: Tuple[float, float],
+                      sigma: float, r: float = 0.05) -> Dict[str, np.ndarray]:
+        """
+        Computes position analytics, see `compute_position_analytics`
+
+        :param contracts: Position contracts in `Position.from_str_list` grammar
+        :param price_range: A tuple of underlying stock expected low and high price range
+        :param sigma: Standard deviation of stock or underlying contract
+        :param r: risk-free rate
+        :return: dict of arrays
+        """
+        # parsing is cheap and validates the input before anything is dispatched
+        key = PLGridCache.key(Position.from_str_list(contracts), price_range, sigma, r)
+        future = self.__in_flight.get(key)
+        if future is not None:
+            self.metrics.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, compute_position_analytics,
+                                      list(contracts), tuple(price_range), sigma, r)
+        self.__in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self.__in_flight.get(key) is future:
+                del self.__in_flight[key]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.__handle, host, port)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        started = time.perf_counter()
+        try:
+            try:
+                status, content_type, payload = await self.__respond(reader)
+            except ValueError as e:
+                status, content_type, payload = 400, self.JSON_CONTENT_TYPE, self.__error(str(e))
+            except asyncio.IncompleteReadError:
+                status, content_type, payload = 400, self.JSON_CONTENT_TYPE, self.__error("Incomplete request body")
+            except Exception as e:
+                # anything else failing in the computation is answered too, so clients never wait for a response
+                status, content_type, payload = 500, self.JSON_CONTENT_TYPE, self.__error(
+                    f"Internal error {type(e).__name__}: {e}")
+
+            if status != 200:
+                self.metrics.errors += 1
+            self.metrics.record(time.perf_counter() - started)
+            writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                         f"Content-Type: {content_type}\r\n"
+                         f"Content-Length: {len(payload)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        except ConnectionError:
+            # the client went away before the response was written
+            pass
+        finally:
+            writer.close()
+
+    async def __respond(self, reader: asyncio.StreamReader) -> Tuple[int, str, bytes]:
+        method, path, headers, body = await self.__read_request(reader)
+        if method == "GET" and path == "/metrics":
+            return 200, self.JSON_CONTENT_TYPE, json.dumps(self.metrics.report()).encode()
+        if method == "POST" and path == "/analytics":
+            return await self.__analytics(headers, body)
+        return 404, self.JSON_CONTENT_TYPE, self.__error("Not found")
+
+    async def __analytics(self, headers: Dict[str, str], body: bytes) -> Tuple[int, str, bytes]:
+        try:
+            request = json.loads(body)
+            contracts = request["contracts"]
+            lo, hi = request["price_range"]
+            price_range = (float(lo), float(hi))
+            sigma = float(request["sigma"])
+            r = float(request.get("r", 0.05))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Not a valid analytics request. Error {e}")
+
+        result = await self.analyze(contracts, price_range, sigma, r)
+        if headers.get("accept") == self.BINARY_CONTENT_TYPE:
+            buffer = io.BytesIO()
+            np.savez(buffer, **result)
+            return 200, self.BINARY_CONTENT_TYPE, buffer.getvalue()
+        return 200, self.JSON_CONTENT_TYPE, json.dumps({k: v.tolist() for k, v in result.items()}).encode()
+
+    async def __read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise ValueError("Not a valid request line")
+        method, path, _ = request_line
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if line == "":
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        content_length = int(headers.get("content-length", 0))
+        if content_length > self.MAX_BODY_SIZE:
+            raise ValueError("Request body is too large")
+        body = await reader.readexactly(content_length) if content_length > 0 else b""
+        return method, path, headers, body
+
+    @staticmethod
+    def __error(message: str) -> bytes:
+        return json.dumps({"error": message}).encode()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8080):
+    service = PositionAnalyticsService()
+    server = await service.start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,357 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from optionrra.chain import OptionChain
+from optionrra.misc.dateutils import num_workdays_until
+from optionrra.model import OptionType, Position
+from optionrra.pl.platexp import expiration_bounds
+
+Metrics = Dict[str, np.ndarray]
+Objective = Union[str, Callable[[Metrics], np.ndarray]]
+
+
+@dataclass(frozen=True)
+class Structure:
+    """
+    Multi-leg structure template, legs are listed in increasing strike order
+
+    `shape` tells how strikes of the legs are picked out of a chain:
+
+    - `vertical`: any two strikes
+    - `butterfly`: three equally spaced strikes
+    - `condor`: a put vertical below a call vertical of the same width
+    """
+    name: str
+    shape: str
+    option_types: Tuple[OptionType, ...]
+    counts: Tuple[int, ...]
+
+
+STRUCTURES = {s.name: s for s in [
+    Structure("bull_call_spread", "vertical", (OptionType.CALL, OptionType.CALL), (+1, -1)),
+    Structure("bear_call_spread", "vertical", (OptionType.CALL, OptionType.CALL), (-1, +1)),
+    Structure("bull_put_spread", "vertical", (OptionType.PUT, OptionType.PUT), (+1, -1)),
+    Structure("bear_put_spread", "vertical", (OptionType.PUT, OptionType.PUT), (-1, +1)),
+    Structure("long_call_butterfly", "butterfly", (OptionType.CALL,) * 3, (+1, -2, +1)),
+    Structure("long_put_butterfly", "butterfly", (OptionType.PUT,) * 3, (+1, -2, +1)),
+    Structure("iron_condor", "condor", (OptionType.PUT, OptionType.PUT, OptionType.CALL, OptionType.CALL),
+              (+1, -1, -1, +1)),
+]}
+
+
+@dataclass
+class Strategy:
+    structure: str
+    rows: Tuple[int, ...]
+    position: Position
+    score: float
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+
+class SearchStats:
+    """
+    Candidate counts of a `StrategySearch.search` run
+    """
+
+    def __init__(self):
+        self.candidates = 0
+        self.pruned_by_bounds = 0
+        self.pruned_dominated = 0
+        self.evaluated = 0
+
+    def report(self) -> dict:
+        return {
+            "candidates": self.candidates,
+            "pruned_by_bounds": self.pruned_by_bounds,
+            "pruned_dominated": self.pruned_dominated,
+            "evaluated": self.evaluated,
+        }
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # flattens ranges [starts[i], starts[i] + counts[i]) into (owner i, index) pairs
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, starts[owners] + offsets
+
+
+def _pairs(strikes: np.ndarray, max_width: float) -> Tuple[np.ndarray, np.ndarray]:
+    # all (i, j) with 0 < strikes[j] - strikes[i] <= max_width out of sorted strikes
+    lo = np.searchsorted(strikes, strikes, side="right")
+    hi = np.searchsorted(strikes, strikes + max_width, side="right")
+    return _expand(lo, hi - lo)
+
+
+def _chunks(total: int, batch_size: int) -> Iterator[slice]:
+    for lo in range(0, total, batch_size):
+        yield slice(lo, min(lo + batch_size, total))
+
+
+def pareto_front(max_gain: np.ndarray, max_loss: np.ndarray, depth: int = 1) -> np.ndarray:
+    """
+    Mask of candidates in the first `depth` non-dominated layers.
+
+    A candidate is dominated when another one has at least the same max gain and at most the same max loss,
+    one of them strictly. The first layer is the Pareto front, every next layer is the front of the rest.
+    A candidate outside of the first `depth` layers is dominated by at least `depth` others,
+    so it can't make the top `depth` of any objective that never prefers less gain at more risk.
+
+    :param max_gain: Max gain of every candidate
+    :param max_loss: Max loss of every candidate
+    :param depth: Number of layers
+    :return: boolean np.ndarray
+    """
+    # sorted once by increasing max loss and decreasing max gain, layers are peeled off in this order
+    order = np.lexsort((-max_gain, max_loss))
+    gains, losses = max_gain[order], max_loss[order]
+    keep = np.zeros(len(order), dtype=bool)
+    rest = np.arange(len(order))
+    for _ in range(depth):
+        if len(rest) == 0:
+            break
+        g, l = gains[rest], losses[rest]
+        # candidates of equal max loss form groups, the first one of a group has its best gain
+        group_starts = np.flatnonzero(np.concatenate([[True], l[1:] != l[:-1]]))
+        groups = np.cumsum(np.concatenate([[True], l[1:] != l[:-1]])) - 1
+        best_gain = g[group_starts]
+        # the best gain among candidates of strictly lower max loss
+        best_gain_below = np.concatenate([[-np.inf], np.maximum.accumulate(best_gain)[:-1]])
+        dominated = (best_gain_below[groups] >= g) | (best_gain[groups] > g)
+        keep[rest[~dominated]] = True
+        rest = rest[dominated]
+
+    mask = np.zeros(len(order), dtype=bool)
+    mask[order] = keep
+    return mask
+
+
+class StrategySearch:
+    """
+    Enumerates multi-leg structures of a single expiration of an option chain and picks the best of them.
+
+    Candidates are generated as arrays of chain rows and evaluated in batches of `batch_size`:
+
+    1. max gain and max loss at expiration out of payoffs at the strikes, the payoff is piecewise linear,
+    2. candidates over `max_loss`, under `min_gain` and, if `prune_dominated`, those dominated
+       in (max gain, max loss) by at least `k` others of their batch are dropped, see `pareto_front`,
+    3. the survivors are valued over `SCENARIO_PRICES` lognormal scenarios of the price at expiration
+       and scored with the objective, only the top `k` of every structure are kept between batches.
+
+    Dominance pruning is only sound for an objective that never prefers less gain at more risk, i.e. one of
+    `MONOTONE_OBJECTIVES` or a callable the caller knows to be monotone. Scenario based objectives such as
+    `expected_pl` and `probability_of_profit` can rank a dominated candidate first, so they are never pruned.
+    """
+    SCENARIO_PRICES: int = 256
+    SCENARIO_SDS: float = 4.0
+    METRICS = ["cost", "max_gain", "max_loss", "reward_risk", "expected_pl", "probability_of_profit"]
+    MONOTONE_OBJECTIVES = ["max_gain", "reward_risk"]
+
+    def __init__(self, chain: OptionChain, exp_date, spot: float, sigma: float, r: float = 0.05,
+                 days: int = None, batch_size: int = 65536):
+        if spot <= 0:
+            raise ValueError("Not a valid spot price")
+        if batch_size < 1:
+            raise ValueError("Not a valid batch_size")
+
+        self.chain = chain
+        self.exp_date = exp_date
+        self.batch_size = batch_size
+        self.stats = SearchStats()
+        days = num_workdays_until(chain.nearest_expiration(exp_date)) + 1 if days is None else days
+        self.scenario_prices, self.scenario_weights = self.__scenarios(spot, sigma, r, max(days, 0) / 365)
+
+    def __scenarios(self, spot: float, sigma: float, r: float, t: float) -> Tuple[np.ndarray, np.ndarray]:
+        # prices at expiration at evenly spaced quantiles of the lognormal distribution, weighted by density
+        z = np.linspace(-self.SCENARIO_SDS, self.SCENARIO_SDS, self.SCENARIO_PRICES)
+        weights = np.exp(-0.5 * z ** 2)
+        prices = spot * np.exp((r - 0.5 * sigma ** 2) * t + sigma * np.sqrt(t) * z)
+        return prices, weights / weights.sum()
+
+    def candidates(self, structure: Structure, max_width: float) -> Iterator[np.ndarray]:
+        """
+        Yields batches of candidates of a structure whose lowest and highest strikes are at most `max_width` apart
+
+        :param structure: Structure template
+        :param max_width: Max distance between the lowest and the highest strike
+        :return: iterator of np.ndarray of chain rows of shape (candidates, legs)
+        """
+        if structure.shape == "vertical":
+            yield from self.__verticals(structure, max_width)
+        elif structure.shape == "butterfly":
+            yield from self.__butterflies(structure, max_width)
+        elif structure.shape == "condor":
+            yield from self.__condors(max_width)
+        else:
+            raise ValueError(f"Not a valid structure shape {structure.shape}")
+
+    def __verticals(self, structure: Structure, max_width: float) -> Iterator[np.ndarray]:
+        rows = self.chain.rows(self.exp_date, structure.option_types[0])
+        lo, hi = _pairs(self.chain.strikes[rows], max_width)
+        for chunk in _chunks(len(lo), self.batch_size):
+            yield rows.start + np.stack([lo[chunk], hi[chunk]], axis=1)
+
+    def __butterflies(self, structure: Structure, max_width: float) -> Iterator[np.ndarray]:
+        rows = self.chain.rows(self.exp_date, structure.option_types[0])
+        strikes = self.chain.strikes[rows]
+        lo, mid = _pairs(strikes, max_width / 2)
+        hi = np.searchsorted(strikes, 2 * strikes[mid] - strikes[lo])
+        equal_wings = hi < len(strikes)
+        equal_wings[equal_wings] = np.isclose(strikes[hi[equal_wings]] - strikes[mid[equal_wings]],
+                                              strikes[mid[equal_wings]] - strikes[lo[equal_wings]])
+        lo, mid, hi = lo[equal_wings], mid[equal_wings], hi[equal_wings]
+        for chunk in _chunks(len(lo), self.batch_size):
+            yield rows.start + np.stack([lo[chunk], mid[chunk], hi[chunk]], axis=1)
+
+    def __condors(self, max_width: float) -> Iterator[np.ndarray]:
+        put_rows = self.chain.rows(self.exp_date, OptionType.PUT)
+        call_rows = self.chain.rows(self.exp_date, OptionType.CALL)
+        put_strikes, call_strikes = self.chain.strikes[put_rows], self.chain.strikes[call_rows]
+        put_lo, put_hi = _pairs(put_strikes, max_width)
+        call_lo, call_hi = _pairs(call_strikes, max_width)
+        put_widths = np.round(put_strikes[put_hi] - put_strikes[put_lo], 8)
+        call_widths = np.round(call_strikes[call_hi] - call_strikes[call_lo], 8)
+
+        for width in np.intersect1d(put_widths, call_widths):
+            puts = np.flatnonzero(put_widths == width)
+            # call verticals of the same width in increasing strike order
+            calls = np.flatnonzero(call_widths == width)
+            calls = calls[np.argsort(call_strikes[call_lo[calls]], kind="stable")]
+            calls_lo_strikes = call_strikes[call_lo[calls]]
+
+            # short call strike above the short put strike, long call strike at most `max_width` above long put
+            starts = np.searchsorted(calls_lo_strikes, put_strikes[put_hi[puts]], side="right")
+            ends = np.searchsorted(calls_lo_strikes, put_strikes[put_lo[puts]] + max_width - width, side="right")
+            owners, matches = _expand(starts, np.maximum(ends - starts, 0))
+            for chunk in _chunks(len(owners), self.batch_size):
+                p, c = puts[owners[chunk]], calls[matches[chunk]]
+                yield np.stack([put_rows.start + put_lo[p], put_rows.start + put_hi[p],
+                                call_rows.start + call_lo[c], call_rows.start + call_hi[c]], axis=1)
+
+    def payoffs(self, rows: np.ndarray, counts, prices: np.ndarray) -> np.ndarray:
+        """
+        PL at expiration of candidates at their own or at shared prices
+
+        :param rows: Chain rows of shape (candidates, legs)
+        :param counts: Signed number of contracts of every leg
+        :param prices: Prices at expiration of shape (candidates, prices) or (prices,)
+        :return: np.ndarray of shape (candidates, prices)
+        """
+        counts = np.asarray(counts, dtype=float)
+        strikes = self.chain.strikes[rows][:, np.newaxis, :]
+        # max(sign * (price - strike), 0) is the intrinsic value of both calls and puts
+        sign = np.where(self.chain.is_call[rows], 1.0, -1.0)[:, np.newaxis, :]
+        cost = self.chain.premiums[rows] @ counts
+        prices = np.atleast_2d(prices)[:, :, np.newaxis]
+        intrinsic = np.maximum(sign * (prices - strikes), 0)
+        return intrinsic @ counts - cost[:, np.newaxis]
+
+    def bounds(self, rows: np.ndarray, counts) -> Metrics:
+        """
+        Cost, max gain and max loss at expiration of candidates, losses are positive numbers
+
+        :param rows: Chain rows of shape (candidates, legs)
+        :param counts: Signed number of contracts of every leg
+        :return: dict of np.ndarray metrics
+        """
+        counts = np.asarray(counts, dtype=float)
+        cost = self.chain.premiums[rows] @ counts
+        max_gain, max_loss = expiration_bounds(self.chain.strikes[rows], self.chain.is_call[rows], counts, cost)
+        return {"cost": cost, "max_gain": max_gain, "max_loss": max_loss}
+
+    def metrics(self, rows: np.ndarray, counts) -> Metrics:
+        """
+        All `METRICS` of candidates
+
+        :param rows: Chain rows of shape (candidates, legs)
+        :param counts: Signed number of contracts of every leg
+        :return: dict of np.ndarray metrics
+        """
+        metrics = self.bounds(rows, counts)
+        return self.__scenario_metrics(rows, counts, metrics)
+
+    def __scenario_metrics(self, rows: np.ndarray, counts, metrics: Metrics) -> Metrics:
+        payoffs = self.payoffs(rows, counts, self.scenario_prices)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            reward_risk = np.where(metrics["max_loss"] > 0, metrics["max_gain"] / metrics["max_loss"], np.inf)
+        return {
+            **metrics,
+            "reward_risk": reward_risk,
+            "expected_pl": payoffs @ self.scenario_weights,
+            "probability_of_profit": (payoffs > 0) @ self.scenario_weights,
+        }
+
+    def search(self, structures: List[str], objective: Objective = "expected_pl", k: int = 10,
+               max_width: float = np.inf, max_loss: float = np.inf, min_gain: float = -np.inf,
+               prune_dominated: bool = None) -> List[Strategy]:
+        """
+        Finds the `k` best candidates of the given structures
+
+        :param structures: Names of `STRUCTURES`
+        :param objective: Name of one of `METRICS` or a callable scoring a dict of metric arrays, higher is better
+        :param k: Number of strategies returned
+        :param max_width: Max distance between the lowest and the highest strike of a candidate
+        :param max_loss: Candidates of a larger max loss are dropped
+        :param min_gain: Candidates of a smaller max gain are dropped
+        :param prune_dominated: Whether candidates dominated in (max gain, max loss) by `k` others are dropped early,
+            by default only for `MONOTONE_OBJECTIVES`; not allowed for other named objectives
+        :return: list of strategies sorted by decreasing score
+        """
+        if k < 1:
+            raise ValueError("Not a valid k")
+        if isinstance(objective, str):
+            if objective not in self.METRICS:
+                raise ValueError(f"Not a valid objective {objective}")
+            monotone = objective in self.MONOTONE_OBJECTIVES
+            if prune_dominated and not monotone:
+                raise ValueError(f"Not a valid objective {objective} for dominance pruning, it is not monotone "
+                                 f"in max gain and max loss")
+            prune_dominated = monotone if prune_dominated is None else prune_dominated
+            objective = _metric_objective(objective)
+        elif prune_dominated is None:
+            prune_dominated = False
+
+        results = []
+        for name in structures:
+            if name not in STRUCTURES:
+                raise ValueError(f"Not a valid structure {name}")
+            structure = STRUCTURES[name]
+            best_rows, best_scores, best_metrics = None, None, None
+            for rows in self.candidates(structure, max_width):
+                self.stats.candidates += len(rows)
+                metrics = self.bounds(rows, structure.counts)
+                keep = (metrics["max_loss"] <= max_loss) & (metrics["max_gain"] >= min_gain)
+                self.stats.pruned_by_bounds += int((~keep).sum())
+                if prune_dominated and keep.any():
+                    front = np.zeros_like(keep)
+                    front[keep] = pareto_front(metrics["max_gain"][keep], metrics["max_loss"][keep], k)
+                    self.stats.pruned_dominated += int(keep.sum() - front.sum())
+                    keep = front
+                if not keep.any():
+                    continue
+
+                rows = rows[keep]
+                metrics = self.__scenario_metrics(rows, structure.counts, {m: v[keep] for m, v in metrics.items()})
+                scores = np.asarray(objective(metrics), dtype=float)
+                self.stats.evaluated += len(rows)
+                if best_rows is not None:
+                    rows = np.concatenate([best_rows, rows])
+                    scores = np.concatenate([best_scores, scores])
+                    metrics = {m: np.concatenate([best_metrics[m], v]) for m, v in metrics.items()}
+                top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+                best_rows, best_scores, best_metrics = rows[top], scores[top], {m: v[top] for m, v in metrics.items()}
+
+            if best_rows is not None:
+                results.extend(
+                    Strategy(name, tuple(int(r) for r in row), self.chain.position(list(zip(row, structure.counts))),
+                             float(score), {m: float(v[i]) for m, v in best_metrics.items()})
+                    for i, (row, score) in enumerate(zip(best_rows, best_scores))
+                )
+        return sorted(results, key=lambda s: s.score, reverse=True)[:k]
+
+
+def _metric_objective(name: str) -> Callable[[Metrics], np.ndarray]:
+    def objective(metrics: Metrics) -> np.ndarray:
+        return metrics[name]
+    return objective
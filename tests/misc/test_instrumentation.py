@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from optionrra.misc import instrumentation
+from optionrra.misc.instrumentation import StageRegistry, instrumented, profile
+from optionrra.model import Position
+from optionrra.pl.platexp import PositionPLAtExpiration
+
+
+@instrumented("test.stage")
+def _stage(x):
+    return x * 2
+
+
+@instrumented("test.failing_stage")
+def _failing_stage():
+    raise ValueError("failed")
+
+
+def test_disabled_stages_are_not_recorded():
+    instrumentation.registry().reset()
+    assert not instrumentation.is_enabled()
+    assert _stage(2) == 4
+    assert instrumentation.registry().report() == {"stages": []}
+
+
+def test_profile_records_calls():
+    with profile() as stages:
+        for i in range(3):
+            _stage(i)
+        with pytest.raises(ValueError):
+            _failing_stage()
+    _stage(1)
+
+    report = {s["stage"]: s for s in stages.report()["stages"]}
+    assert report["test.stage"]["calls"] == 3
+    assert report["test.failing_stage"]["calls"] == 1
+    assert not instrumentation.is_enabled()
+
+
+def test_profile_records_package_stages():
+    with profile() as stages:
+        position = Position.from_str_list(["+1 95 call 6.25 2023-05-01", "-1 105 call 1.75 2023-05-01"])
+        PositionPLAtExpiration(position)
+        position.theoretical_value(100, 0.4, 0.05)
+
+    recorded = {s["stage"] for s in stages.report()["stages"]}
+    assert {"model.from_str_list", "model.position_init", "model.theoretical_value", "pl.platexp.slopes",
+            "misc.num_workdays_between", "pricing.option_value", "pricing.norm_cdf"} <= recorded
+
+
+def test_registry_dump():
+    registry = StageRegistry()
+    registry.record("b", 1.0)
+    registry.record("a", 0.5)
+    registry.record("a", 1.5)
+    f = io.StringIO()
+    registry.dump(f)
+    report = json.loads(f.getvalue())
+    assert report["stages"] == [
+        {"stage": "a", "calls": 2, "total_s": 2.0, "mean_us": 1e6},
+        {"stage": "b", "calls": 1, "total_s": 1.0, "mean_us": 1e6},
+    ]
@@ -1,7 +1,8 @@
+import numpy as np
 import pytest
 
 from optionrra.model import Position
-from optionrra.pl.platexp import PositionPLAtExpiration
+from optionrra.pl.platexp import PositionPLAtExpiration, positions_expiration_bounds
 
 
 def __calc_expected_upper_bound(price):
@@ -20,6 +21,10 @@ def __calc_expected_upper_bound(price):
     (
             ["+1 stock 100"],
             {f"0-{__calc_expected_upper_bound(100)}": +1}
+    ),
+    (
+            ["+1 90 call 5.0", "+1 95 call 3.0", "-3 100 call 1.5", "-1 105 call 0.5"],
+            {"0-90.0": 0, "90.0-100.0": 2, f"100.0-{__calc_expected_upper_bound(105)}": -2}
     )
 ])
 def test_adj_slopes(test_input, expected):
@@ -62,3 +67,15 @@ def test_points(test_input, expected):
     position = Position.from_str_list(test_input)
     intervals = PositionPLAtExpiration(position)
     assert sorted(intervals.pl_points) == sorted(expected)
+
+
+def test_positions_expiration_bounds():
+    positions = [
+        Position.from_str_list(["+1 100 call 3.0 2023-05-01", "-1 105 call 1.0 2023-05-01"]),
+        Position.from_str_list(["+1 stock 100", "-1 110 call 2.0 2023-05-01"]),
+        Position.from_str_list(["+1 100 call 3.0 2023-05-01", "-1 105 call 1.0 2023-06-01"]),
+    ]
+    max_gain, max_loss = positions_expiration_bounds(positions, credits=[0.5, 0.0, 0.0])
+    np.testing.assert_allclose(max_gain[:2], [3.5, 12.0])
+    np.testing.assert_allclose(max_loss[:2], [1.5, 98.0])
+    assert np.isnan(max_gain[2]) and np.isnan(max_loss[2])
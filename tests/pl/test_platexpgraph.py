@@ -0,0 +1,50 @@
+import pytest
+
+from optionrra.model import Position
+from optionrra.pl.platexp import PositionPLAtExpiration
+from optionrra.pl.platexpgraph import PLAtExpirationGraph, PLGraphTemplate, render_batch
+
+PNG_SIGNATURE = b"\x89PNG"
+
+
+def _graph(contracts):
+    position = Position.from_str_list(contracts)
+    return PLAtExpirationGraph("\n".join(position.to_str_list()), PositionPLAtExpiration(position).pl_points)
+
+
+GRAPHS = [
+    _graph(["+1 95 call 6.25", "-1 105 call 1.75", "-2 105 put 7.75", "-2 stock 98"]),
+    _graph(["+1 50 call 9.30", "-1 55 call 5.5"]),
+    _graph(["-1 100 put 5.20", "-1 100 call 4.70"]),
+]
+
+
+def test_plot_points_extend_pl_points():
+    points = GRAPHS[1].plot_points()
+    assert set(GRAPHS[1].pl_points) < set(points)
+
+
+def test_to_bytes_does_not_print(capsys):
+    assert GRAPHS[0].to_bytes().startswith(PNG_SIGNATURE)
+    assert capsys.readouterr().out == ""
+
+
+def test_template_swaps_data_artists():
+    template = PLGraphTemplate()
+    template.to_bytes(GRAPHS[0])
+    static_lines = len(template.ax.lines) - len(GRAPHS[0].plot_points()) + 1
+    for graph in GRAPHS[1:]:
+        assert template.to_bytes(graph, "svg").startswith(b"<?xml")
+        assert len(template.ax.lines) == static_lines + len(graph.plot_points()) - 1
+        assert len(template.ax.collections) == 2
+        assert template.ax.get_title() == graph.title
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_render_batch(tmp_path, processes):
+    graphs = [(str(tmp_path / f"{i}.png"), graph) for i, graph in enumerate(GRAPHS * 2)]
+    rendered = render_batch(graphs, processes=processes)
+    assert rendered == [fname for fname, _ in graphs]
+    for fname in rendered:
+        with open(fname, "rb") as f:
+            assert f.read(4) == PNG_SIGNATURE
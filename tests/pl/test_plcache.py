@@ -0,0 +1,86 @@
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from optionrra.model import Position
+from optionrra.pl.plcache import PLGridCache
+from optionrra.pl.plcalendar import PositionPLCalendar
+
+
+@pytest.fixture
+def calendar():
+    with patch("optionrra.pl.plcalendar.num_workdays_until", return_value=5):
+        return PositionPLCalendar(Position.from_str_list(["+1 95 call 6.25 2023-05-01", "-1 105 call 1.75 2023-05-01"]))
+
+
+@pytest.mark.parametrize("changed", [
+    {"price_range": (90, 110)},
+    {"sigma": 0.3},
+    {"r": 0.01},
+    {"valuation_date": date(2023, 4, 2)},
+    {"position": Position.from_str_list(["+1 95 call 6.25 2023-05-02", "-1 105 call 1.75 2023-05-01"])},
+])
+def test_key_depends_on_grid_inputs(changed):
+    params = {
+        "position": Position.from_str_list(["+1 95 call 6.25 2023-05-01", "-1 105 call 1.75 2023-05-01"]),
+        "price_range": (90, 100),
+        "sigma": 0.4,
+        "r": 0.05,
+        "valuation_date": date(2023, 4, 1),
+    }
+    key = PLGridCache.key(**params)
+    assert key == PLGridCache.key(**params)
+    assert key != PLGridCache.key(**{**params, **changed})
+
+
+def test_expected_returns_simulation_is_computed_once(tmp_path, calendar):
+    cache = PLGridCache(str(tmp_path))
+    expected = calendar.expected_returns_simulation((90, 110), 0.4, 0.05)
+    with patch.object(calendar, "expected_returns_simulation", wraps=calendar.expected_returns_simulation) as sim:
+        cold = cache.expected_returns_simulation(calendar, (90, 110), 0.4, 0.05)
+        warm = PLGridCache(str(tmp_path)).expected_returns_simulation(calendar, (90, 110), 0.4, 0.05)
+        assert sim.call_count == 1
+    assert isinstance(warm, np.memmap)
+    np.testing.assert_array_equal(cold, expected)
+    np.testing.assert_array_equal(warm, expected)
+
+
+def test_key_depends_on_lattice_steps():
+    position = Position.from_str_list(["+1 95 put 6.25 2023-05-01 american"])
+    key = PLGridCache.key(position, (90, 100), 0.4, 0.05, date(2023, 4, 1))
+    with patch.object(Position, "LATTICE_STEPS", Position.LATTICE_STEPS * 2):
+        assert key != PLGridCache.key(position, (90, 100), 0.4, 0.05, date(2023, 4, 1))
+
+
+def test_expected_returns_simulation_not_a_valid_valuation_date(tmp_path, calendar):
+    cache = PLGridCache(str(tmp_path))
+    with pytest.raises(ValueError):
+        cache.expected_returns_simulation(calendar, (90, 110), 0.4, 0.05, valuation_date=date(2023, 4, 1))
+    assert cache.size() == 0
+    cache.expected_returns_simulation(calendar, (90, 110), 0.4, 0.05, valuation_date=date.today())
+
+
+def test_get_missing_key(tmp_path):
+    assert PLGridCache(str(tmp_path)).get("missing") is None
+
+
+def test_least_recently_used_grids_are_evicted(tmp_path):
+    grid = np.zeros((10, 10))
+    cache = PLGridCache(str(tmp_path))
+    cache.put("a", grid)
+    cache.max_bytes = 2 * cache.size()
+    cache.put("b", grid)
+    cache.get("a")
+    cache.put("c", grid)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.size() <= cache.max_bytes
+    assert not (tmp_path / "b.npy").exists()
+
+
+def test_not_a_valid_max_bytes(tmp_path):
+    with pytest.raises(ValueError):
+        PLGridCache(str(tmp_path), max_bytes=0)
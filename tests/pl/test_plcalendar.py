@@ -4,7 +4,7 @@ from unittest.mock import patch, MagicMock
 import numpy as np
 
 from optionrra.model import Position
-from optionrra.pl.plcalendar import PositionPLCalendar
+from optionrra.pl.plcalendar import PositionPLCalendar, open_memmap, refine_price_axis
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -77,7 +77,9 @@ def test_days_until_expiration_interval():
     days_int = [0, 1, 2]
     price_int = [90, 95, 100]
     position = Position.from_str_list(["+1 95 call 5.0 2023-05-01"])
-    position.theoretical_value = MagicMock(return_value=theor_val)
+    position.theoretical_values = MagicMock(
+        side_effect=lambda prices, sigma, r, days, *args: np.full((1, len(days)), theor_val)
+    )
     plcalendar = PositionPLCalendar(position)
     plcalendar.days_until_expiration_interval = days_int
     plcalendar.generate_stock_price_interval = MagicMock(return_value=price_int)
@@ -86,4 +88,126 @@ def test_days_until_expiration_interval():
     assert len(result[0]) == 3
     comp = result == np.full((3, 3), theor_val - abs(position.entry_cost))
     assert comp.all()
-    assert position.theoretical_value.call_count == len(days_int) * len(price_int)
+    assert position.theoretical_values.call_count == len(price_int)
+
+
+def test_expected_returns_simulation_into_memory_mapped_array(tmp_path):
+    with patch("optionrra.pl.plcalendar.num_workdays_until", return_value=5):
+        position = Position.from_str_list(["+1 95 call 6.25 2023-05-01", "-1 105 call 1.75 2023-05-01"])
+        plcalendar = PositionPLCalendar(position)
+    expected = plcalendar.expected_returns_simulation((90, 110), 0.4, 0.05)
+
+    path = str(tmp_path / "grid.npy")
+    out = open_memmap(path, plcalendar.expected_returns_shape((90, 110)))
+    result = plcalendar.expected_returns_simulation((90, 110), 0.4, 0.05, out=out)
+    assert result is out
+    out.flush()
+    np.testing.assert_array_equal(np.load(path, mmap_mode="r"), expected)
+
+
+def test_expected_returns_simulation_not_a_valid_out_shape():
+    plcalendar = PositionPLCalendar(Position.from_str_list(["+1 95 call 6.25 2023-05-01"]))
+    with pytest.raises(ValueError):
+        plcalendar.expected_returns_simulation((90, 110), 0.4, 0.05, out=np.zeros((1, 1)))
+
+
+def test_days_until_expiration_interval_includes_settlement_days():
+    workdays = {"2023-05-10": 9, "2023-06-30": 39}
+    with patch("optionrra.pl.plcalendar.num_workdays_until", side_effect=lambda d: workdays[d.strftime("%Y-%m-%d")]):
+        position = Position.from_str_list(["+1 95 call 6.25 2023-05-10", "-1 105 call 1.75 2023-06-30"])
+        result = PositionPLCalendar(position).days_until_expiration_interval
+    assert 10 in result
+    assert result == sorted(result)
+    assert result[0] == 0 and result[-1] == 40
+
+
+def test_expected_returns_simulation_float32():
+    with patch("optionrra.pl.plcalendar.num_workdays_until", return_value=20):
+        position = Position.from_str_list(["+1 95 call 6.25 2023-05-01", "-1 105 put 1.75 2023-05-01"])
+        plcalendar = PositionPLCalendar(position)
+    expected = plcalendar.expected_returns_simulation((80, 120), 0.4, 0.05)
+    result = plcalendar.expected_returns_simulation((80, 120), 0.4, 0.05, dtype=np.float32)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, expected, atol=1e-4)
+
+
+@pytest.fixture
+def strangle_calendar():
+    with patch("optionrra.pl.plcalendar.num_workdays_until", return_value=20), \
+            patch("optionrra.model.num_workdays_until", return_value=20):
+        position = Position.from_str_list(["+1 95 put 2.0 2023-05-01", "+1 105 call 2.0 2023-05-01"])
+        yield PositionPLCalendar(position)
+
+
+def _max_interpolation_error(prices, grid, reference_prices, reference):
+    interpolated = np.stack([np.interp(reference_prices, prices, grid[:, j]) for j in range(grid.shape[1])], axis=1)
+    return np.abs(interpolated - reference).max()
+
+
+def test_price_axis_seeds_include_strikes_and_breakevens(strangle_calendar):
+    plcalendar = strangle_calendar
+    seeds = plcalendar.price_axis_seeds((70, 130), 0.4, 0.05)
+    # debit of 4.0 on a 95/105 strangle breaks even at 91 and 109 at expiration
+    for price in [95, 105, 91, 109]:
+        assert np.isclose(seeds, price).any()
+    for price in plcalendar.generate_stock_price_interval((70, 130)):
+        assert np.isclose(seeds, price).any()
+    assert seeds[0] == 70 and seeds[-1] == 130
+    assert (np.diff(seeds) > 0).all()
+
+
+@pytest.mark.parametrize("tolerance", [0.1, 0.01])
+def test_adaptive_expected_returns_simulation_within_tolerance(strangle_calendar, tolerance):
+    plcalendar = strangle_calendar
+    prices, grid = plcalendar.adaptive_expected_returns_simulation((70, 130), 0.4, 0.05, tolerance=tolerance)
+    assert grid.shape == (len(prices), len(plcalendar.days_until_expiration_interval))
+
+    dense = np.linspace(70, 130, 6001)
+    reference = plcalendar.position.theoretical_values(dense, 0.4, 0.05, plcalendar.days_until_expiration_interval) \
+        - abs(plcalendar.position.entry_cost)
+    assert _max_interpolation_error(prices, grid, dense, reference) <= tolerance
+
+    # a uniform grid of as many prices misses the kinks of the expiration day
+    uniform = np.linspace(70, 130, len(prices))
+    uniform_grid = plcalendar.position.theoretical_values(uniform, 0.4, 0.05,
+                                                          plcalendar.days_until_expiration_interval) \
+        - abs(plcalendar.position.entry_cost)
+    assert _max_interpolation_error(uniform, uniform_grid, dense, reference) > tolerance
+
+
+def test_expiration_curve_is_exact_at_seeds(strangle_calendar):
+    prices, pl = strangle_calendar.expiration_curve((70, 130), 0.4, 0.05)
+    assert pl.shape == prices.shape
+    expected = np.maximum(95 - prices, 0) + np.maximum(prices - 105, 0) - 4.0
+    np.testing.assert_allclose(pl, expected, atol=1e-9)
+
+
+def test_refine_price_axis_batches_midpoints():
+    calls = []
+
+    def evaluate(prices):
+        calls.append(len(prices))
+        return np.abs(prices - 1 / 3)[:, np.newaxis]
+
+    prices, values = refine_price_axis(evaluate, [0, 1], 1e-3, max_samples=1000)
+    np.testing.assert_allclose(values[:, 0], np.abs(prices - 1 / 3))
+    # only intervals around the kink are refined, one batch of midpoints per round
+    assert len(prices) < 50
+    assert sum(calls) == len(prices)
+    assert max(calls[1:]) <= 2
+
+
+def test_refine_price_axis_max_samples():
+    prices, _ = refine_price_axis(lambda p: np.sin(50 * p)[:, np.newaxis], np.linspace(0, 1, 5), 1e-9, max_samples=64)
+    assert len(prices) == 64
+
+
+@pytest.mark.parametrize("seeds, tolerance", [
+    ([0, 1], 0),
+    ([0, 1], -0.1),
+    ([1], 0.1),
+    ([1, 1], 0.1),
+])
+def test_refine_price_axis_not_valid_arguments(seeds, tolerance):
+    with pytest.raises(ValueError):
+        refine_price_axis(lambda p: p[:, np.newaxis], seeds, tolerance)
@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from optionrra.model import Position
+from optionrra.pl.plcalendar import PositionPLCalendar, open_memmap
+from optionrra.pl.plcalendargraph import PLCalendarGraph, render_batch
+
+PNG_SIGNATURE = b"\x89PNG"
+
+
+def _graph(contracts, price_range=(80, 120)):
+    with patch("optionrra.pl.plcalendar.num_workdays_until", return_value=20):
+        calendar = PositionPLCalendar(Position.from_str_list(contracts))
+    return PLCalendarGraph(" ".join(contracts), calendar.expected_returns_simulation(price_range, 0.4, 0.05),
+                           calendar.generate_stock_price_interval(price_range),
+                           calendar.days_until_expiration_interval)
+
+
+def test_display_grid_downsamples_without_copying(tmp_path):
+    grid = open_memmap(str(tmp_path / "grid.npy"), (1000, 30))
+    grid[:] = np.arange(30)
+    graph = PLCalendarGraph("large", grid, np.linspace(50, 150, 1000), np.arange(30))
+    display, prices, days = graph.display_grid()
+    assert display.shape[0] <= PLCalendarGraph.MAX_DISPLAY_PRICES
+    assert display.shape == (len(prices), len(days)) == (334, 30)
+    assert np.shares_memory(display, grid)
+
+
+def test_not_a_valid_expected_returns_shape():
+    with pytest.raises(ValueError):
+        PLCalendarGraph("invalid", np.zeros((3, 2)), [1, 2, 3], [0, 1, 2])
+
+
+@pytest.mark.parametrize("contracts", [
+    ["+1 95 call 6.25 2023-05-01", "-1 105 call 1.75 2023-05-01"],
+    ["-1 100 put 5.20 2023-05-01"],
+])
+def test_to_bytes(contracts):
+    assert _graph(contracts).to_bytes().startswith(PNG_SIGNATURE)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_render_batch(tmp_path, processes):
+    graph = _graph(["+1 95 call 6.25 2023-05-01", "-1 105 call 1.75 2023-05-01"])
+    graphs = [(str(tmp_path / f"{i}.png"), graph) for i in range(3)]
+    assert render_batch(graphs, processes) == [fname for fname, _ in graphs]
+    for fname, _ in graphs:
+        with open(fname, "rb") as f:
+            assert f.read(4) == PNG_SIGNATURE
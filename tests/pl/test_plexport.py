@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from optionrra.model import Position
+from optionrra.pl.platexp import PositionPLAtExpiration
+from optionrra.pl.plcalendar import PositionPLCalendar
+from optionrra.pl.plexport import PLResultsBatch, load_npz
+
+POSITIONS = {
+    "bull_call": ["+1 50 call 9.30 2023-05-01", "-1 55 call 5.5 2023-05-01"],
+    "short_straddle": ["-1 100 put 5.20 2023-05-01", "-1 100 call 4.70 2023-05-01"],
+}
+
+
+@pytest.fixture
+def batch():
+    batch = PLResultsBatch()
+    for position_id, contracts in POSITIONS.items():
+        position = Position.from_str_list(contracts)
+        with patch("optionrra.pl.plcalendar.num_workdays_until", return_value=5):
+            calendar = PositionPLCalendar(position)
+        batch.add(position_id, position, PositionPLAtExpiration(position),
+                  calendar.expected_returns_simulation((40, 60), 0.4, 0.05),
+                  calendar.generate_stock_price_interval((40, 60)), calendar.days_until_expiration_interval)
+    return batch
+
+
+def test_tables(batch):
+    tables = batch.tables()
+    assert len(batch) == 2
+    assert list(tables["positions"]["id"]) == list(POSITIONS)
+    for table, columns in tables.items():
+        assert list(columns) == PLResultsBatch.TABLES[table]
+        assert len({len(values) for values in columns.values()}) == 1
+
+    pl_points = tables["pl_points"]
+    bull_call = sorted(zip(pl_points["price"][pl_points["position"] == 0], pl_points["pl"][pl_points["position"] == 0]))
+    assert bull_call == sorted(PositionPLAtExpiration(Position.from_str_list(POSITIONS["bull_call"])).pl_points)
+
+
+def test_expected_returns_are_labelled(batch):
+    returns = batch.tables()["expected_returns"]
+    rows = returns["position"] == 1
+    grid = returns["value"][rows].reshape(PositionPLCalendar.MAX_PRICE_SAMPLE_NUMBER, -1)
+    assert returns["price"][rows][0] == 40 and returns["price"][rows][-1] == 60
+    assert (returns["price"][rows].reshape(grid.shape)[:, 0] == np.linspace(40, 60, grid.shape[0])).all()
+    assert (returns["day"][rows].reshape(grid.shape)[0] == np.arange(grid.shape[1])).all()
+
+
+def test_not_a_valid_expected_returns_shape():
+    position = Position.from_str_list(POSITIONS["bull_call"])
+    with pytest.raises(ValueError):
+        PLResultsBatch().add("invalid", position, expected_returns=np.zeros((2, 2)), price_interval=[1],
+                             days_interval=[0, 1])
+
+
+def test_npz_round_trip(batch, tmp_path):
+    path = str(tmp_path / "results.npz")
+    batch.to_npz(path)
+    loaded = load_npz(path)
+    for table, columns in batch.tables().items():
+        for column, values in columns.items():
+            np.testing.assert_array_equal(loaded[table][column], values)
+
+
+def test_parquet_export(batch, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    paths = batch.to_parquet(str(tmp_path))
+    assert len(paths) == len(PLResultsBatch.TABLES)
+    table = pq.read_table(str(tmp_path / "expected_returns.parquet"))
+    assert table.column_names == PLResultsBatch.TABLES["expected_returns"]
+    np.testing.assert_array_equal(table.column("value").to_numpy(), batch.tables()["expected_returns"]["value"])
+
+
+def test_contracts_keep_expiration_dates_and_exercise_styles():
+    positions = [Position.from_str_list(["-1 100 call 2.1 2023-05-01", "+1 100 call 4.2 2023-06-01 american"]),
+                 Position.from_str_list(["-1 100 call 2.1 2023-05-01", "+1 100 call 4.2 2023-07-01 american"])]
+    batch = PLResultsBatch()
+    for i, position in enumerate(positions):
+        batch.add(str(i), position, PositionPLAtExpiration(position))
+    contracts = batch.tables()["positions"]["contracts"]
+    assert contracts[0] != contracts[1]
+    for position, value in zip(positions, contracts):
+        assert Position.from_str_list(value.split(";")).contracts == position.contracts
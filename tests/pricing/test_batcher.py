@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from optionrra.model import DividendSchedule, Position
+from optionrra.pricing.batcher import PricingBatcher
+from optionrra.pricing.black_scholes_model import option_values
+
+EXP = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+
+
+def test_concurrent_requests_are_evaluated_in_one_batch():
+    async def run():
+        batcher = PricingBatcher(max_delay=0.01)
+        requests = [(90.0 + i, 100.0, 0.05, 0.4, 10 + i, i % 2 == 0) for i in range(10)]
+        results = await asyncio.gather(*(batcher.option_values(*args) for args in requests))
+        return batcher, requests, results
+
+    batcher, requests, results = asyncio.run(run())
+    assert batcher.stats.batches == 1
+    assert batcher.stats.requests == 10
+    for args, result in zip(requests, results):
+        np.testing.assert_allclose(result, option_values(*args))
+
+
+def test_batch_is_flushed_at_max_batch_size():
+    async def run():
+        batcher = PricingBatcher(max_batch_size=6, max_delay=10)
+        prices = np.linspace(90, 110, 3)
+        results = await asyncio.gather(*(batcher.option_values(prices, 100.0, 0.05, 0.4, 30, True) for _ in range(4)))
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert batcher.stats.batches == 2
+    assert batcher.stats.max_batch_values == 6
+    assert all(r.shape == (3,) for r in results)
+
+
+def test_theoretical_value_matches_position():
+    positions = [
+        Position.from_str_list([f"+1 95 call 6.25 {EXP}", f"-2 105 put 7.75 {EXP}", "-2 stock 98"]),
+        Position.from_str_list([f"+1 100 put 3.0 {EXP}", "+1 90 call 1.0"]),
+    ]
+    prices = [90.0, 100.0, 110.0]
+
+    async def run():
+        batcher = PricingBatcher()
+        results = await asyncio.gather(*(batcher.theoretical_value(p, prices, 0.4, 0.05, 2) for p in positions))
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert batcher.stats.batches == 1
+    for position, result in zip(positions, results):
+        np.testing.assert_allclose(result, [position.theoretical_value(s, 0.4, 0.05, 2) for s in prices])
+
+
+def test_theoretical_value_with_dividends_matches_position():
+    position = Position.from_str_list([f"+1 95 call 6.25 {EXP}", f"-2 105 put 7.75 {EXP} american", "-2 stock 98"])
+    dividends = DividendSchedule(q=0.01, payments=[(datetime.now() + timedelta(days=10), 1.5)])
+    prices = [90.0, 100.0, 110.0]
+
+    async def run():
+        return await PricingBatcher().theoretical_value(position, prices, 0.4, 0.05, 2, dividends=dividends)
+
+    np.testing.assert_allclose(asyncio.run(run()),
+                               [position.theoretical_value(s, 0.4, 0.05, 2, dividends=dividends) for s in prices])
+
+
+def test_float32_batcher():
+    position = Position.from_str_list([f"+1 95 call 6.25 {EXP}", f"-2 105 put 7.75 {EXP} american", "-2 stock 98"])
+    prices = np.linspace(90, 110, 5)
+
+    async def run():
+        return await PricingBatcher(dtype=np.float32).theoretical_value(position, prices, 0.4, 0.05, 2)
+
+    result = asyncio.run(run())
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, [position.theoretical_value(s, 0.4, 0.05, 2) for s in prices], atol=2e-3)
+
+
+@pytest.mark.parametrize("max_batch_size, max_delay", [(0, 0.001), (10, -1)])
+def test_not_a_valid_batcher_config(max_batch_size, max_delay):
+    with pytest.raises(ValueError):
+        PricingBatcher(max_batch_size, max_delay)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from optionrra.pricing.binomial_model import american_option_values
+from optionrra.pricing.black_scholes_model import option_values
+
+
+def test_american_put_reference_value():
+    # S = K = 100, r = 5%, sigma = 20%, one year, reference value of a 10000 steps lattice
+    assert american_option_values(100, 100, 0.05, 0.2, 365, False, steps=1000) == pytest.approx(6.0903, abs=2e-3)
+
+
+def test_american_call_without_dividends_is_european():
+    prices = np.array([80.0, 100.0, 120.0])
+    american = american_option_values(prices, 100, 0.05, 0.3, 90, True, steps=1000)
+    np.testing.assert_allclose(american, option_values(prices, 100, 0.05, 0.3, 90, True), atol=2e-2)
+
+
+def test_american_put_is_worth_at_least_european_and_intrinsic():
+    prices = np.linspace(50, 150, 21)
+    american = american_option_values(prices, 100, 0.05, 0.3, 180, False)
+    assert (american >= option_values(prices, 100, 0.05, 0.3, 180, False) - 1e-9).all()
+    assert (american >= np.maximum(100 - prices, 0) - 1e-9).all()
+
+
+def test_stacked_lattices_match_single_contracts():
+    s = np.array([90.0, 100.0, 110.0])[:, np.newaxis]
+    k = np.array([95.0, 105.0])
+    t_days = np.array([30, -1])
+    is_call = np.array([False, True])
+    stacked = american_option_values(s, k, 0.05, 0.4, t_days, is_call, steps=50)
+    assert stacked.shape == (3, 2)
+    for i in range(3):
+        for j in range(2):
+            single = american_option_values(s[i, 0], k[j], 0.05, 0.4, t_days[j], is_call[j], steps=50)
+            assert stacked[i, j] == pytest.approx(float(single))
+    np.testing.assert_array_equal(stacked[:, 1], np.maximum(s[:, 0] - 105, 0))
+
+
+def test_not_a_valid_number_of_steps():
+    with pytest.raises(ValueError):
+        american_option_values(100, 100, 0.05, 0.2, 30, True, steps=0)
+
+
+def test_float32_lattices():
+    prices = np.linspace(50, 150, 21)[:, np.newaxis]
+    strikes = np.array([90.0, 100.0, 110.0])
+    expected = american_option_values(prices, strikes, 0.05, 0.3, 90, False)
+    values = american_option_values(prices, strikes, 0.05, 0.3, 90, False, dtype=np.float32)
+    assert values.dtype == np.float32
+    # well below the discretization error of the lattice
+    np.testing.assert_allclose(values, expected, atol=2e-3)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from optionrra.pricing.black_scholes_model import option_value, option_values
+
+
+@pytest.mark.parametrize("option_type", ["c", "p"])
+@pytest.mark.parametrize("t_days", [-3, 0, 1, 30, 365])
+def test_option_values_match_option_value(option_type, t_days):
+    prices = np.array([50.0, 90.0, 100.0, 110.0, 150.0])
+    values = option_values(prices, 100.0, 0.05, 0.4, t_days, option_type == "c")
+    expected = [option_value(s, 100.0, 0.05, 0.4, t_days, option_type) for s in prices]
+    np.testing.assert_allclose(values, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_option_values_broadcast():
+    strikes = np.array([90.0, 100.0, 110.0])[:, np.newaxis]
+    is_call = np.array([True, False, True])[:, np.newaxis]
+    prices = np.linspace(80, 120, 5)[np.newaxis, :]
+    values = option_values(prices, strikes, 0.05, 0.4, 30, is_call)
+    assert values.shape == (3, 5)
+    np.testing.assert_allclose(values[1], [option_value(s, 100.0, 0.05, 0.4, 30, "p") for s in prices[0]])
+
+
+@pytest.mark.parametrize("q", [0.0, 0.03])
+def test_option_values_put_call_parity_with_dividend_yield(q):
+    prices = np.linspace(80, 120, 5)
+    t = 90 / 365
+    calls = option_values(prices, 100.0, 0.05, 0.3, 90, True, q)
+    puts = option_values(prices, 100.0, 0.05, 0.3, 90, False, q)
+    np.testing.assert_allclose(calls - puts, prices * np.exp(-q * t) - 100.0 * np.exp(-0.05 * t))
+    np.testing.assert_allclose(calls, [option_value(s, 100.0, 0.05, 0.3, 90, "c", q) for s in prices])
+
+
+@pytest.mark.parametrize("approximate", [False, True])
+@pytest.mark.parametrize("t_days", [0, 1, 30, 365])
+def test_option_values_float32(approximate, t_days):
+    prices = np.linspace(50, 150, 201)[:, np.newaxis]
+    strikes = np.linspace(60, 140, 17)
+    expected = option_values(prices, strikes, 0.05, 0.4, t_days, strikes > 100, approximate=approximate)
+    values = option_values(prices, strikes, 0.05, 0.4, t_days, strikes > 100, approximate=approximate,
+                           dtype=np.float32)
+    assert values.dtype == np.float32
+    # float32 rounding of about 1e-6 of the price level
+    np.testing.assert_allclose(values, expected, atol=1e-4)
+
+
+def test_option_values_not_a_valid_dtype():
+    with pytest.raises(ValueError):
+        option_values(100.0, 100.0, 0.05, 0.4, 30, True, dtype=np.float16)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from optionrra.pricing.dividends import dividends_pv, dividends_received, escrowed_prices
+
+EX_DAYS = np.array([10.0, 40.0])
+AMOUNTS = np.array([1.0, 2.0])
+
+
+@pytest.mark.parametrize("days, t_days, expected", [
+    (0, 5, 0.0),
+    (0, 10, np.exp(-0.05 * 10 / 365)),
+    (0, 60, np.exp(-0.05 * 10 / 365) + 2 * np.exp(-0.05 * 40 / 365)),
+    (10, 60, 2 * np.exp(-0.05 * 30 / 365)),
+    (20, -5, 0.0),
+])
+def test_dividends_pv(days, t_days, expected):
+    assert dividends_pv(EX_DAYS, AMOUNTS, 0.05, days, t_days) == pytest.approx(expected)
+
+
+def test_dividends_pv_is_tabulated_per_leg_and_day():
+    t_days = np.array([[15.0], [50.0]]) - np.array([0.0, 20.0])
+    pv = dividends_pv(EX_DAYS, AMOUNTS, 0.05, np.array([0.0, 20.0]), t_days)
+    assert pv.shape == (2, 2)
+    np.testing.assert_allclose(pv[:, 1], [0.0, 2 * np.exp(-0.05 * 20 / 365)])
+
+
+def test_dividends_received():
+    received = dividends_received(EX_DAYS, AMOUNTS, 0.05, np.array([0.0, 10.0, 45.0]))
+    np.testing.assert_allclose(received, [0.0, 1.0, np.exp(0.05 * 35 / 365) + 2 * np.exp(0.05 * 5 / 365)])
+
+
+def test_escrowed_prices_stay_positive():
+    prices = escrowed_prices(np.array([1.0, 100.0]), 3.0)
+    assert prices[0] > 0
+    assert prices[1] == 97.0
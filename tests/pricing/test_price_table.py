@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from optionrra.pricing.black_scholes_model import option_values
+from optionrra.pricing.price_table import PriceTable, default_price_table
+
+
+@pytest.fixture(scope="module")
+def table():
+    return default_price_table()
+
+
+@pytest.mark.parametrize("sigma", [0.1, 0.4, 1.2])
+@pytest.mark.parametrize("t_days", [1, 30, 365])
+def test_approximate_values_within_error_bound(table, sigma, t_days):
+    s = np.linspace(50, 150, 201)[:, np.newaxis]
+    k = np.array([80.0, 100.0, 120.0])
+    is_call = np.array([True, False, True])
+    exact = option_values(s, k, 0.05, sigma, t_days, is_call)
+    approximate = table.option_values(s, k, 0.05, sigma, t_days, is_call)
+    assert approximate.shape == exact.shape
+    bound = table.max_error * k * np.exp(-0.05 * t_days / 365)
+    assert (np.abs(approximate - exact) <= bound + 1e-12).all()
+
+
+def test_values_inside_table_are_writable(table):
+    values = table.option_values(np.array([[90.0], [100.0]]), 100.0, 0.05, 0.3, np.array([30, 60]), True)
+    assert values.shape == (2, 2)
+    values *= 2.0
+
+
+@pytest.mark.parametrize("s, t_days, sigma", [
+    (1.0, 30, 0.4),  # deep out of the money call, outside of the log-moneyness range
+    (100.0, 0, 0.4),  # expired
+    (100.0, 1, 0.001),  # below the lowest total volatility
+])
+def test_outside_of_table_priced_exactly(table, s, t_days, sigma):
+    exact = option_values(s, 100.0, 0.05, sigma, t_days, True)
+    assert table.option_values(s, 100.0, 0.05, sigma, t_days, True) == pytest.approx(float(exact), abs=1e-12)
+
+
+def test_mixed_inside_and_outside(table):
+    s = np.array([1.0, 95.0, 105.0, 5000.0])
+    t_days = np.array([30, 0, 45, 10])
+    exact = option_values(s, 100.0, 0.05, 0.3, t_days, False, 0.02)
+    approximate = table.option_values(s, 100.0, 0.05, 0.3, t_days, False, 0.02)
+    np.testing.assert_allclose(approximate, exact, atol=table.max_error * 100)
+    np.testing.assert_array_equal(approximate[[0, 1, 3]], exact[[0, 1, 3]])
+
+
+def test_option_values_approximate_switch(table):
+    s = np.linspace(80, 120, 11)
+    approximate = option_values(s, 100.0, 0.05, 0.3, 60, True, approximate=True)
+    np.testing.assert_array_equal(approximate, table.option_values(s, 100.0, 0.05, 0.3, 60, True))
+    assert not np.array_equal(approximate, option_values(s, 100.0, 0.05, 0.3, 60, True))
+
+
+def test_accuracy_report(table):
+    report = table.accuracy_report(samples=10_000)
+    assert report["samples"] == 10_000
+    assert report["max_relative_error"] <= report["max_error"] < 1e-4
+    assert report["mean_abs_error"] <= report["max_abs_error"]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"max_log_moneyness": 0},
+    {"min_total_vol": 0},
+    {"min_total_vol": 2.0, "max_total_vol": 1.0},
+    {"moneyness_points": 1},
+])
+def test_not_a_valid_table(kwargs):
+    with pytest.raises(ValueError):
+        PriceTable(**kwargs)
+
+
+def test_coarse_table_has_larger_error_bound(table):
+    assert PriceTable(moneyness_points=65, vol_points=17).max_error > table.max_error
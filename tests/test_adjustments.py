@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from optionrra.adjustments import BASE, Adjustment, AdjustmentEvaluator, apply_adjustment
+from optionrra.model import Position
+from optionrra.pl.plcalendar import PositionPLCalendar
+
+EXP_1 = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+EXP_2 = (datetime.now() + timedelta(days=60)).strftime("%Y-%m-%d")
+CONDOR = [f"+1 85 put 1.0 {EXP_1}", f"-1 90 put 2.0 {EXP_1}", f"-1 110 call 2.0 {EXP_1}",
+          f"+1 115 call 1.0 {EXP_1}"]
+
+
+def legs(position):
+    return sorted(position.to_str_list())
+
+
+@pytest.mark.parametrize("adjustment, expected, realized", [
+    # add a wing
+    ([f"+1 120 call 0.5 {EXP_1}"], CONDOR + [f"+1 120 call 0.5 {EXP_1}"], 0.0),
+    # close the short call at a loss
+    ([f"+1 110 call 3.5 {EXP_1}"], [c for c in CONDOR if "110 call" not in c], -1.5),
+    # more contracts of the same leg merge at the weighted premium
+    ([f"-1 110 call 3.0 {EXP_1}"], [c for c in CONDOR if "110 call" not in c] + [f"-2 110 call 2.5 {EXP_1}"], 0.0),
+    # closing more than held flips the leg at the closing premium
+    ([f"+2 90 put 1.0 {EXP_1}"], [c for c in CONDOR if "90 put" not in c] + [f"+1 90 put 1.0 {EXP_1}"], 1.0),
+])
+def test_apply_adjustment(adjustment, expected, realized):
+    position, realized_pl = apply_adjustment(Position.from_str_list(CONDOR), Adjustment.from_str_list("a", adjustment))
+    assert legs(position) == sorted(Position.from_str_list(expected).to_str_list())
+    assert realized_pl == pytest.approx(realized)
+
+
+def test_apply_adjustment_closing_every_leg():
+    position = Position.from_str_list([f"+1 100 call 3.0 {EXP_1}"])
+    with pytest.raises(ValueError):
+        apply_adjustment(position, Adjustment.from_str_list("close", [f"-1 100 call 4.0 {EXP_1}"]))
+
+
+def test_roll_and_resize():
+    position = Position.from_str_list(CONDOR)
+    short_call = next(c for c in position.contracts if c.get_price() == 110)
+    exp_2 = datetime.strptime(EXP_2, "%Y-%m-%d")
+    rolled, realized = apply_adjustment(position, Adjustment.roll("roll", short_call, 3.0, 120, 1.0, exp_2))
+    assert legs(rolled) == sorted(Position.from_str_list(
+        [c for c in CONDOR if "110 call" not in c] + [f"-1 120 call 1.0 {EXP_2}"]).to_str_list())
+    assert realized == pytest.approx(-1.0)
+
+    resized, realized = apply_adjustment(position, Adjustment.resize("resize", short_call, 3, 2.0))
+    assert legs(resized) == sorted(Position.from_str_list(
+        [c for c in CONDOR if "110 call" not in c] + [f"-3 110 call 2.0 {EXP_1}"]).to_str_list())
+    assert realized == 0.0
+    assert Adjustment.resize("noop", short_call, 1, 2.0).legs == ()
+
+
+def test_evaluator_matches_rebuilt_positions():
+    base = Position.from_str_list(CONDOR)
+    adjustments = [
+        Adjustment.from_str_list("wing", [f"+1 120 call 0.5 {EXP_1}"]),
+        Adjustment.from_str_list("double", [f"-1 90 put 2.0 {EXP_1}", f"-1 110 call 2.0 {EXP_1}"]),
+        Adjustment.from_str_list("close_call", [f"+1 110 call 3.5 {EXP_1}"]),
+    ]
+    evaluator = AdjustmentEvaluator(base, adjustments)
+    # legs of the base position are priced once for all variants
+    assert len(evaluator.portfolio.instruments) == 5
+
+    results = evaluator.evaluate((80, 120), 0.3)
+    assert [r.name for r in results] == [BASE, "wing", "double", "close_call"]
+    days = evaluator.days_interval()
+    for result in results:
+        calendar = PositionPLCalendar(result.position)
+        calendar.days_until_expiration_interval = days
+        expected = calendar.expected_returns_simulation((80, 120), 0.3, 0.05) + result.metrics["realized_pl"]
+        np.testing.assert_allclose(result.pl, expected, atol=1e-10)
+
+
+def test_evaluator_bounds():
+    evaluator = AdjustmentEvaluator(Position.from_str_list(CONDOR), [
+        Adjustment.from_str_list("wing", [f"+1 120 call 0.5 {EXP_1}"]),
+        Adjustment.from_str_list("close_call", [f"+1 110 call 3.5 {EXP_1}"]),
+        Adjustment.from_str_list("calendar", [f"+1 110 call 2.5 {EXP_2}"]),
+    ])
+    bounds = evaluator.bounds()
+    # 85/90/110/115 condor for a credit of 2.0
+    assert bounds["max_gain"][0] == pytest.approx(2.0)
+    assert bounds["max_loss"][0] == pytest.approx(3.0)
+    # the extra wing costs 0.5 and leaves the upside open
+    assert bounds["max_gain"][1] == np.inf
+    assert bounds["max_loss"][1] == pytest.approx(3.5)
+    assert bounds["adjustment_cost"][1] == pytest.approx(-0.5)
+    # closing the short call realizes a loss of 1.5 and leaves a put spread and a long call
+    assert bounds["realized_pl"][2] == pytest.approx(-1.5)
+    assert bounds["max_gain"][2] == np.inf
+    # below 85 the put spread loses 5.0 on top of a net debit of 1.5
+    assert bounds["max_loss"][2] == pytest.approx(6.5)
+    # options of several expirations have no max gain and loss at expiration
+    assert np.isnan(bounds["max_gain"][3]) and np.isnan(bounds["max_loss"][3])
+
+
+@pytest.mark.parametrize("names", [["a", "a"], [BASE]])
+def test_evaluator_not_valid_names(names):
+    adjustments = [Adjustment.from_str_list(name, [f"+1 120 call 0.5 {EXP_1}"]) for name in names]
+    with pytest.raises(ValueError):
+        AdjustmentEvaluator(Position.from_str_list(CONDOR), adjustments)
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from optionrra.backtest import Backtest, max_drawdown, realized_volatility
+from optionrra.model import Position, Settlement
+from optionrra.portfolio import Portfolio
+from optionrra.pricing.black_scholes_model import option_values
+
+DATES = np.busday_offset(np.datetime64("2023-01-02"), np.arange(60))
+PRICES = 100 * np.exp(np.cumsum(np.random.default_rng(7).normal(0, 0.015, 60)))
+
+
+def test_first_date_matches_portfolio_instruments():
+    today = datetime.now()
+    exp_1 = (today + timedelta(days=30)).strftime("%Y-%m-%d")
+    exp_2 = (today + timedelta(days=60)).strftime("%Y-%m-%d")
+    positions = [Position.from_str_list([f"+1 95 call 6.25 {exp_1}", f"-1 105 call 1.75 {exp_2}", "-1 stock 98"]),
+                 Position.from_str_list([f"+2 100 put 4.5 {exp_1} american"])]
+    dates = [today, today + timedelta(days=1)]
+    result = Backtest(positions).run(dates, [101.0, 99.0], 0.4)
+
+    portfolio = Portfolio(positions)
+    instrument_values = portfolio.instrument_values(101.0, 0.4)[:, 0]
+    index = {key: i for i, key in enumerate(portfolio.instruments)}
+    # short legs are worth minus their value
+    expected = np.array([sum(c.signed_count() * (101.0 if c.subtype() is None else
+                                                 instrument_values[index[(c.get_price(), c.subtype(),
+                                                                          c.expiration_date(), c.exercise)]])
+                             for c in p.contracts) for p in positions])
+    np.testing.assert_allclose(result.values[:, 0], expected)
+    np.testing.assert_allclose(result.pl[:, 0], expected + portfolio.entry_costs)
+    assert result.book_pl[0] == pytest.approx((expected + portfolio.entry_costs).sum())
+
+
+def test_settled_at_intrinsic_value():
+    position = Position.from_str_list(["+1 100 call 3.0 2023-02-10", "-1 105 call 1.0 2023-02-10"])
+    result = Backtest([position]).run(DATES, PRICES, 0.3)
+    settled = DATES >= np.datetime64("2023-02-10")
+    settlement_price = PRICES[np.flatnonzero(DATES == np.datetime64("2023-02-10"))[0]]
+    intrinsic = max(settlement_price - 100, 0) - max(settlement_price - 105, 0)
+    assert result.expiration_pl[0] == pytest.approx(intrinsic - 2.0)
+    np.testing.assert_array_equal(result.pl[0, settled], result.expiration_pl[0])
+    assert result.summary()["final_pl"][0] == result.expiration_pl[0]
+
+
+@pytest.mark.parametrize("contracts, settlement_price, expected", [
+    (["-1 100 put 3.0 2023-02-10"], 80.0, -17.0),
+    (["+1 100 call 3.0 2023-02-10", "-1 105 call 1.0 2023-02-10"], 110.0, 3.0),
+    (["-1 100 call 3.0 2023-02-10", "+1 110 call 1.0 2023-02-10"], 120.0, -8.0),
+])
+def test_settled_at_pl_at_expiration(contracts, settlement_price, expected):
+    position = Position.from_str_list(contracts)
+    dates = np.busday_offset(np.datetime64("2023-02-08"), np.arange(4))
+    prices = np.array([100.0, 100.0, settlement_price, 100.0])
+    result = Backtest([position]).run(dates, prices, 0.3)
+    assert result.expiration_pl[0] == pytest.approx(expected)
+    assert result.pl[0, -1] == pytest.approx(expected)
+
+
+def test_assigned_naked_put_is_a_loss():
+    position = Position.from_str_list(["-1 100 put 3.0 2023-02-10"])
+    dates = np.busday_offset(np.datetime64("2023-02-08"), np.arange(4))
+    result = Backtest([position]).run(dates, [100.0, 90.0, 80.0, 85.0], 0.3)
+    assert result.expiration_pl[0] < 0
+    assert result.expiration_pl[0] == pytest.approx(position.pl_at_expiration(80.0))
+
+
+@pytest.mark.parametrize("contracts", [
+    ["+1 stock 100", "-1 60 call 41.0 2023-02-10"],
+    ["+1 stock 100", "-1 160 call 0.1 2023-02-10"],
+    ["+1 60 call 41.0 2023-02-10", "-1 65 call 36.0 2023-02-10"],
+    ["+1 150 put 50.0 2023-02-10", "+1 50 put 0.1 2023-02-10"],
+])
+def test_no_jump_on_expiration(contracts):
+    # deep in or out of the money legs have no time value left the day before expiration
+    dates = np.busday_offset(np.datetime64("2023-02-08"), np.arange(5))
+    prices = np.full(len(dates), 100.0)
+    result = Backtest([Position.from_str_list(contracts)], r=0.0).run(dates, prices, 0.3)
+    i = np.flatnonzero(dates == np.datetime64("2023-02-10"))[0]
+    assert result.pl[0, i - 1] == pytest.approx(result.pl[0, i], abs=1e-6)
+    np.testing.assert_array_equal(result.pl[0, i:], result.expiration_pl[0])
+
+
+def test_legs_expired_before_the_last_one_are_cash_settled():
+    position = Position.from_str_list(["+1 100 put 3.0 2023-01-20", "+1 100 call 5.0 2023-03-17"])
+    result = Backtest([position], r=0.05).run(DATES, PRICES, 0.3)
+    i = np.flatnonzero(DATES == np.datetime64("2023-02-01"))[0]
+    settlement_price = PRICES[DATES == np.datetime64("2023-01-20")][0]
+    put = max(100 - settlement_price, 0) * np.exp(0.05 * np.busday_count("2023-01-20", "2023-02-01") / 365)
+    call = option_values(PRICES[i], 100, 0.05, 0.3, np.busday_count("2023-02-01", "2023-03-17") + 1, True)
+    assert result.values[0, i] == pytest.approx(put + call)
+    assert result.pl[0, i] == pytest.approx(put + call - abs(position.entry_cost))
+
+
+def test_stock_settled_legs_follow_the_price():
+    position = Position.from_str_list(["+1 90 call 3.0 2023-01-20", "+1 100 call 5.0 2023-06-16"])
+    result = Backtest([position], settlement=Settlement.STOCK).run(DATES, PRICES, 0.3)
+    i = len(DATES) - 1
+    call = option_values(PRICES[i], 100, 0.05, 0.3, np.busday_count(DATES[i], "2023-06-16") + 1, True)
+    assert result.values[0, i] == pytest.approx(max(PRICES[i] - 90, 0) + call)
+
+
+def test_realized_volatility_is_trailing():
+    sigma = realized_volatility(PRICES, window=10)
+    returns = np.diff(np.log(PRICES))
+    assert sigma[30] == pytest.approx(np.std(returns[20:30], ddof=1) * np.sqrt(252))
+    assert sigma[5] == pytest.approx(np.std(returns[:5], ddof=1) * np.sqrt(252))
+    assert sigma[0] == sigma[1] == sigma[2]
+    # a later price does not change earlier estimates
+    np.testing.assert_allclose(realized_volatility(PRICES[:31], window=10), sigma[:31])
+
+
+def test_max_drawdown():
+    assert max_drawdown([0, 3, 1, 4, -2, 5]) == 6
+    np.testing.assert_array_equal(max_drawdown([[1, 2, 3], [3, 2, 1]]), [0, 2])
+
+
+def test_default_sigma_is_realized_volatility():
+    position = Position.from_str_list(["+1 100 call 3.0 2023-03-17"])
+    result = Backtest([position]).run(DATES, PRICES)
+    np.testing.assert_array_equal(result.sigma, realized_volatility(PRICES))
+
+
+@pytest.mark.parametrize("dates, prices, sigma", [
+    (DATES[:3], [100.0, 101.0], 0.3),
+    (DATES[[0, 2, 1]], [100.0, 101.0, 102.0], 0.3),
+    (DATES[:3], [100.0, 0.0, 102.0], 0.3),
+    (DATES[:3], [100.0, 101.0, 102.0], [0.3, -0.1, 0.3]),
+    (DATES[:2], [100.0, 101.0], None),
+])
+def test_not_a_valid_price_history(dates, prices, sigma):
+    with pytest.raises(ValueError):
+        Backtest([Position.from_str_list(["+1 100 call 3.0 2023-03-17"])]).run(dates, prices, sigma)
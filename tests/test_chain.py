@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from optionrra.chain import OptionChain
+from optionrra.model import ContractType, ExerciseStyle, OptionType
+
+QUOTES = [
+    "+1 105 call 1.75 2023-06-16",
+    "+1 95 call 6.25 2023-06-16",
+    "+1 100 call 3.5 2023-06-16",
+    "+1 95 put 1.5 2023-06-16",
+    "+1 100 put 3.2 2023-06-16",
+    "+1 100 call 5.0 2023-05-19",
+    "+1 90 put 0.8 2023-05-19 american",
+]
+
+
+@pytest.fixture
+def chain():
+    return OptionChain.from_str_list(QUOTES)
+
+
+def test_option_chain_is_sorted_by_expiration_type_and_strike(chain):
+    assert len(chain) == len(QUOTES)
+    assert list(chain.expirations.astype(datetime)) == [datetime(2023, 5, 19), datetime(2023, 6, 16)]
+    assert chain.rows("2023-05-19") == slice(0, 2)
+    assert list(chain.strikes[chain.rows("2023-06-16", OptionType.PUT)]) == [95, 100]
+    assert list(chain.strikes[chain.rows("2023-06-16", OptionType.CALL)]) == [95, 100, 105]
+
+
+@pytest.mark.parametrize("strike, option_type, exp_date, expected_premium", [
+    (100, OptionType.CALL, "2023-06-16", 3.5),
+    (100, OptionType.PUT, "2023-06-16", 3.2),
+    (100, OptionType.CALL, datetime(2023, 5, 19), 5.0),
+    (90, OptionType.PUT, "2023-05-19", 0.8),
+])
+def test_option_chain_find(chain, strike, option_type, exp_date, expected_premium):
+    assert chain.premiums[chain.find(strike, option_type, exp_date)] == expected_premium
+
+
+def test_option_chain_find_missing(chain):
+    assert chain.find(97.5, OptionType.CALL, "2023-06-16") is None
+    assert chain.find(105, OptionType.PUT, "2023-06-16") is None
+    with pytest.raises(KeyError):
+        chain.find(100, OptionType.CALL, "2023-07-21")
+
+
+def test_option_chain_nearest_strikes(chain):
+    rows = chain.nearest_strikes([80, 96, 97.5, 99, 120], OptionType.CALL, "2023-06-16")
+    np.testing.assert_array_equal(chain.strikes[rows], [95, 95, 95, 100, 105])
+    assert chain.strikes[chain.nearest_strike(102, OptionType.PUT, "2023-06-16")] == 100
+
+
+def test_option_chain_nearest_expiration(chain):
+    assert chain.nearest_expiration("2023-05-01") == datetime(2023, 5, 19)
+    assert chain.nearest_expiration("2023-06-10") == datetime(2023, 6, 16)
+    assert chain.nearest_expiration("2023-12-01") == datetime(2023, 6, 16)
+
+
+def test_option_chain_strikes_and_moneyness_between(chain):
+    assert list(chain.strikes[chain.strikes_between(96, 105, OptionType.CALL, "2023-06-16")]) == [100, 105]
+    assert list(chain.strikes[chain.moneyness_between(100, 0.95, 1.0, OptionType.CALL, "2023-06-16")]) == [95, 100]
+    with pytest.raises(ValueError):
+        chain.moneyness_between(0, 0.9, 1.1, OptionType.CALL, "2023-06-16")
+
+
+def test_option_chain_mints_contracts_and_positions(chain):
+    c = chain.contract(chain.find(90, OptionType.PUT, "2023-05-19"), -2)
+    assert (c.count, c.type, c.premium, c.exercise) == (2, ContractType.SHORT, 0.8, ExerciseStyle.AMERICAN)
+    assert c.expiration_date() == datetime(2023, 5, 19)
+
+    long_call = chain.find(95, OptionType.CALL, "2023-06-16")
+    short_call = chain.find(105, OptionType.CALL, "2023-06-16")
+    position = chain.position([(long_call, 1), (short_call, -1)])
+    assert position.to_str_list() == ["+1 95.0 call 6.25", "-1 105.0 call 1.75"]
+    with pytest.raises(ValueError):
+        chain.contract(long_call, 0)
+
+
+def test_option_chain_requires_expiration_dates():
+    with pytest.raises(ValueError):
+        OptionChain.from_str_list(["+1 95 call 6.25"])
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TIME_BUDGET = 0.5
+IMPORT_RUNS = 3
+IMPORT_SCRIPT = """
+import sys
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+print(",".join(sys.modules))
+"""
+
+
+def _import(module: str):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module)],
+                            cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.splitlines()
+    return float(output[0]), set(output[1].split(","))
+
+
+@pytest.mark.parametrize("module", ["optionrra.model", "optionrra.pl.platexp", "optionrra.pl.plcalendar"])
+def test_heavy_dependencies_are_not_imported(module):
+    _, modules = _import(module)
+    assert {"scipy", "matplotlib", "dateutil"}.isdisjoint(modules)
+
+
+def test_import_model_time_budget():
+    elapsed = min(_import("optionrra.model")[0] for _ in range(IMPORT_RUNS))
+    assert elapsed < IMPORT_TIME_BUDGET
@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from optionrra.live import LiveValuation
+from optionrra.model import Position
+from optionrra.portfolio import Portfolio
+
+NOW = datetime.now()
+EXP_1 = (NOW + timedelta(days=30)).strftime("%Y-%m-%d")
+EXP_2 = (NOW + timedelta(days=60)).strftime("%Y-%m-%d")
+
+POSITIONS = [
+    [f"+1 95 call 6.25 {EXP_1}", f"-1 105 call 1.75 {EXP_1}", f"-2 105 put 7.75 {EXP_2}", "-2 stock 98"],
+    [f"+1 95 call 6.25 {EXP_1}", f"+1 95 put 4.5 {EXP_1} american"],
+    [f"-1 105 call 2.0 {EXP_1}", f"+2 105 put 7.5 {EXP_2}", "+1 95 call 3.0"],
+]
+
+
+@pytest.fixture
+def positions():
+    return [Position.from_str_list(p) for p in POSITIONS]
+
+
+def test_full_revaluation_matches_portfolio(positions):
+    live = LiveValuation(positions, 0.4)
+    portfolio = Portfolio(positions)
+    for spot in [90.0, 100.0, 112.5]:
+        update = live.update(NOW, spot)
+        assert not update.taylor
+        np.testing.assert_allclose(update.values, portfolio.theoretical_values(spot, 0.4)[:, 0])
+        positions_pl, book_pl = portfolio.pl(spot, 0.4)
+        np.testing.assert_allclose(update.pl, positions_pl[:, 0])
+        assert update.book_pl == pytest.approx(book_pl[0])
+    assert live.stats.full_revaluations == 3
+
+
+def test_taylor_updates_within_tolerance(positions):
+    live = LiveValuation(positions, 0.4, taylor_tolerance=0.01, vol_tolerance=0.01)
+    exact = LiveValuation(positions, 0.4)
+    ticks = [(NOW, 100.0), (NOW, 100.5), (NOW, 99.3, 0.405), (NOW, 102.0), (NOW, 102.2)]
+    updates = list(live.stream(ticks))
+    assert [u.taylor for u in updates] == [False, True, True, False, True]
+    assert live.stats.report()["taylor_updates"] == 3
+    for update, expected in zip(updates, exact.stream(ticks)):
+        np.testing.assert_allclose(update.values, expected.values, atol=0.01)
+
+
+def test_new_volatility_outside_tolerance_revalues(positions):
+    live = LiveValuation(positions, 0.4, taylor_tolerance=0.01)
+    live.update(NOW, 100.0)
+    assert live.update(NOW, 100.1).taylor
+    update = live.update(NOW, 100.1, 0.45)
+    assert not update.taylor
+    assert update.sigma == 0.45
+    assert live.sigma == 0.45
+
+
+def test_day_roll_recomputes_time_to_expiration(positions):
+    live = LiveValuation(positions, 0.4, taylor_tolerance=0.05)
+    live.update(NOW, 100.0)
+    # a week later is 5 workdays later
+    update = live.update((NOW + timedelta(days=7)).timestamp(), 100.0)
+    assert not update.taylor
+    assert live.stats.day_rolls == 2
+    np.testing.assert_allclose(update.values, Portfolio(positions).theoretical_values(100.0, 0.4, t=5)[:, 0])
+
+
+def test_astream_consumes_queue_until_none(positions):
+    live = LiveValuation(positions, 0.4)
+
+    async def run():
+        queue = asyncio.Queue()
+        for spot in [99.0, 100.0, 101.0]:
+            queue.put_nowait((NOW, spot))
+        queue.put_nowait(None)
+        return [update async for update in live.astream(queue)]
+
+    updates = asyncio.run(run())
+    assert [u.spot for u in updates] == [99.0, 100.0, 101.0]
+
+
+@pytest.mark.parametrize("kwargs", [{"sigma": 0}, {"sigma": 0.4, "taylor_tolerance": -1}])
+def test_not_a_valid_live_valuation(positions, kwargs):
+    with pytest.raises(ValueError):
+        LiveValuation(positions, **kwargs)
+
+
+def test_not_a_valid_tick(positions):
+    live = LiveValuation(positions, 0.4)
+    with pytest.raises(ValueError):
+        live.update(NOW, 0)
+    with pytest.raises(ValueError):
+        live.update(NOW, 100.0, -0.1)
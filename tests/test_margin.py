@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from optionrra.margin import (CALL_SPREAD, COVERED_CALL, LONG_OPTION, NAKED_CALL, NAKED_PUT, PUT_SPREAD,
+                              MarginCalculator)
+from optionrra.model import Position
+from optionrra.portfolio import Portfolio
+
+EXP_1 = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+EXP_2 = (datetime.now() + timedelta(days=60)).strftime("%Y-%m-%d")
+PRICES = np.array([80.0, 100.0, 120.0])
+
+
+def requirements(contracts):
+    return MarginCalculator([Position.from_str_list(contracts)]).requirements(PRICES, 0.3)[0]
+
+
+@pytest.mark.parametrize("contracts, expected", [
+    ([f"-1 110 call 2.0 {EXP_1}", "+1 stock 100"], [(COVERED_CALL, 1)]),
+    ([f"-2 110 call 2.0 {EXP_1}", "+1 stock 100"], [(COVERED_CALL, 1), (NAKED_CALL, 1)]),
+    ([f"-1 95 put 3.0 {EXP_1}", f"+1 90 put 1.5 {EXP_1}"], [(PUT_SPREAD, 1)]),
+    ([f"-2 100 call 3.0 {EXP_1}", f"+1 105 call 1.5 {EXP_1}", f"+1 110 call 1.0 {EXP_1}"], [(CALL_SPREAD, 1)] * 2),
+    # a long leg expiring before the short one does not cover it
+    ([f"-1 100 call 3.0 {EXP_2}", f"+1 105 call 1.5 {EXP_1}"], [(NAKED_CALL, 1), (LONG_OPTION, 1)]),
+    ([f"-1 100 call 3.0 {EXP_1}", f"+1 105 call 1.5 {EXP_2}"], [(CALL_SPREAD, 1)]),
+    ([f"-1 90 put 2.0 {EXP_1}", f"+1 110 call 2.0 {EXP_1}"], [(LONG_OPTION, 1), (NAKED_PUT, 1)]),
+])
+def test_legs_are_classified_into_structures(contracts, expected):
+    calculator = MarginCalculator([Position.from_str_list(contracts)])
+    assert [(s.kind, s.count) for s in calculator.structures[0]] == expected
+
+
+def test_naked_call_requirement():
+    values = Portfolio([Position.from_str_list([f"-1 110 call 2.0 {EXP_1}"])]).instrument_values(PRICES, 0.3)[0]
+    out_of_money = np.maximum(110 - PRICES, 0)
+    expected = values + np.maximum(0.2 * PRICES - out_of_money, 0.1 * PRICES)
+    np.testing.assert_allclose(requirements([f"-1 110 call 2.0 {EXP_1}"]), expected)
+
+
+def test_naked_put_is_capped_at_cash_secured_amount():
+    # value of a deep in the money put plus 10% of its strike exceeds the strike less the credit
+    calculator = MarginCalculator([Position.from_str_list([f"-1 100 put 2.0 {EXP_1}"])])
+    assert calculator.requirements(5.0, 0.3)[0, 0] == pytest.approx(98.0)
+    assert calculator.requirements(100.0, 0.3)[0, 0] < 98.0
+
+
+@pytest.mark.parametrize("contracts, expected", [
+    ([f"-1 95 put 3.0 {EXP_1}", f"+1 90 put 1.5 {EXP_1}"], 3.5),
+    ([f"+1 95 put 3.0 {EXP_1}", f"-1 90 put 1.5 {EXP_1}"], 1.5),
+    ([f"+2 100 call 5.0 {EXP_1}"], 10.0),
+    # an iron condor requires the max loss of one side only
+    ([f"+1 85 put 1.0 {EXP_1}", f"-1 90 put 2.0 {EXP_1}", f"-1 110 call 2.0 {EXP_1}", f"+1 115 call 1.0 {EXP_1}"],
+     3.0),
+])
+def test_defined_risk_requirement_is_max_loss(contracts, expected):
+    np.testing.assert_allclose(requirements(contracts), expected)
+
+
+@pytest.mark.parametrize("contracts", [
+    ["+1 stock 100"],
+    ["-1 stock 100"],
+    [f"-1 110 call 2.0 {EXP_1}", "+1 stock 100"],
+])
+def test_stock_requirement(contracts):
+    np.testing.assert_allclose(requirements(contracts), 0.5 * PRICES)
+
+
+def test_book_requirements_match_single_positions():
+    books = [
+        [f"-1 110 call 2.0 {EXP_1}", f"-1 90 put 2.0 {EXP_2}"],
+        [f"-1 95 put 3.0 {EXP_1}", f"+1 90 put 1.5 {EXP_1}", "+1 stock 98"],
+        [f"+1 105 call 2.0 {EXP_1}", f"-1 110 call 1.0 {EXP_1} american"],
+    ]
+    positions = [Position.from_str_list(b) for b in books]
+    calculator = MarginCalculator(positions)
+    book = calculator.requirements(PRICES, 0.3)
+    assert book.shape == (len(books), len(PRICES))
+    for i, position in enumerate(positions):
+        np.testing.assert_allclose(book[i], MarginCalculator([position]).requirements(PRICES, 0.3)[0])
+    np.testing.assert_allclose(calculator.book_requirements(PRICES, 0.3), book.sum(axis=0))
+    # a calendar of naked legs has no single expiration to bound its loss
+    assert calculator.max_loss[0] == np.inf
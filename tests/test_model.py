@@ -1,8 +1,10 @@
+import numpy as np
 import pytest
 from unittest.mock import patch
 
 from dateutil.parser import parse
-from optionrra.model import ContractType, OptionContract, OptionType, Position, StockContract
+from optionrra.model import ContractType, DividendSchedule, ExerciseStyle, OptionContract, OptionType, Position, \
+    Settlement, StockContract
 
 
 @pytest.mark.parametrize("test_input, expected", [(100, False), (95, True), (90, False)])
@@ -259,3 +261,122 @@ def test_position_theoretical_value_with_expiration_value(test_input, expected):
                                                      r, sigma,
                                                      num_days + 1,
                                                      option_type)
+
+
+@pytest.mark.parametrize("settlement", [Settlement.CASH, Settlement.STOCK])
+def test_position_theoretical_values_match_theoretical_value(settlement):
+    with patch("optionrra.model.num_workdays_until", side_effect=lambda d: (d - parse("2023-05-01")).days):
+        pos = Position.from_str_list(["+1 95 call 6.25 2023-05-11", "-1 105 call 1.75 2023-05-31",
+                                      "-2 100 put 3.5 2023-05-21", "-1 stock 98", "+1 90 put 1.0"])
+        prices = [80.0, 100.0, 120.0]
+        days = [0, 5, 11, 12, 20, 25, 31, 40]
+        values = pos.theoretical_values(prices, 0.4, 0.05, days, settlement)
+        assert values.shape == (len(prices), len(days))
+        for i, price in enumerate(prices):
+            expected = [pos.theoretical_value(price, 0.4, 0.05, t, settlement) for t in days]
+            np.testing.assert_allclose(values[i], expected)
+
+
+def test_position_approximate_theoretical_values():
+    with patch("optionrra.model.num_workdays_until", side_effect=lambda d: (d - parse("2023-05-01")).days):
+        pos = Position.from_str_list(["+1 95 call 6.25 2023-05-11", "-1 105 call 1.75 2023-05-31",
+                                      "-2 100 put 3.5 2023-05-21", "-1 stock 98"])
+        prices = np.linspace(80, 120, 41)
+        days = [0, 5, 11, 20, 31]
+        exact = pos.theoretical_values(prices, 0.4, 0.05, days)
+        approximate = pos.theoretical_values(prices, 0.4, 0.05, days, approximate=True)
+        # four contracts, each within ~4.5e-5 of its discounted strike
+        np.testing.assert_allclose(approximate, exact, atol=0.02)
+
+
+def test_position_approximate_theoretical_values_no_expired_legs():
+    with patch("optionrra.model.num_workdays_until", return_value=60):
+        pos = Position.from_str_list(["+1 95 call 6.25 2023-05-11", "-1 105 call 1.75 2023-05-11"])
+        exact = pos.theoretical_values([90.0, 100.0, 110.0], 0.4, 0.05, [0, 5, 10])
+        approximate = pos.theoretical_values([90.0, 100.0, 110.0], 0.4, 0.05, [0, 5, 10], approximate=True)
+    np.testing.assert_allclose(approximate, exact, atol=0.01)
+
+
+def test_position_float32_theoretical_values():
+    with patch("optionrra.model.num_workdays_until", side_effect=lambda d: (d - parse("2023-05-01")).days):
+        pos = Position.from_str_list(["+1 95 call 6.25 2023-05-11", "-1 105 call 1.75 2023-05-31 american",
+                                      "-2 100 put 3.5 2023-05-21", "-1 stock 98"])
+        prices = np.linspace(80, 120, 41)
+        days = [0, 5, 11, 20, 31]
+        expected = pos.theoretical_values(prices, 0.4, 0.05, days)
+        values = pos.theoretical_values(prices, 0.4, 0.05, days, dtype=np.float32)
+        assert values.dtype == np.float32
+        np.testing.assert_allclose(values, expected, atol=2e-3)
+
+
+@pytest.mark.parametrize("settlement, expected", [
+    (Settlement.CASH, 5 * np.exp(0.05 * 10 / 365)),
+    (Settlement.STOCK, 5),
+])
+def test_position_expired_legs_are_settled(settlement, expected):
+    with patch("optionrra.model.num_workdays_until", return_value=9):
+        pos = Position.from_str_list(["+1 95 call 6.25 2023-05-11"])
+        # the leg expired 10 days ago
+        assert pos.theoretical_value(100, 0.4, 0.05, 20, settlement) == pytest.approx(expected)
+        assert pos.theoretical_values(100, 0.4, 0.05, 20, settlement)[0, 0] == pytest.approx(expected)
+
+
+def test_position_legs_time_to_expiration():
+    with patch("optionrra.model.num_workdays_until", side_effect=[9, 19]):
+        pos = Position.from_str_list(["+1 95 call 6.25 2023-05-11", "-1 105 call 1.75 2023-05-31", "+1 stock 95"])
+        np.testing.assert_array_equal(pos.legs_time_to_expiration([0, 10, 20]), [[10, 0, -10], [20, 10, 0]])
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    ("+1 95 put 6.25 2023-03-15 american", (ExerciseStyle.AMERICAN, parse("2023-03-15"))),
+    ("+1 95 put 6.25 2023-03-15 european", (ExerciseStyle.EUROPEAN, parse("2023-03-15"))),
+    ("+1 95 put 6.25 american", (ExerciseStyle.AMERICAN, None)),
+    ("+1 95 put 6.25 2023-03-15", (ExerciseStyle.EUROPEAN, parse("2023-03-15"))),
+])
+def test_build_option_contract_from_string_with_exercise_style(test_input, expected):
+    o = OptionContract.from_str(test_input)
+    assert (o.exercise, o.expiration_date()) == expected
+
+
+def test_position_theoretical_value_of_american_legs():
+    with patch("optionrra.model.num_workdays_until", return_value=120):
+        american = Position.from_str_list(["+1 100 put 6.25 2023-05-11 american", "-1 90 put 2.0 2023-05-11 american"])
+        european = Position.from_str_list(["+1 100 put 6.25 2023-05-11", "-1 90 put 2.0 2023-05-11"])
+        prices = [70.0, 95.0]
+        days = [0, 60, 121, 130]
+        values = american.theoretical_values(prices, 0.3, 0.05, days)
+        for i, price in enumerate(prices):
+            expected = [american.theoretical_value(price, 0.3, 0.05, t) for t in days]
+            np.testing.assert_allclose(values[i], expected)
+        # deep in the money american put is exercised right away
+        assert american.theoretical_value(70, 0.3, 0.05) > european.theoretical_value(70, 0.3, 0.05)
+
+
+@pytest.mark.parametrize("dividends", [
+    DividendSchedule(q=0.02),
+    DividendSchedule(payments=[(parse("2023-05-06"), 1.5), (parse("2023-05-26"), 1.0)]),
+    DividendSchedule(q=0.01, payments=[(parse("2023-05-16"), 2.0)]),
+])
+def test_position_theoretical_values_with_dividends_match_theoretical_value(dividends):
+    with patch("optionrra.model.num_workdays_until", side_effect=lambda d: (d - parse("2023-05-01")).days):
+        pos = Position.from_str_list(["+1 95 call 6.25 2023-05-11", "-1 105 call 1.75 2023-05-31 american",
+                                      "-2 100 put 3.5 2023-05-21", "-1 stock 98"])
+        prices = [80.0, 100.0, 120.0]
+        days = [0, 5, 11, 20, 31]
+        values = pos.theoretical_values(prices, 0.4, 0.05, days, dividends=dividends)
+        for i, price in enumerate(prices):
+            expected = [pos.theoretical_value(price, 0.4, 0.05, t, dividends=dividends) for t in days]
+            np.testing.assert_allclose(values[i], expected)
+
+
+def test_position_theoretical_value_with_dividends():
+    with patch("optionrra.model.num_workdays_until", side_effect=lambda d: (d - parse("2023-05-01")).days):
+        dividends = DividendSchedule(payments=[(parse("2023-05-16"), 2.0)])
+        call = Position.from_str_list(["+1 100 call 5.0 2023-05-31"])
+        # a dividend going ex before expiration makes calls cheaper
+        assert call.theoretical_value(100, 0.3, 0.05, dividends=dividends) < call.theoretical_value(100, 0.3, 0.05)
+        # stock holders receive the dividend
+        stock = Position.from_str_list(["+1 stock 100"])
+        assert stock.theoretical_value(100, 0.3, 0.05, 10, dividends=dividends) == 0
+        assert stock.theoretical_value(100, 0.3, 0.05, 20, dividends=dividends) == \
+            pytest.approx(2.0 * np.exp(0.05 * 4 / 365))
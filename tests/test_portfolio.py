@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from optionrra.model import DividendSchedule, Position
+from optionrra.pl.plcalendar import open_memmap
+from optionrra.portfolio import Portfolio
+
+EXP_1 = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+EXP_2 = (datetime.now() + timedelta(days=60)).strftime("%Y-%m-%d")
+
+POSITIONS = [
+    [f"+1 95 call 6.25 {EXP_1}", f"-1 105 call 1.75 {EXP_1}", f"-2 105 put 7.75 {EXP_2}", "-2 stock 98"],
+    [f"+1 95 call 6.25 {EXP_1}", f"+1 95 put 4.5 {EXP_1}"],
+    [f"-1 105 call 2.0 {EXP_1}", f"+2 105 put 7.5 {EXP_2}", "+1 95 call 3.0"],
+]
+
+
+@pytest.fixture
+def portfolio():
+    return Portfolio([Position.from_str_list(p) for p in POSITIONS])
+
+
+def test_portfolio_nets_legs_into_unique_instruments(portfolio):
+    # 95 call, 105 call and 95 put expiring at EXP_1 and 105 put expiring at EXP_2
+    assert len(portfolio.instruments) == 4
+    assert portfolio.membership.shape == (len(POSITIONS), 4)
+    assert portfolio.membership.sum() == 1 + 1 + 2 + 1 + 1 + 1 + 2
+
+
+def test_portfolio_requires_positions():
+    with pytest.raises(ValueError):
+        Portfolio([])
+
+
+@pytest.mark.parametrize("t", [0, 5, 100])
+def test_portfolio_theoretical_values_match_positions(portfolio, t):
+    prices = np.array([80.0, 95.0, 100.0, 120.0])
+    values = portfolio.theoretical_values(prices, 0.4, 0.05, t)
+    assert values.shape == (len(POSITIONS), len(prices))
+    for i, position in enumerate(portfolio.positions):
+        expected = [position.theoretical_value(p, 0.4, 0.05, t) for p in prices]
+        np.testing.assert_allclose(values[i], expected)
+
+
+def test_portfolio_pl(portfolio):
+    prices = [90.0, 100.0]
+    positions_pl, book_pl = portfolio.pl(prices, 0.4)
+    for i, position in enumerate(portfolio.positions):
+        expected = [position.theoretical_value(p, 0.4) - abs(position.entry_cost) for p in prices]
+        np.testing.assert_allclose(positions_pl[i], expected)
+    np.testing.assert_allclose(book_pl, positions_pl.sum(axis=0))
+
+
+def test_portfolio_expected_returns_surface(portfolio, tmp_path):
+    prices = np.linspace(80, 120, 7)
+    days = [0, 3, 10]
+    out = open_memmap(str(tmp_path / "surface.npy"), (len(POSITIONS), len(prices), len(days)))
+    result = portfolio.expected_returns_surface(prices, days, 0.4, 0.05, out=out, price_chunk_size=3)
+    assert result is out
+    for j, t in enumerate(days):
+        positions_pl, _ = portfolio.pl(prices, 0.4, 0.05, t)
+        np.testing.assert_allclose(result[:, :, j], positions_pl)
+
+
+def test_portfolio_expected_returns_surface_not_a_valid_out_shape(portfolio):
+    with pytest.raises(ValueError):
+        portfolio.expected_returns_surface([90.0, 100.0], [0, 1], 0.4, out=np.zeros((1, 2, 2)))
+
+
+def test_portfolio_prices_american_instruments_with_lattice():
+    positions = [Position.from_str_list([f"+1 100 put 6.25 {EXP_1} american", f"-1 90 put 2.0 {EXP_1}"]),
+                 Position.from_str_list([f"+2 100 put 6.0 {EXP_1}"])]
+    portfolio = Portfolio(positions)
+    assert len(portfolio.instruments) == 3
+    prices = [70.0, 100.0]
+    values = portfolio.theoretical_values(prices, 0.3)
+    for i, position in enumerate(positions):
+        np.testing.assert_allclose(values[i], [position.theoretical_value(p, 0.3) for p in prices])
+
+
+def test_portfolio_theoretical_values_with_dividends(portfolio):
+    dividends = DividendSchedule(q=0.01, payments=[(datetime.now() + timedelta(days=20), 1.5)])
+    prices = [90.0, 100.0, 110.0]
+    for t in [0, 25]:
+        values = portfolio.theoretical_values(prices, 0.4, 0.05, t, dividends=dividends)
+        for i, position in enumerate(portfolio.positions):
+            expected = [position.theoretical_value(p, 0.4, 0.05, t, dividends=dividends) for p in prices]
+            np.testing.assert_allclose(values[i], expected)
+
+
+def test_portfolio_expected_returns_surface_float32(portfolio):
+    prices = np.linspace(80, 120, 41)
+    days = [0, 10, 35]
+    expected = portfolio.expected_returns_surface(prices, days, 0.4)
+    surface = portfolio.expected_returns_surface(prices, days, 0.4, dtype=np.float32)
+    assert surface.dtype == np.float32
+    np.testing.assert_allclose(surface, expected, atol=1e-3)
+    positions_pl, book_pl = portfolio.pl(prices, 0.4, dtype=np.float32)
+    assert positions_pl.dtype == book_pl.dtype == np.float32
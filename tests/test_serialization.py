@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from optionrra.model import Position
+from optionrra.serialization import CONTRACT_DTYPE, HEADER, from_bytes, position_from_bytes, position_to_bytes, \
+    records_from_bytes, to_bytes
+
+POSITIONS = [
+    ["+1 95 call 6.25 2023-05-15", "-1 105 call 1.75 2023-06-16", "-2 105 put 7.75", "-2 stock 98"],
+    ["+1 97 put 9.15", "+1 97 call 6.7"],
+    ["+2 stock 100.5"],
+    ["+1 95 put 6.25 2023-05-15 american", "-1 95 put 4.25 2023-05-15"],
+]
+
+
+def _contracts(position: Position):
+    # legs of equal price are in no particular order
+    return sorted((str(c), str(c.expiration_date()), str(getattr(c, "exercise", None))) for c in position.contracts)
+
+
+@pytest.mark.parametrize("contracts", POSITIONS)
+def test_position_round_trip(contracts):
+    position = Position.from_str_list(contracts)
+    buffer = position_to_bytes(position)
+    assert len(buffer) == HEADER.size + len(contracts) * CONTRACT_DTYPE.itemsize
+    decoded = position_from_bytes(buffer)
+    assert _contracts(decoded) == _contracts(position)
+    assert decoded.entry_cost == position.entry_cost
+    assert decoded.pl_at_strike == position.pl_at_strike
+
+
+def test_book_round_trip():
+    positions = [Position.from_str_list(p) for p in POSITIONS]
+    decoded = from_bytes(to_bytes(positions))
+    assert [_contracts(p) for p in decoded] == [_contracts(p) for p in positions]
+
+
+def test_records_are_a_zero_copy_view():
+    buffer = to_bytes([Position.from_str_list(p) for p in POSITIONS])
+    records = records_from_bytes(buffer)
+    assert np.shares_memory(records, np.frombuffer(buffer, dtype=np.uint8))
+    assert list(records["position"]) == [0, 0, 0, 0, 1, 1, 2, 3, 3]
+    assert np.isnat(records["exp_date"]).sum() == 5
+    assert records["exercise"].sum() == 1
+
+
+@pytest.mark.parametrize("buffer", [b"", b"XXXX" + b"\x00" * 6, to_bytes([Position.from_str_list(POSITIONS[0])])[:-1]])
+def test_not_a_valid_buffer(buffer):
+    with pytest.raises(ValueError):
+        from_bytes(buffer)
+
+
+def test_single_position_expected():
+    buffer = to_bytes([Position.from_str_list(p) for p in POSITIONS])
+    with pytest.raises(ValueError):
+        position_from_bytes(buffer)
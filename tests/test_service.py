@@ -0,0 +1,161 @@
+import asyncio
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from optionrra import service
+from optionrra.service import PositionAnalyticsService, compute_position_analytics
+
+EXP = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+CONTRACTS = [f"+1 95 call 6.25 {EXP}", f"-1 105 call 1.75 {EXP}"]
+
+
+async def _http(port: int, method: str, path: str, body: dict = None, accept: str = "application/json"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nAccept: {accept}\r\n"
+                 f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), content
+
+
+def test_compute_position_analytics():
+    result = compute_position_analytics(CONTRACTS, (90, 110), 0.4, 0.05)
+    assert result["expected_returns"].shape == (len(result["prices"]), len(result["days"]))
+    assert result["pl_points"].shape[1] == 2
+
+
+def test_identical_concurrent_requests_are_coalesced():
+    release = threading.Event()
+    calls = []
+
+    def slow_compute(*args):
+        calls.append(args)
+        release.wait(5)
+        return compute_position_analytics(*args)
+
+    async def run():
+        svc = PositionAnalyticsService(ThreadPoolExecutor(max_workers=2))
+        tasks = [asyncio.create_task(svc.analyze(CONTRACTS, (90, 110), 0.4)) for _ in range(5)]
+        tasks.append(asyncio.create_task(svc.analyze(list(reversed(CONTRACTS)), (90, 110), 0.4)))
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        svc.close()
+        return svc, results
+
+    with patch.object(service, "compute_position_analytics", side_effect=slow_compute):
+        svc, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert svc.metrics.coalesced == 5
+    for result in results[1:]:
+        np.testing.assert_array_equal(result["expected_returns"], results[0]["expected_returns"])
+
+
+def test_not_a_valid_position():
+    async def run():
+        svc = PositionAnalyticsService(ThreadPoolExecutor(max_workers=1))
+        try:
+            await svc.analyze(["+1 95 put"], (90, 110), 0.4)
+        finally:
+            svc.close()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+@pytest.mark.parametrize("accept", ["application/json", "application/octet-stream"])
+def test_http_analytics(accept):
+    async def run():
+        svc = PositionAnalyticsService(ThreadPoolExecutor(max_workers=1))
+        server = await svc.start()
+        port = server.sockets[0].getsockname()[1]
+        body = {"contracts": CONTRACTS, "price_range": [90, 110], "sigma": 0.4, "r": 0.05}
+        response = await _http(port, "POST", "/analytics", body, accept)
+        metrics = await _http(port, "GET", "/metrics")
+        server.close()
+        await server.wait_closed()
+        svc.close()
+        return response, metrics
+
+    (status, content), (metrics_status, metrics_content) = asyncio.run(run())
+    expected = compute_position_analytics(CONTRACTS, (90, 110), 0.4, 0.05)
+    assert status == 200
+    if accept == "application/json":
+        result = {k: np.array(v) for k, v in json.loads(content).items()}
+    else:
+        result = np.load(io.BytesIO(content))
+    np.testing.assert_allclose(result["expected_returns"], expected["expected_returns"])
+    assert metrics_status == 200
+    assert json.loads(metrics_content)["requests"] == 1
+
+
+@pytest.mark.parametrize("method, path, body, expected_status", [
+    ("POST", "/analytics", {"contracts": ["+1 95 put"], "price_range": [90, 110], "sigma": 0.4}, 400),
+    ("POST", "/analytics", {"price_range": [90, 110]}, 400),
+    ("POST", "/analytics", {"contracts": CONTRACTS, "price_range": "90-110", "sigma": 0.4}, 400),
+    ("POST", "/analytics", {"contracts": CONTRACTS, "price_range": [[90], [110]], "sigma": 0.4}, 400),
+    ("POST", "/analytics", {"contracts": CONTRACTS, "price_range": [90, "high"], "sigma": 0.4}, 400),
+    ("POST", "/analytics", {"contracts": CONTRACTS, "price_range": [90, 110], "sigma": [0.4]}, 400),
+    ("POST", "/analytics", {"contracts": CONTRACTS, "price_range": [90, 110], "sigma": 0.4, "r": "low"}, 400),
+    ("GET", "/unknown", None, 404),
+])
+def test_http_errors(method, path, body, expected_status):
+    async def run():
+        svc = PositionAnalyticsService(ThreadPoolExecutor(max_workers=1))
+        server = await svc.start()
+        response = await _http(server.sockets[0].getsockname()[1], method, path, body)
+        server.close()
+        await server.wait_closed()
+        svc.close()
+        return response, svc.metrics.errors
+
+    (status, _), errors = asyncio.run(run())
+    assert status == expected_status
+    assert errors == 1
+
+
+def test_http_unexpected_error():
+    async def run():
+        svc = PositionAnalyticsService(ThreadPoolExecutor(max_workers=1))
+        server = await svc.start()
+        body = {"contracts": CONTRACTS, "price_range": [90, 110], "sigma": 0.4}
+        response = await _http(server.sockets[0].getsockname()[1], "POST", "/analytics", body)
+        server.close()
+        await server.wait_closed()
+        svc.close()
+        return response, svc.metrics.errors
+
+    with patch.object(service, "compute_position_analytics", side_effect=RuntimeError("boom")):
+        (status, content), errors = asyncio.run(run())
+    assert status == 500
+    assert "boom" in json.loads(content)["error"]
+    assert errors == 1
+
+
+def test_http_incomplete_body():
+    async def run():
+        svc = PositionAnalyticsService(ThreadPoolExecutor(max_workers=1))
+        server = await svc.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        writer.write(b"POST /analytics HTTP/1.1\r\nContent-Length: 100\r\n\r\n{\"contracts\"")
+        writer.write_eof()
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        svc.close()
+        return response, svc.metrics.errors
+
+    response, errors = asyncio.run(run())
+    assert int(response.split()[1]) == 400
+    assert errors == 1
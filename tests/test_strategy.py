@@ -0,0 +1,140 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from optionrra.chain import OptionChain
+from optionrra.model import OptionType
+from optionrra.pricing.black_scholes_model import option_values
+from optionrra.strategy import STRUCTURES, StrategySearch, pareto_front
+
+EXP = np.datetime64("2023-06-16", "s")
+
+
+@pytest.fixture
+def chain():
+    strikes = np.arange(80.0, 121.0, 2.5)
+    strikes = np.concatenate([strikes, strikes])
+    is_call = np.arange(len(strikes)) < len(strikes) // 2
+    # a skew makes premiums differ from the flat volatility the scenarios are drawn with
+    sigma = 0.3 + 0.004 * (100 - strikes)
+    return OptionChain(strikes, is_call, EXP, option_values(100.0, strikes, 0.05, sigma, 30, is_call))
+
+
+@pytest.fixture
+def search(chain):
+    return StrategySearch(chain, EXP, 100.0, 0.3, days=30, batch_size=50)
+
+
+def _all_candidates(search, name, max_width):
+    return np.concatenate(list(search.candidates(STRUCTURES[name], max_width)))
+
+
+@pytest.mark.parametrize("name, max_width", [
+    ("bull_call_spread", 10), ("bear_put_spread", np.inf), ("long_put_butterfly", 10), ("iron_condor", 15),
+])
+def test_candidates_match_brute_force(chain, search, name, max_width):
+    structure = STRUCTURES[name]
+    rows = _all_candidates(search, name, max_width)
+    expected = set()
+    for legs in combinations(range(len(chain)), len(structure.counts)):
+        strikes = chain.strikes[list(legs)]
+        types = tuple(OptionType.CALL if chain.is_call[r] else OptionType.PUT for r in legs)
+        if types != structure.option_types or not (np.diff(strikes) > 0).all() or strikes[-1] - strikes[0] > max_width:
+            continue
+        if structure.shape == "butterfly" and strikes[1] - strikes[0] != strikes[2] - strikes[1]:
+            continue
+        if structure.shape == "condor" and strikes[1] - strikes[0] != strikes[3] - strikes[2]:
+            continue
+        expected.add(legs)
+    assert sorted(map(tuple, rows.tolist())) == sorted(expected)
+
+
+def test_bounds_match_payoff_on_dense_grid(search):
+    for name in ["bull_call_spread", "bear_call_spread", "long_call_butterfly", "iron_condor"]:
+        structure = STRUCTURES[name]
+        rows = _all_candidates(search, name, 20)
+        bounds = search.bounds(rows, structure.counts)
+        payoffs = search.payoffs(rows, structure.counts, np.linspace(0, 300, 12001))
+        np.testing.assert_allclose(bounds["max_gain"], payoffs.max(axis=1), atol=1e-9)
+        np.testing.assert_allclose(bounds["max_loss"], -payoffs.min(axis=1), atol=1e-9)
+
+
+def test_naked_structures_have_unbounded_risk(chain, search):
+    rows = np.array([[chain.find(100, OptionType.CALL, EXP)]])
+    assert search.bounds(rows, [-1])["max_loss"][0] == np.inf
+    assert search.bounds(rows, [+1])["max_gain"][0] == np.inf
+
+
+def test_search_without_pruning_returns_top_k(search):
+    structures = ["bull_call_spread", "bull_put_spread", "iron_condor"]
+    result = search.search(structures, "expected_pl", k=5, max_width=15, prune_dominated=False)
+
+    scores = []
+    for name in structures:
+        rows = _all_candidates(search, name, 15)
+        scores.extend(search.metrics(rows, STRUCTURES[name].counts)["expected_pl"])
+    np.testing.assert_allclose([s.score for s in result], sorted(scores, reverse=True)[:5])
+    assert search.stats.evaluated == search.stats.candidates
+
+
+def test_search_pruning_keeps_best_of_monotone_objective(chain):
+    exhaustive = StrategySearch(chain, EXP, 100.0, 0.3, days=30, batch_size=50)
+    pruned = StrategySearch(chain, EXP, 100.0, 0.3, days=30, batch_size=50)
+    structures = ["bear_call_spread", "long_call_butterfly", "iron_condor"]
+
+    expected = exhaustive.search(structures, "reward_risk", k=3, max_width=20, prune_dominated=False)
+    result = pruned.search(structures, "reward_risk", k=3, max_width=20)
+    assert [s.score for s in result] == pytest.approx([s.score for s in expected])
+    assert pruned.stats.pruned_dominated > 0
+    assert pruned.stats.evaluated < exhaustive.stats.evaluated
+
+
+@pytest.mark.parametrize("objective", StrategySearch.METRICS)
+def test_search_default_pruning_keeps_top_k(chain, objective):
+    # pruning the other objectives by dominance would drop some of their top 3 on this chain
+    exhaustive = StrategySearch(chain, EXP, 100.0, 0.3, days=30, batch_size=50)
+    default = StrategySearch(chain, EXP, 100.0, 0.3, days=30, batch_size=50)
+    structures = ["bull_put_spread", "long_call_butterfly", "iron_condor"]
+
+    expected = exhaustive.search(structures, objective, k=3, max_width=20, prune_dominated=False)
+    result = default.search(structures, objective, k=3, max_width=20)
+    assert [s.score for s in result] == pytest.approx([s.score for s in expected])
+    assert (default.stats.pruned_dominated > 0) == (objective in StrategySearch.MONOTONE_OBJECTIVES)
+
+
+@pytest.mark.parametrize("objective", ["expected_pl", "probability_of_profit", "max_loss", "cost"])
+def test_search_not_monotone_objective_pruned(search, objective):
+    with pytest.raises(ValueError):
+        search.search(["iron_condor"], objective, prune_dominated=True)
+
+
+def test_search_respects_bounds_and_mints_positions(search):
+    result = search.search(["bull_put_spread", "iron_condor"], lambda m: m["probability_of_profit"], k=4,
+                           max_width=10, max_loss=5.0, min_gain=1.0)
+    assert len(result) == 4
+    for strategy in result:
+        assert strategy.metrics["max_loss"] <= 5.0
+        assert strategy.metrics["max_gain"] >= 1.0
+        assert len(strategy.position.contracts) == len(STRUCTURES[strategy.structure].counts)
+        # PL at expiration of the minted position agrees with the vectorized bounds
+        pl = [strategy.position.pl_at_expiration(p) for p in np.linspace(50, 150, 401)]
+        assert min(pl) == pytest.approx(-strategy.metrics["max_loss"], abs=0.01)
+
+
+@pytest.mark.parametrize("depth, expected", [
+    (1, [True, False, False, True, True, False]),
+    (2, [True, True, True, True, True, False]),
+    (3, [True, True, True, True, True, True]),
+])
+def test_pareto_front(depth, expected):
+    max_gain = np.array([5.0, 4.0, 5.0, 6.0, 5.0, 3.0])
+    max_loss = np.array([2.0, 2.0, 3.0, 4.0, 2.0, 2.5])
+    np.testing.assert_array_equal(pareto_front(max_gain, max_loss, depth), expected)
+
+
+@pytest.mark.parametrize("kwargs", [{"structures": ["straddle"]}, {"structures": ["iron_condor"], "k": 0},
+                                    {"structures": ["iron_condor"], "objective": "delta"}])
+def test_not_a_valid_search(search, kwargs):
+    with pytest.raises(ValueError):
+        search.search(**kwargs)